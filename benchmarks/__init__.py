@@ -0,0 +1,6 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of delimited2fixedwidth and is MIT-licensed.
+
+# Benchmarks of delimited2fixedwidth on synthetic workloads, see `run`
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of delimited2fixedwidth and is MIT-licensed.
+
+# Performance regression gate: run a fixed set of benchmark scenarios and
+# compare their throughput and peak memory usage to the baseline results
+# committed in baseline.json, exiting with 1 if any of them regressed by more
+# than the tolerance:
+#     python -m benchmarks.gate
+# The baseline depends on the machine it was measured on, update it on the
+# machine running the gate with:
+#     python -m benchmarks.gate --update-baseline
+# `--scale` multiplies the number of rows of the scenarios, for quicker runs
+# (only compared to a baseline measured with the same scale).
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+from benchmarks.generate import DEFAULT_MIX, generate_workload
+from benchmarks.run import measure, measure_isolated
+
+DEFAULT_BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+# Default maximum relative decrease of the rows per second and increase of the
+# peak memory usage that aren't considered as regressions
+DEFAULT_THROUGHPUT_TOLERANCE = 0.2
+DEFAULT_MEMORY_TOLERANCE = 0.2
+DEFAULT_REPEAT = 3
+# The scenarios of the gate: name, number of rows (in total over all the input
+# files), number of columns, mix of kinds of columns and number of input files
+GATE_SCENARIOS = (
+    ("mixed-1M-rows-50-columns", 1000000, 50, DEFAULT_MIX, 1),
+    ("date-heavy", 200000, 20, {"Date": 4, "Integer": 1}, 1),
+    ("decimal-heavy", 200000, 20, {"Decimal": 4, "Integer": 1}, 1),
+    ("text-heavy", 200000, 20, {"Text": 4, "Integer": 1}, 1),
+    ("directory-1000-files", 100000, 20, DEFAULT_MIX, 1000),
+)
+
+
+def generate_scenario(directory, name, num_rows, num_columns, mix, num_files):
+    # Generate the input file (or directory of input files, all identical) and
+    # configuration file of a scenario, returning their paths
+    (input_file, config_file) = generate_workload(
+        directory, name, num_rows // num_files, num_columns, mix
+    )
+    if num_files == 1:
+        return (input_file, config_file)
+    input_directory = os.path.join(directory, name)
+    os.mkdir(input_directory)
+    for idx in range(num_files):
+        shutil.copy(input_file, os.path.join(input_directory, "input%d.txt" % idx))
+    os.remove(input_file)
+    return (input_directory, config_file)
+
+
+def run_gate(scale=1.0, engine="python", repeat=DEFAULT_REPEAT, isolate=True):
+    # Run the scenarios of the gate, returning their results by name
+    results = {}
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for (name, num_rows, num_columns, mix, num_files) in GATE_SCENARIOS:
+            # At least one row per input file
+            num_rows = max(round(num_rows * scale), num_files)
+            num_rows -= num_rows % num_files
+            (input_path, config_file) = generate_scenario(
+                temp_dir, name, num_rows, num_columns, mix, num_files
+            )
+            logging.info("Running the %s scenario", name)
+            args = (name, engine, input_path, config_file, num_rows, repeat)
+            results[name] = measure_isolated(*args) if isolate else measure(*args)
+    finally:
+        shutil.rmtree(temp_dir)
+    return {"scale": scale, "engine": engine, "results": results}
+
+
+def get_change(baseline_value, value):
+    # Relative change from the baseline value
+    return (value - baseline_value) / baseline_value
+
+
+def compare_results(
+    baseline,
+    current,
+    throughput_tolerance=DEFAULT_THROUGHPUT_TOLERANCE,
+    memory_tolerance=DEFAULT_MEMORY_TOLERANCE,
+):
+    # Compare the current results of the gate to the baseline ones, returning
+    # the lines of a table of the differences and the list of regressions
+    lines = [
+        "%-26s %12s %12s %8s %12s %12s %8s"
+        % (
+            "Scenario",
+            "Rows/s base",
+            "Rows/s now",
+            "Change",
+            "RSS MB base",
+            "RSS MB now",
+            "Change",
+        )
+    ]
+    regressions = []
+    for (name, result) in current["results"].items():
+        baseline_result = baseline["results"].get(name)
+        if baseline_result is None:
+            lines.append("%-26s not in the baseline" % name)
+            continue
+        throughput_change = get_change(
+            baseline_result["rows_per_second"], result["rows_per_second"]
+        )
+        if throughput_change < -throughput_tolerance:
+            regressions.append(
+                "%s: %.1f%% fewer rows per second (tolerance %.1f%%)"
+                % (name, -100 * throughput_change, 100 * throughput_tolerance)
+            )
+        (baseline_rss, rss) = (
+            baseline_result["peak_rss_bytes"],
+            result["peak_rss_bytes"],
+        )
+        memory_change = None
+        if baseline_rss and rss:
+            memory_change = get_change(baseline_rss, rss)
+            if memory_change > memory_tolerance:
+                regressions.append(
+                    "%s: %.1f%% more peak memory (tolerance %.1f%%)"
+                    % (name, 100 * memory_change, 100 * memory_tolerance)
+                )
+        lines.append(
+            "%-26s %12d %12d %+7.1f%% %12s %12s %8s"
+            % (
+                name,
+                baseline_result["rows_per_second"],
+                result["rows_per_second"],
+                100 * throughput_change,
+                "n/a" if not baseline_rss else "%.1f" % (baseline_rss / 1024 / 1024),
+                "n/a" if not rss else "%.1f" % (rss / 1024 / 1024),
+                "n/a" if memory_change is None else "%+.1f%%" % (100 * memory_change),
+            )
+        )
+    return (lines, regressions)
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(
+        description="Compare the performance of delimited2fixedwidth to a baseline"
+    )
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        help="The baseline results JSON file (default %s)" % DEFAULT_BASELINE_FILE,
+        default=DEFAULT_BASELINE_FILE,
+    )
+    parser.add_argument(
+        "-u",
+        "--update-baseline",
+        help="Save the results as the new baseline instead of comparing them",
+        action="store_true",
+    )
+    parser.add_argument(
+        "-s",
+        "--scale",
+        help="Multiply the number of rows of the scenarios by this factor "
+        "(default 1)",
+        type=float,
+        default=1.0,
+    )
+    parser.add_argument(
+        "-e",
+        "--engine",
+        help="The engine used to convert the rows (default 'python')",
+        default="python",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        help="Number of runs of each scenario, the best time being kept (default "
+        "%d)" % DEFAULT_REPEAT,
+        type=int,
+        default=DEFAULT_REPEAT,
+    )
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        help="Maximum relative decrease of the rows per second (default %.2f)"
+        % DEFAULT_THROUGHPUT_TOLERANCE,
+        type=float,
+        default=DEFAULT_THROUGHPUT_TOLERANCE,
+    )
+    parser.add_argument(
+        "-mt",
+        "--memory-tolerance",
+        help="Maximum relative increase of the peak memory usage (default %.2f)"
+        % DEFAULT_MEMORY_TOLERANCE,
+        type=float,
+        default=DEFAULT_MEMORY_TOLERANCE,
+    )
+    return parser.parse_args(arguments)
+
+
+def main(arguments):
+    args = parse_args(arguments)
+    baseline = None
+    if not args.update_baseline:
+        if not os.path.isfile(args.baseline):
+            logging.critical(
+                "The baseline file %s does not exist, create it with "
+                "`--update-baseline`. Exiting..." % args.baseline
+            )
+            sys.exit(2)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline["scale"], baseline["engine"]) != (args.scale, args.engine):
+            logging.critical(
+                "The baseline was measured with a scale of %s and the %s engine, "
+                "not %s and %s. Exiting..."
+                % (baseline["scale"], baseline["engine"], args.scale, args.engine)
+            )
+            sys.exit(2)
+    current = run_gate(args.scale, args.engine, args.repeat)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+        logging.info("Baseline saved to %s", args.baseline)
+        return
+    (lines, regressions) = compare_results(
+        baseline, current, args.tolerance, args.memory_tolerance
+    )
+    print("\n".join(lines))
+    if regressions:
+        print("\nPerformance regressions:\n%s" % "\n".join(regressions))
+        sys.exit(1)
+    print("\nNo performance regression.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.INFO)
+    main(sys.argv[1:])
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of delimited2fixedwidth and is MIT-licensed.
+
+# Generation of synthetic input files and their matching configuration files,
+# with a configurable mix of output formats, number of rows and field widths
+
+import os
+import random
+
+# Output format of the generated "Date" columns
+DATE_OUTPUT_FORMAT = "Date (DD/MM/YYYY to YYYYMMDD)"
+# Kinds of columns that can be generated, and their default weights in the mix
+DEFAULT_MIX = {
+    "Integer": 2,
+    "Decimal": 2,
+    "Keep numeric": 1,
+    "Time": 1,
+    "Date": 2,
+    "Text": 2,
+}
+# Minimum field width of the kinds of columns whose values have a fixed length
+MIN_FIELD_WIDTHS = {"Time": 4, "Date": 8, "Decimal": 3}
+# Default field width of the generated columns
+DEFAULT_FIELD_WIDTH = 12
+# Number of rows written at once to the input files
+WRITE_BATCH_SIZE = 10000
+TEXT_CHARACTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789 "
+
+
+def parse_mix(value):
+    # Parse a mix of kinds of columns given as e.g. "Integer=2,Date=1"
+    mix = {}
+    for item in value.split(","):
+        (kind, _, weight) = item.partition("=")
+        kind = kind.strip()
+        if kind not in DEFAULT_MIX:
+            raise ValueError(
+                "Invalid kind of column '%s', must be one of '%s'"
+                % (kind, "', '".join(DEFAULT_MIX))
+            )
+        mix[kind] = int(weight) if weight else 1
+    return mix
+
+
+def get_columns(num_columns, mix=None, field_width=DEFAULT_FIELD_WIDTH):
+    # The configuration of `num_columns` columns (as returned by `load_config`),
+    # the kinds of columns of the `mix` being spread in proportion to their
+    # weight
+    mix = DEFAULT_MIX if mix is None else mix
+    kinds = [kind for (kind, weight) in mix.items() for _ in range(weight)]
+    columns = []
+    for idx in range(num_columns):
+        kind = kinds[idx % len(kinds)]
+        columns.append(
+            {
+                "length": max(field_width, MIN_FIELD_WIDTHS.get(kind, 1)),
+                "output_format": DATE_OUTPUT_FORMAT if kind == "Date" else kind,
+                "skip_field": False,
+            }
+        )
+    return columns
+
+
+def get_value_generator(column, rng):
+    # Function returning random values for the column, that always fit its
+    # length once converted
+    length = column["length"]
+    output_format = column["output_format"]
+    if output_format == "Integer":
+        max_value = 10 ** min(length, 9) - 1
+        return lambda: str(rng.randint(0, max_value))
+    if output_format == "Decimal":
+        max_value = 10 ** min(length - 2, 7) - 1
+        return lambda: "%d.%02d" % (rng.randint(0, max_value), rng.randint(0, 99))
+    if output_format == "Keep numeric":
+        max_value = 10 ** min(length, 9) - 1
+        return lambda: "ID-%d/X" % rng.randint(0, max_value)
+    if output_format == "Time":
+        return lambda: "%02d:%02d" % (rng.randint(0, 23), rng.randint(0, 59))
+    if output_format == DATE_OUTPUT_FORMAT:
+        return lambda: "%d/%d/%d" % (
+            rng.randint(1, 28),
+            rng.randint(1, 12),
+            rng.randint(1990, 2030),
+        )
+    return lambda: "".join(rng.choices(TEXT_CHARACTERS, k=rng.randint(1, length)))
+
+
+def write_input_file(input_file, columns, num_rows, delimiter="^", seed=0):
+    # Write `num_rows` rows of random values for the `columns`, the same `seed`
+    # always generating the same file
+    rng = random.Random(seed)
+    generators = [get_value_generator(column, rng) for column in columns]
+    with open(input_file, "w", encoding="utf-8", newline="") as f:
+        for start in range(0, num_rows, WRITE_BATCH_SIZE):
+            lines = [
+                delimiter.join([generate() for generate in generators])
+                for _ in range(min(WRITE_BATCH_SIZE, num_rows - start))
+            ]
+            f.write("\n".join(lines) + "\n")
+
+
+def write_config_file(config_file, columns):
+    # Write the configuration file (an Excel .xlsx file) describing the columns
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Length", "Output format", "Skip field"])
+    for column in columns:
+        ws.append(
+            [column["length"], column["output_format"], str(column["skip_field"])]
+        )
+    wb.save(config_file)
+
+
+def generate_workload(
+    directory,
+    name,
+    num_rows,
+    num_columns,
+    mix=None,
+    field_width=DEFAULT_FIELD_WIDTH,
+    delimiter="^",
+    seed=0,
+):
+    # Generate the "<name>.txt" input file and the matching "<name>.xlsx"
+    # configuration file in `directory`, returning their paths
+    columns = get_columns(num_columns, mix, field_width)
+    input_file = os.path.join(directory, "%s.txt" % name)
+    config_file = os.path.join(directory, "%s.xlsx" % name)
+    write_input_file(input_file, columns, num_rows, delimiter, seed)
+    write_config_file(config_file, columns)
+    return (input_file, config_file)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of delimited2fixedwidth and is MIT-licensed.
+
+# Memory scaling benchmark: convert input files with the same layout and an
+# increasing number of rows, collecting the memory report of `process` (see
+# `--memory-report`), and check that the peak memory usage stays bounded:
+#     python -m benchmarks.memory --sizes 10000,1000000,10000000
+# Exits with 1 if the peak memory usage of a larger input file is more than
+# `--max-growth` times that of the smallest one.
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import delimited2fixedwidth
+from benchmarks.generate import DEFAULT_MIX, generate_workload
+from benchmarks.run import run_isolated
+
+DEFAULT_SIZES = (10000, 1000000, 10000000)
+DEFAULT_NUM_COLUMNS = 10
+# Default maximum ratio between the peak memory usage of the larger input files
+# and that of the smallest one
+DEFAULT_MAX_GROWTH = 1.5
+MEMORY_KEYS = ("peak_traced_bytes", "peak_rss_bytes")
+
+
+def measure_memory(input_file, config_file):
+    # The memory report of the conversion of the input file
+    output_file = "%s.out" % input_file
+    memory_report = {}
+    delimited2fixedwidth.process(
+        input_file,
+        output_file,
+        config_file,
+        "^",
+        '"',
+        0,
+        0,
+        locale="C",
+        memory_report=memory_report,
+    )
+    os.remove(output_file)
+    return memory_report
+
+
+def run_scaling(
+    sizes=DEFAULT_SIZES, num_columns=DEFAULT_NUM_COLUMNS, mix=None, isolate=True
+):
+    # Convert an input file of each size (in rows), all with the same layout,
+    # returning their memory reports
+    results = []
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for num_rows in sizes:
+            name = "rows%d" % num_rows
+            (input_file, config_file) = generate_workload(
+                temp_dir, name, num_rows, num_columns, mix or DEFAULT_MIX
+            )
+            logging.info("Converting %d rows", num_rows)
+            args = (input_file, config_file)
+            memory_report = (
+                run_isolated(measure_memory, *args)
+                if isolate
+                else measure_memory(*args)
+            )
+            memory_report.update(
+                {"num_rows": num_rows, "input_bytes": os.path.getsize(input_file)}
+            )
+            results.append(memory_report)
+            # The generated input files can get big
+            os.remove(input_file)
+    finally:
+        shutil.rmtree(temp_dir)
+    return results
+
+
+def check_scaling(results, max_growth=DEFAULT_MAX_GROWTH):
+    # The list of the input files whose peak memory usage is more than
+    # `max_growth` times that of the smallest one
+    failures = []
+    for key in MEMORY_KEYS:
+        smallest = results[0][key]
+        if not smallest:
+            continue
+        for result in results[1:]:
+            if result[key] and result[key] > smallest * max_growth:
+                failures.append(
+                    "%s for %d rows: %.1f MB, %.2f times that for %d rows (maximum "
+                    "%.2f)"
+                    % (
+                        key,
+                        result["num_rows"],
+                        result[key] / 1024 / 1024,
+                        result[key] / smallest,
+                        results[0]["num_rows"],
+                        max_growth,
+                    )
+                )
+    return failures
+
+
+def format_mb(value):
+    return "n/a" if value is None else "%.1f" % (value / 1024 / 1024)
+
+
+def format_results(results):
+    # The results as a table, one line per input file, with the peak memory
+    # usage in total and of each stage (traced memory / resident memory)
+    stages = delimited2fixedwidth.STATS_STAGES
+    lines = [
+        "%10s %10s %14s %14s" % ("Rows", "Input MB", "Traced MB", "RSS MB")
+        + "".join(" %18s" % stage for stage in stages)
+    ]
+    for result in results:
+        lines.append(
+            "%10d %10.1f %14s %14s"
+            % (
+                result["num_rows"],
+                result["input_bytes"] / 1024 / 1024,
+                format_mb(result["peak_traced_bytes"]),
+                format_mb(result["peak_rss_bytes"]),
+            )
+            + "".join(
+                " %18s"
+                % (
+                    "%s / %s"
+                    % (
+                        format_mb(result["stages"][stage]["peak_traced_bytes"]),
+                        format_mb(result["stages"][stage]["peak_rss_bytes"]),
+                    )
+                )
+                for stage in stages
+            )
+        )
+    return "\n".join(lines)
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(
+        description="Check that the memory usage of delimited2fixedwidth stays "
+        "bounded as the input files grow"
+    )
+    parser.add_argument(
+        "-s",
+        "--sizes",
+        help="Comma-delimited numbers of rows of the input files (default %s)"
+        % ",".join(str(size) for size in DEFAULT_SIZES),
+        type=lambda value: [int(size) for size in value.split(",")],
+        default=DEFAULT_SIZES,
+    )
+    parser.add_argument(
+        "-c",
+        "--columns",
+        help="Number of columns of the input files (default %d)" % DEFAULT_NUM_COLUMNS,
+        type=int,
+        default=DEFAULT_NUM_COLUMNS,
+    )
+    parser.add_argument(
+        "-g",
+        "--max-growth",
+        help="Maximum ratio between the peak memory usage of the larger input "
+        "files and that of the smallest one (default %.1f)" % DEFAULT_MAX_GROWTH,
+        type=float,
+        default=DEFAULT_MAX_GROWTH,
+    )
+    parser.add_argument(
+        "-o", "--output", help="Save the results to this JSON file", action="store"
+    )
+    return parser.parse_args(arguments)
+
+
+def main(arguments):
+    args = parse_args(arguments)
+    results = run_scaling(sorted(args.sizes), args.columns)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    failures = check_scaling(results, args.max_growth)
+    if failures:
+        print("\nThe memory usage isn't bounded:\n%s" % "\n".join(failures))
+        sys.exit(1)
+    print("\nThe memory usage is bounded.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.INFO)
+    main(sys.argv[1:])
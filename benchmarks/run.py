@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#    This file is part of delimited2fixedwidth and is MIT-licensed.
+
+# Run the benchmarks on synthetic workloads (see `generate`) and save their
+# results as JSON, to compare them between versions:
+#     python -m benchmarks.run --rows 100000 --output results.json
+# (from the root of the repository, next to delimited2fixedwidth.py).
+# For each engine, the "process" scenario converts an input file with a mix of
+# output formats from end to end with `process`, and each "format:<kind>"
+# scenario only converts rows already read in memory in which all the columns
+# are of that kind of output format. Each measurement runs in its own process,
+# so that its peak memory usage (RSS) is its own.
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import delimited2fixedwidth
+from benchmarks.generate import (
+    DEFAULT_FIELD_WIDTH,
+    DEFAULT_MIX,
+    generate_workload,
+    parse_mix,
+)
+
+DEFAULT_NUM_ROWS = 100000
+DEFAULT_NUM_COLUMNS = 20
+DEFAULT_REPEAT = 3
+
+
+def get_engines():
+    # The "numpy" engine is only benchmarked if NumPy is installed
+    engines = ["python"]
+    if importlib.util.find_spec("numpy") is not None:
+        engines.append("numpy")
+    return engines
+
+
+def time_process(input_file, config_file, engine):
+    # Convert the input file from end to end, returning the time it took
+    output_file = "%s.out" % input_file
+    start = time.perf_counter()
+    delimited2fixedwidth.process(
+        input_file, output_file, config_file, "^", '"', 0, 0, locale="C", engine=engine
+    )
+    seconds = time.perf_counter() - start
+    os.remove(output_file)
+    return seconds
+
+
+def time_conversion(input_file, config_file, engine):
+    # Only convert the rows of the input file, once read in memory, returning
+    # the time it took
+    from locale import LC_NUMERIC, setlocale
+
+    setlocale(LC_NUMERIC, "C")
+    delimited2fixedwidth.get_supported_output_formats()
+    config = delimited2fixedwidth.load_config(config_file)
+    rows = list(
+        delimited2fixedwidth.iter_input_file(input_file, "^", '"', 0, 0, "utf-8")
+    )
+    start = time.perf_counter()
+    for _ in delimited2fixedwidth.iter_convert_content(rows, config, engine=engine):
+        pass
+    return time.perf_counter() - start
+
+
+def time_directory(input_directory, config_file, engine):
+    # Convert all the input files of the directory one after the other, like
+    # with `--input-directory`, returning the time it took
+    output_directory = tempfile.mkdtemp()
+    input_output_files = [
+        (os.path.join(input_directory, name), os.path.join(output_directory, name))
+        for name in sorted(os.listdir(input_directory))
+    ]
+    process_args = ("^", '"', 0, 0, None, "C", None, None, "utf-8", 1, engine)
+    start = time.perf_counter()
+    delimited2fixedwidth.process_files(input_output_files, config_file, process_args)
+    seconds = time.perf_counter() - start
+    shutil.rmtree(output_directory)
+    return seconds
+
+
+def get_input_bytes(input_path):
+    # Size of the input file, or of all the files of the input directory
+    if os.path.isdir(input_path):
+        return sum(
+            os.path.getsize(os.path.join(input_path, name))
+            for name in os.listdir(input_path)
+        )
+    return os.path.getsize(input_path)
+
+
+def measure(scenario, engine, input_path, config_file, num_rows, repeat):
+    # Best time out of `repeat` runs of the scenario, with the throughput and
+    # the peak memory usage. `input_path` can also be a directory, all of whose
+    # files get converted, `num_rows` being their total number of rows.
+    if scenario.startswith("format:"):
+        timer = time_conversion
+    elif os.path.isdir(input_path):
+        timer = time_directory
+    else:
+        timer = time_process
+    seconds = min(timer(input_path, config_file, engine) for _ in range(repeat))
+    input_bytes = get_input_bytes(input_path)
+    return {
+        "scenario": scenario,
+        "engine": engine,
+        "num_rows": num_rows,
+        "input_bytes": input_bytes,
+        "seconds": seconds,
+        "rows_per_second": num_rows / seconds,
+        "mb_per_second": input_bytes / 1024 / 1024 / seconds,
+        "peak_rss_bytes": delimited2fixedwidth.get_peak_rss(),
+    }
+
+
+def run_isolated(function, *args):
+    # Run the function in a new process, so that its peak memory usage only is
+    # that of that function (in a multiprocessing pool, ProcessPoolExecutor only
+    # accepting a "spawn" context from Python 3.7)
+    import multiprocessing
+
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(function, args)
+
+
+def measure_isolated(*args):
+    return run_isolated(measure, *args)
+
+
+def run_benchmarks(
+    num_rows=DEFAULT_NUM_ROWS,
+    num_columns=DEFAULT_NUM_COLUMNS,
+    mix=None,
+    field_width=DEFAULT_FIELD_WIDTH,
+    engines=None,
+    repeat=DEFAULT_REPEAT,
+    isolate=True,
+):
+    # Generate the workloads and run the scenarios on them, returning the
+    # results
+    mix = DEFAULT_MIX if mix is None else mix
+    engines = get_engines() if engines is None else engines
+    workloads = [("process", mix)]
+    workloads.extend(("format:%s" % kind, {kind: 1}) for kind in mix)
+    results = []
+    temp_dir = tempfile.mkdtemp()
+    try:
+        for (scenario, workload_mix) in workloads:
+            (input_file, config_file) = generate_workload(
+                temp_dir,
+                scenario.replace(":", "_").replace(" ", "_"),
+                num_rows,
+                num_columns,
+                workload_mix,
+                field_width,
+            )
+            for engine in engines:
+                logging.info(
+                    "Running the %s scenario with the %s engine", scenario, engine
+                )
+                args = (scenario, engine, input_file, config_file, num_rows, repeat)
+                results.append(measure_isolated(*args) if isolate else measure(*args))
+    finally:
+        shutil.rmtree(temp_dir)
+    return {
+        "version": delimited2fixedwidth.__version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "num_rows": num_rows,
+        "num_columns": num_columns,
+        "field_width": field_width,
+        "mix": mix,
+        "results": results,
+    }
+
+
+def format_results(results):
+    # The results as a table, one line per scenario and engine
+    lines = [
+        "%-20s %-7s %12s %10s %14s"
+        % ("Scenario", "Engine", "Rows/s", "MB/s", "Peak RSS (MB)")
+    ]
+    for result in results["results"]:
+        peak_rss = result["peak_rss_bytes"]
+        lines.append(
+            "%-20s %-7s %12d %10.1f %14s"
+            % (
+                result["scenario"],
+                result["engine"],
+                result["rows_per_second"],
+                result["mb_per_second"],
+                "n/a" if peak_rss is None else "%.1f" % (peak_rss / 1024 / 1024),
+            )
+        )
+    return "\n".join(lines)
+
+
+def parse_args(arguments):
+    parser = argparse.ArgumentParser(
+        description="Benchmark delimited2fixedwidth on synthetic workloads"
+    )
+    parser.add_argument(
+        "-r",
+        "--rows",
+        help="Number of rows of the generated input files (default %d)"
+        % DEFAULT_NUM_ROWS,
+        type=int,
+        default=DEFAULT_NUM_ROWS,
+    )
+    parser.add_argument(
+        "-c",
+        "--columns",
+        help="Number of columns of the generated input files (default %d)"
+        % DEFAULT_NUM_COLUMNS,
+        type=int,
+        default=DEFAULT_NUM_COLUMNS,
+    )
+    parser.add_argument(
+        "-m",
+        "--mix",
+        help="Kinds of columns of the input file of the 'process' scenario with "
+        "their weights, e.g. 'Integer=2,Date=1' (default '%s')"
+        % ",".join("%s=%d" % item for item in DEFAULT_MIX.items()),
+        type=parse_mix,
+    )
+    parser.add_argument(
+        "-fw",
+        "--field-width",
+        help="Length of the generated columns (default %d)" % DEFAULT_FIELD_WIDTH,
+        type=int,
+        default=DEFAULT_FIELD_WIDTH,
+    )
+    parser.add_argument(
+        "-e",
+        "--engines",
+        help="Comma-delimited list of the engines to benchmark (default all the "
+        "installed ones)",
+        type=lambda value: value.split(","),
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        help="Number of runs of each scenario, the best time being kept (default "
+        "%d)" % DEFAULT_REPEAT,
+        type=int,
+        default=DEFAULT_REPEAT,
+    )
+    parser.add_argument(
+        "-o", "--output", help="Save the results to this JSON file", action="store"
+    )
+    return parser.parse_args(arguments)
+
+
+def main(arguments):
+    args = parse_args(arguments)
+    results = run_benchmarks(
+        args.rows, args.columns, args.mix, args.field_width, args.engines, args.repeat
+    )
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(format="%(levelname)s: %(message)s", level=logging.INFO)
+    main(sys.argv[1:])
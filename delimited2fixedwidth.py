@@ -3,28 +3,101 @@
 
 #    This file is part of delimited2fixedwidth and is MIT-licensed.
 
-import argparse
+# Only the modules needed in all code paths get imported here, the others are
+# imported where they are used to keep the startup time of the program low
 import codecs
-import csv
-import datetime
+import collections
+import functools
+import io
+import itertools
 import logging
 import os
-import pathlib
 import re
-import shutil
 import sys
-from locale import LC_NUMERIC, atof, setlocale
-
-from openpyxl import load_workbook
+import threading
+from locale import LC_NUMERIC, localeconv, setlocale
 
 __version__ = "1.0.12-dev"
 
 SUPPORTED_OUTPUT_FORMATS = None
+NUMERIC_OUTPUT_FORMATS = ("Integer", "Decimal", "Keep numeric", "Time")
+TIME_PATTERN = re.compile(r"(\d{2})(:)?(\d{2})")
+NON_NUMERIC_PATTERN = re.compile(r"\D")
+DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# Maximum number of distinct values cached for each date format
+DATE_CACHE_SIZE = 4096
+# Number of implied decimal places for Decimal fields, unless defined otherwise
+# in the "Decimal places" column of the configuration file
+DEFAULT_DECIMAL_PLACES = 2
+# Number of rows converted at once by each worker process with `--jobs`
+PARALLEL_CHUNK_SIZE = 10000
+# State of the worker processes used with `--jobs`, see `init_conversion_worker`
+WORKER_STATE = {}
+# Whether the pools of processes accept an `initializer` (from Python 3.7), see
+# `get_process_pool`
+PROCESS_POOL_INITIALIZER = sys.version_info >= (3, 7)
+# Held while the process-global LC_NUMERIC locale is read or temporarily changed,
+# see `get_locale_separators`
+LOCALE_LOCK = threading.Lock()
+# Types of the workers converting the files concurrently with `--workers`
+WORKER_TYPES = ("process", "thread")
+# Default size (in bytes) of the buffer used to write the output files
+WRITE_BUFFER_SIZE = 1024 * 1024
+# Number of records joined together before being written to an output file
+WRITE_BATCH_SIZE = 1000
+# Conversion engines that can be selected with `--engine`
+SUPPORTED_ENGINES = ("python", "numpy")
+# Number of rows converted at once by the "numpy" engine
+NUMPY_BLOCK_SIZE = 8192
+# ASCII characters for which `str.isspace` is True
+ASCII_WHITESPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f "
+# Approximate number of bytes of a memory-mapped input file decoded at once
+MMAP_CHUNK_SIZE = 1024 * 1024
+# Number of bytes of a memory-mapped input file searched at once
+MMAP_SCAN_SIZE = 8 * 1024 * 1024
+# Alignment of the pages of a memory-mapped input file that get released from
+# the resident memory, the size of the largest blocks of the page cache (huge
+# pages), a multiple of the size of the memory pages
+MMAP_RELEASE_ALIGNMENT = 2 * 1024 * 1024
+# Line endings other than CRLF, which prevent splitting a file on "\r\n"
+NON_CRLF_PATTERN = re.compile(rb"\r(?!\n)|(?<!\r)\n")
+# Characters that end a line of the input file
+LINE_END_PATTERN = re.compile(rb"[\r\n]")
+# Default number of bytes of the input file converted between two checkpoints
+CHECKPOINT_INTERVAL = 64 * 1024 * 1024
+# Number of bytes at the end of the partially written output files whose
+# checksum is saved in the checkpoints, to validate these files when resuming
+CHECKPOINT_TAIL_SIZE = 4096
+# Stages of the conversion of an input file timed for `--stats`
+STATS_STAGES = ("load_config", "read", "convert", "write")
+# Number of items fetched at once by `iter_timed` and `iter_progress`, to only
+# read the clocks once per batch
+STATS_BATCH_SIZE = 1000
+# Interval (in seconds) at which the resident memory of the process is sampled
+# for `--memory-report`
+MEMORY_SAMPLE_INTERVAL = 0.01
+# Profilers that can be selected with `--profile-mode`
+PROFILE_MODES = ("cprofile", "sampling")
+# Interval (in seconds) at which the call stack gets sampled by the "sampling"
+# profiler, and number of functions saved in its report
+PROFILE_SAMPLE_INTERVAL = 0.01
+PROFILE_NUM_FUNCTIONS = 50
+# Rows of an input file logged by `RowTracer` when no `--trace-rows` argument
+# is given: (first, last, every)
+DEFAULT_TRACE_ROWS = (10, 10, 0)
+
+
+def get_supported_output_formats():
+    # The supported output formats only get defined once, when first needed
+    if SUPPORTED_OUTPUT_FORMATS is None:
+        define_supported_output_formats()
+    return SUPPORTED_OUTPUT_FORMATS
 
 
 def define_supported_output_formats():
     global SUPPORTED_OUTPUT_FORMATS
-    SUPPORTED_OUTPUT_FORMATS = [
+    # Only published once complete, for the threads started in the meantime
+    supported_output_formats = [
         "Integer",
         "Decimal",
         "Keep numeric",
@@ -38,25 +111,192 @@ def define_supported_output_formats():
         date_patterns.append("DD{0}MM{0}YYYY".format(d))
     for p1 in date_patterns:
         for p2 in date_patterns:
-            SUPPORTED_OUTPUT_FORMATS.append("Date ({0} to {1})".format(p2, p1))
+            supported_output_formats.append("Date ({0} to {1})".format(p2, p1))
+    SUPPORTED_OUTPUT_FORMATS = supported_output_formats
+
+
+class OutputWriter:
+    # Writes the records of an output file incrementally, separated by "\n"
+    # (without trailing newline). The records are written in batches through a
+    # buffer of `buffer_size` bytes to a temporary file in the same directory,
+    # which only replaces the output file once all the records have been
+    # written, so that the output file is never seen partially written.
+    # `fsync` is None to leave flushing the content to disk to the operating
+    # system, 0 to force it once all the records have been written, or a
+    # number of characters after which to force it (and at the end).
+    # With `resume_size`, the temporary file has a fixed name (see
+    # `get_resumable_temp_file`) so that the writing can be resumed after an
+    # interruption, keeping its first `resume_size` bytes (0 to start over).
+    def __init__(
+        self, output_file, buffer_size=WRITE_BUFFER_SIZE, fsync=None, resume_size=None
+    ):
+        self.output_file = output_file
+        self.fsync = fsync
+        self.pending = []
+        self.separator = ""
+        self.unsynced_size = 0
+        if resume_size is None:
+            (directory, filename) = os.path.split(output_file)
+            self.temp_file = os.path.join(
+                directory, ".%s.%s.tmp" % (filename, os.urandom(4).hex())
+            )
+            self.file = open(self.temp_file, "x", buffering=buffer_size)
+        else:
+            self.temp_file = get_resumable_temp_file(output_file)
+            with open(self.temp_file, "ab") as f:
+                f.truncate(resume_size)
+            self.file = open(self.temp_file, "a", buffering=buffer_size)
+            if resume_size > 0:
+                self.separator = "\n"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def write(self, record):
+        self.pending.append(record)
+        if len(self.pending) >= WRITE_BATCH_SIZE:
+            self.write_pending()
+
+    def write_records(self, records):
+        for record in records:
+            self.write(record)
+
+    def write_pending(self):
+        if not self.pending:
+            return
+        content = self.separator + "\n".join(self.pending)
+        self.pending.clear()
+        self.separator = "\n"
+        self.file.write(content)
+        if self.fsync:
+            self.unsynced_size += len(content)
+            if self.unsynced_size >= self.fsync:
+                self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced_size = 0
+
+    def checkpoint(self):
+        # Force the records written so far to disk, returning the size of the
+        # temporary file and the checksum of its end, to be validated by
+        # `resume_size_is_valid` before resuming
+        self.write_pending()
+        self.sync()
+        size = self.file.tell()
+        return [size, get_file_tail_checksum(self.temp_file, size)]
+
+    def close(self):
+        # Close the temporary file, leaving it to be resumed
+        self.file.close()
+
+    def commit(self):
+        # Replace the output file by the fully written temporary file
+        self.write_pending()
+        if self.fsync is not None:
+            self.sync()
+        self.file.close()
+        os.replace(self.temp_file, self.output_file)
+        if self.fsync is not None and os.name == "posix":
+            # The rename itself is only durable once the directory is synced
+            directory_fd = os.open(
+                os.path.dirname(self.output_file) or ".", os.O_RDONLY
+            )
+            try:
+                os.fsync(directory_fd)
+            finally:
+                os.close(directory_fd)
+
+    def abort(self):
+        # Discard the temporary file, leaving the output file untouched
+        try:
+            self.file.close()
+        finally:
+            if os.path.isfile(self.temp_file):
+                os.remove(self.temp_file)
+
+
+def get_resumable_temp_file(output_file):
+    # The temporary file of an `OutputWriter` created with `resume_size`
+    (directory, filename) = os.path.split(output_file)
+    return os.path.join(directory, ".%s.checkpoint.tmp" % filename)
+
+
+def get_file_tail_checksum(file_name, size):
+    # The CRC-32 of the last `CHECKPOINT_TAIL_SIZE` bytes of the first `size`
+    # bytes of the file
+    import zlib
+
+    with open(file_name, "rb") as f:
+        f.seek(max(size - CHECKPOINT_TAIL_SIZE, 0))
+        return zlib.crc32(f.read(min(size, CHECKPOINT_TAIL_SIZE)))
+
+
+def resume_size_is_valid(output_file, checkpoint):
+    # Whether the temporary file of the `OutputWriter` of `output_file` still
+    # starts with the content it had when `checkpoint()` returned `checkpoint`
+    (size, checksum) = checkpoint
+    temp_file = get_resumable_temp_file(output_file)
+    try:
+        return (
+            os.path.getsize(temp_file) >= size
+            and get_file_tail_checksum(temp_file, size) == checksum
+        )
+    except OSError:
+        return False
 
 
 def write_output_file(output_content, output_file):
-    with open(output_file, "w") as ofile:
-        ofile.write("\n".join(output_content))
+    with OutputWriter(output_file) as writer:
+        writer.write_records(output_content)
+
+
+def write_output_stream(
+    converted_content,
+    output_file,
+    diverted_output_file,
+    buffer_size=WRITE_BUFFER_SIZE,
+    fsync=None,
+):
+    # Write the (divert_row, record) pairs as they get produced instead of
+    # joining the whole content in memory first. The diverted output file is
+    # only created if at least one row actually gets diverted.
+    writer = OutputWriter(output_file, buffer_size, fsync)
+    diverted_writer = None
+    try:
+        for (divert_row, record) in converted_content:
+            if divert_row:
+                if diverted_writer is None:
+                    diverted_writer = OutputWriter(
+                        diverted_output_file, buffer_size, fsync
+                    )
+                diverted_writer.write(record)
+            else:
+                writer.write(record)
+        writer.commit()
+        if diverted_writer is not None:
+            diverted_writer.commit()
+    except BaseException:
+        # Don't leave partially-written output files behind
+        writer.abort()
+        if diverted_writer is not None:
+            diverted_writer.abort()
+        raise
+
+
+def is_numeric_output_format(output_format):
+    return output_format in NUMERIC_OUTPUT_FORMATS or output_format.startswith("Date (")
 
 
 def pad_output_value(val, output_format, length):
-    if (
-        output_format
-        in (
-            "Integer",
-            "Decimal",
-            "Keep numeric",
-            "Time",
-        )
-        or output_format.startswith("Date (")
-    ):
+    if is_numeric_output_format(output_format):
         # Numbers get padded with 0's added in front (to the left)
         val = str(val).zfill(length)
     else:
@@ -66,6 +306,66 @@ def pad_output_value(val, output_format, length):
     return val
 
 
+def make_padder(output_format, length):
+    # Same as `pad_output_value`, but with the padding type resolved only once
+    if is_numeric_output_format(output_format):
+
+        def pad(val):
+            return val.zfill(length)
+
+    else:
+
+        def pad(val):
+            return val.ljust(length)
+
+    return pad
+
+
+class ConversionError(Exception):
+    # Raised when a value can't be converted: `code` is the exit code used when
+    # stopping on the first error, and `idx_col` and `idx_row` the (1-based)
+    # field and row numbers of the value
+    def __init__(self, message, code, idx_col, idx_row):
+        super().__init__(message, code, idx_col, idx_row)
+        self.message = message
+        self.code = code
+        self.idx_col = idx_col
+        self.idx_row = idx_row
+
+    def __str__(self):
+        return self.message
+
+
+def exit_on_conversion_error(error):
+    logging.critical("%s Exiting..." % error)
+    sys.exit(error.code)
+
+
+def stop_conversion(error, raise_errors=False):
+    # Stop converting on a value that can't be converted: by raising its
+    # ConversionError in library mode, by stopping the program otherwise
+    if raise_errors:
+        raise error
+    exit_on_conversion_error(error)
+
+
+class ConfigError(ValueError):
+    # Raised when the configuration, or an argument referring to its fields, is
+    # invalid: `code` is the exit code used when stopping the program
+    def __init__(self, message, code):
+        super().__init__(message, code)
+        self.message = message
+        self.code = code
+
+    def __str__(self):
+        return self.message
+
+
+def exit_on_config_error(error):
+    logging.critical("%s Exiting..." % error)
+    sys.exit(error.code)
+
+
 def determine_date_delimiters(output_format):
     # Identify the delimiter in the input format
     supported_delimiters = ("/", "-", ".")
@@ -82,295 +382,2233 @@ def determine_date_delimiters(output_format):
     return (in_delim, out_delim)
 
 
-def parse_input_date(value, output_format, in_delim):
-    m = None
-    if output_format.startswith("Date (DD"):
-        m = re.match(
-            r"([0123]?\d){in_delim}([01]?\d){in_delim}(\d{{4}})".format(
-                in_delim=in_delim
-            ),
-            value,
+def is_valid_date(year, month, day):
+    # Same validation as `datetime.datetime.strptime` with "%Y%m%d", using
+    # plain arithmetic on the year, month and day numbers
+    if year < 1 or month < 1 or month > 12 or day < 1:
+        return False
+    if month == 2:
+        is_leap_year = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+        return day <= (29 if is_leap_year else 28)
+    return day <= DAYS_IN_MONTH[month - 1]
+
+
+class DateFormat:
+    # Parsed version of a "Date (... to ...)" output format: the input pattern
+    # is compiled once, and the converted values are cached since date fields
+    # usually only contain few distinct values
+    __slots__ = (
+        "output_format",
+        "in_delim",
+        "pattern",
+        "groups",
+        "out_template",
+        "out_order",
+        "convert_value",
+    )
+
+    def __init__(self, output_format, cache_size=DATE_CACHE_SIZE):
+        self.output_format = output_format
+        (in_delim, out_delim) = determine_date_delimiters(output_format)
+        self.in_delim = in_delim
+        # Position of the year, month and day groups in the input pattern
+        if output_format.startswith("Date (DD"):
+            pattern = r"([0123]?\d){0}([01]?\d){0}(\d{{4}})"
+            self.groups = (3, 2, 1)
+        elif output_format.startswith("Date (MM"):
+            pattern = r"([01]?\d){0}([0123]?\d){0}(\d{{4}})"
+            self.groups = (3, 1, 2)
+        else:
+            pattern = r"(\d{{4}}){0}([0123]?\d)([01]?\d)"
+            self.groups = (1, 2, 3)
+        self.pattern = re.compile(pattern.format(in_delim))
+        # Order of the year (0), month (1) and day (2) in the output value
+        out_format = output_format[output_format.index(" to ") + 4 : -1]
+        if out_format.startswith("YYYY"):
+            self.out_order = (0, 1, 2)
+        elif out_format.startswith("DD"):
+            self.out_order = (2, 1, 0)
+        else:
+            self.out_order = (1, 2, 0)
+        self.out_template = "%s{0}%s{0}%s".format(out_delim)
+        self.convert_value = functools.lru_cache(maxsize=cache_size)(self.parse)
+
+    def parse(self, value):
+        # Returns a (converted value, error code) tuple
+        if self.in_delim == "" and len(value) != 8:
+            return (None, 24)
+        m = self.pattern.match(value)
+        if not m:
+            return (None, 18)
+        (year_group, month_group, day_group) = self.groups
+        parts = (
+            m.group(year_group),
+            m.group(month_group).zfill(2),
+            m.group(day_group).zfill(2),
+        )
+        if not is_valid_date(int(parts[0]), int(parts[1]), int(parts[2])):
+            return (None, 18)
+        (first, second, third) = self.out_order
+        return (self.out_template % (parts[first], parts[second], parts[third]), None)
+
+    def convert(self, value, idx_col, idx_row):
+        (converted_value, error_code) = self.convert_value(value)
+        if error_code == 24:
+            raise ConversionError(
+                "Invalid date value '%s' for format '%s' in field %d on row %d "
+                "(ignoring the header), day and month must contain leading 0's."
+                % (value, self.output_format, idx_col, idx_row),
+                24,
+                idx_col,
+                idx_row,
+            )
+        elif error_code:
+            raise ConversionError(
+                "Invalid date value '%s' for format '%s' in field %d on row %d "
+                "(ignoring the header)."
+                % (value, self.output_format, idx_col, idx_row),
+                18,
+                idx_col,
+                idx_row,
+            )
+        return converted_value
+
+
+@functools.lru_cache(maxsize=None)
+def get_date_format(output_format):
+    return DateFormat(output_format)
+
+
+def convert_date(value, output_format, idx_col, idx_row):
+    return get_date_format(output_format).convert(value, idx_col, idx_row)
+
+
+def convert_integer(value, idx_col, idx_row):
+    if str(value).strip() == "":
+        value = "0"
+    return value
+
+
+def convert_keep_numeric(value, idx_col, idx_row):
+    # Strip all non-numeric characters
+    value = NON_NUMERIC_PATTERN.sub("", value)
+    if value == "":
+        value = "0"
+    return value
+
+
+def convert_time(value, idx_col, idx_row):
+    m = TIME_PATTERN.match(value)
+    if not m:
+        raise ConversionError(
+            "Invalid time format '%s' in field %d on row %d (ignoring the header)."
+            % (value, idx_col, idx_row),
+            17,
+            idx_col,
+            idx_row,
         )
-    elif output_format.startswith("Date (MM"):
-        m = re.match(
-            r"([01]?\d){in_delim}([0123]?\d){in_delim}(\d{{4}})".format(
-                in_delim=in_delim
+    return "%s%s" % (m.group(1), m.group(3))
+
+
+class DecimalFormat:
+    # Converts decimal numbers to integers with a number of implied decimal
+    # places (e.g. "1.36" to "136" with 2 decimal places), rounding half up.
+    # The separators are set once instead of being read from the locale for each
+    # value, and the conversion uses exact integer arithmetic instead of floats.
+    __slots__ = ("decimal_point", "thousands_sep", "decimal_places")
+
+    def __init__(self, decimal_point=".", thousands_sep="", decimal_places=2):
+        self.decimal_point = decimal_point
+        self.thousands_sep = thousands_sep
+        self.decimal_places = decimal_places
+
+    def parse(self, value):
+        # Returns None if the value is not a valid number
+        value = str(value).strip()
+        if value == "":
+            return "0"
+        if self.thousands_sep:
+            value = value.replace(self.thousands_sep, "")
+        sign = ""
+        if value[:1] in ("+", "-"):
+            sign = value[0]
+            value = value[1:]
+        (int_part, _, frac_part) = value.partition(self.decimal_point)
+        if (int_part.isdecimal() or (int_part == "" and frac_part.isdecimal())) and (
+            frac_part == "" or frac_part.isdecimal()
+        ):
+            places = self.decimal_places
+            converted_value = int(
+                (int_part or "0") + frac_part[:places].ljust(places, "0")
+            )
+            if len(frac_part) > places and int(frac_part[places]) >= 5:
+                converted_value += 1
+        else:
+            # Other notations supported by `locale.atof`, such as exponents
+            converted_value = self.parse_other_notation(sign + value)
+            if converted_value is None:
+                return None
+            sign = ""
+        if sign == "-" and converted_value:
+            return "-%d" % converted_value
+        return str(converted_value)
+
+    def parse_other_notation(self, value):
+        # Same syntax as accepted by `locale.atof`, but without rounding errors
+        import decimal
+        import math
+
+        if self.decimal_point != ".":
+            value = value.replace(self.decimal_point, ".")
+        try:
+            if not math.isfinite(float(value)):
+                return None
+        except ValueError:
+            return None
+        (sign, digits, exponent) = decimal.Decimal(value).as_tuple()
+        converted_value = int("".join(map(str, digits)))
+        exponent += self.decimal_places
+        if exponent >= 0:
+            converted_value *= 10**exponent
+        else:
+            (converted_value, remainder) = divmod(converted_value, 10**-exponent)
+            if 2 * remainder >= 10**-exponent:
+                converted_value += 1
+        return -converted_value if sign else converted_value
+
+    def convert(self, value, idx_col, idx_row):
+        converted_value = self.parse(value)
+        if converted_value is None:
+            raise ConversionError(
+                "Invalid decimal format '%s' in field %d on row %d (ignoring the "
+                "header)." % (value, idx_col, idx_row),
+                19,
+                idx_col,
+                idx_row,
+            )
+        return converted_value
+
+
+def get_locale_separators(locale=None):
+    # The decimal and thousands separators of the LC_NUMERIC `locale` ("" being
+    # the user's default locale), by default of the current one. The locale being
+    # global to the process, it only gets changed for as long as needed to read
+    # its separators, so that conversions using different locales can run
+    # concurrently in threads of the same process. Raises `locale.Error` if the
+    # locale isn't available.
+    with LOCALE_LOCK:
+        if locale is None:
+            conventions = localeconv()
+        else:
+            current_locale = setlocale(LC_NUMERIC)
+            try:
+                setlocale(LC_NUMERIC, locale)
+                conventions = localeconv()
+            finally:
+                setlocale(LC_NUMERIC, current_locale)
+    return (conventions["decimal_point"], conventions["thousands_sep"])
+
+
+def convert_decimal(value, idx_col, idx_row):
+    # Decimal numbers must be sent with 2 decimal places and
+    # *without* the decimal separator, respecting the user's Locale
+    return DecimalFormat(*get_locale_separators()).convert(value, idx_col, idx_row)
+
+
+def convert_text(value, idx_col, idx_row):
+    return value
+
+
+def check_output_format(output_format):
+    supported_output_formats = get_supported_output_formats()
+    if output_format not in supported_output_formats:
+        raise ConfigError(
+            "Invalid output format '%s', must be one of '%s'."
+            % (
+                output_format,
+                "', '".join(supported_output_formats),
             ),
-            value,
+            27,
         )
-    elif output_format.startswith("Date (YYYY"):
-        m = re.match(
-            r"(\d{{4}}){in_delim}([0123]?\d)([01]?\d)".format(in_delim=in_delim), value
+
+
+@functools.lru_cache(maxsize=None)
+def get_cell_converter(output_format):
+    # Resolve the conversion function for an output format once, instead of
+    # validating and parsing the output format for every single cell
+    try:
+        check_output_format(output_format)
+    except ConfigError as e:
+        exit_on_config_error(e)
+    if output_format.startswith("Date ("):
+        return get_date_format(output_format).convert
+    return CELL_CONVERTERS[output_format]
+
+
+def convert_cell(value, output_format, idx_col, idx_row):
+    try:
+        return get_cell_converter(output_format)(value, idx_col, idx_row)
+    except ConversionError as e:
+        exit_on_conversion_error(e)
+
+
+class ColumnSpec:
+    # Compiled version of a field defined in the configuration file, with the
+    # conversion and padding functions resolved once for the whole file
+    __slots__ = (
+        "length",
+        "output_format",
+        "skip_field",
+        "truncate",
+        "divert_values",
+        "value_format",
+        "convert",
+        "pad",
+        "empty_value",
+        "stats",
+    )
+
+    def __init__(
+        self,
+        length,
+        output_format,
+        skip_field,
+        truncate=False,
+        divert_values=None,
+        value_format=None,
+    ):
+        self.length = length
+        self.output_format = output_format
+        self.skip_field = skip_field
+        self.truncate = truncate
+        self.divert_values = divert_values
+        # Optional object whose `convert` method replaces the default
+        # conversion of the output format, e.g. a `DecimalFormat`
+        self.value_format = value_format
+        self.convert = get_cell_converter(output_format)
+        if value_format is not None:
+            self.convert = value_format.convert
+        self.pad = make_padder(output_format, length)
+        self.empty_value = self.pad("")
+        # Statistics of the values of that output format for `--stats`, see
+        # `add_format_stats`
+        self.stats = None
+
+
+def compile_config(
+    config, truncate=None, divert=None, separators=None, format_stats=None
+):
+    # `separators` is a (decimal point, thousands separator) tuple, by default
+    # those of the current locale. With a `format_stats` dictionary, the
+    # conversion of the values gets timed per output format (see
+    # `add_format_stats`).
+    if separators is None:
+        separators = get_locale_separators()
+    columns = []
+    for idx_col, field in enumerate(config or []):
+        divert_values = None
+        if divert and idx_col + 1 in divert:
+            divert_values = frozenset(divert[idx_col + 1])
+        value_format = None
+        if field["output_format"] == "Decimal":
+            decimal_places = field.get("decimal_places", DEFAULT_DECIMAL_PLACES)
+            value_format = DecimalFormat(*separators, decimal_places)
+        columns.append(
+            ColumnSpec(
+                field["length"],
+                field["output_format"],
+                field["skip_field"],
+                bool(truncate) and idx_col + 1 in truncate,
+                divert_values,
+                value_format,
+            )
         )
-    year = None
-    month = None
-    day = None
-    if m:
-        if output_format.startswith("Date (DD"):
-            year = m.group(3)
-            month = m.group(2).zfill(2)
-            day = m.group(1).zfill(2)
-        elif output_format.startswith("Date (MM"):
-            year = m.group(3)
-            month = m.group(1).zfill(2)
-            day = m.group(2).zfill(2)
-        elif output_format.startswith("Date (YYYY"):
-            year = m.group(1)
-            month = m.group(2).zfill(2)
-            day = m.group(3).zfill(2)
-    return (year, month, day)
-
-
-def generate_output_date(year, month, day, output_format, out_delim):
-    converted_value = ""
-    if output_format.endswith(
-        " to YYYY{out_delim}MM{out_delim}DD)".format(out_delim=out_delim)
+    if format_stats is not None:
+        for column in columns:
+            add_format_stats(column, format_stats)
+    return columns
+
+
+def get_empty_format_stats():
+    return {"num_values": 0, "convert_seconds": 0.0, "pad_seconds": 0.0}
+
+
+def add_format_stats(column, format_stats):
+    # Replace the conversion and padding functions of the column by functions
+    # also counting the values and the time spent on them, in the entry of
+    # `format_stats` for its output format. The wrapped functions only exist
+    # while collecting the statistics, so they cost nothing otherwise.
+    import time
+
+    if column.skip_field:
+        return
+    column.stats = format_stats.setdefault(
+        column.output_format, get_empty_format_stats()
+    )
+    stats = column.stats
+    perf_counter = time.perf_counter
+    convert = column.convert
+    pad = column.pad
+
+    def timed_convert(value, idx_col, idx_row):
+        start = perf_counter()
+        value = convert(value, idx_col, idx_row)
+        stats["convert_seconds"] += perf_counter() - start
+        stats["num_values"] += 1
+        return value
+
+    def timed_pad(value):
+        start = perf_counter()
+        value = pad(value)
+        stats["pad_seconds"] += perf_counter() - start
+        return value
+
+    column.convert = timed_convert
+    column.pad = timed_pad
+
+
+def merge_format_stats(format_stats, other_format_stats):
+    # Add to `format_stats` the statistics of other values per output format
+    for (output_format, other_stats) in other_format_stats.items():
+        stats = format_stats.setdefault(output_format, get_empty_format_stats())
+        for key in stats:
+            stats[key] += other_stats[key]
+
+
+def pop_format_stats(format_stats):
+    # Copy of `format_stats`, whose statistics are reset
+    copy = {key: dict(stats) for (key, stats) in format_stats.items()}
+    for stats in format_stats.values():
+        stats.update(get_empty_format_stats())
+    return copy
+
+
+def truncate_cell(cell, column, idx_col, idx_row):
+    # Confirm that the length of the field (before padding) is less
+    # than the maximum allowed length
+    if not column.truncate:
+        raise ConversionError(
+            "Field %d on row %d (ignoring the header) is too long! Length: "
+            "%d, max length %d." % (idx_col, idx_row, len(cell), column.length),
+            20,
+            idx_col,
+            idx_row,
+        )
+    # Truncate to the defined maximum field length. The truncated values only
+    # get counted in the report of the conversion, which logs them once per
+    # input file (see `log_report`)
+    logging.debug(
+        "Field %d on row %d (ignoring the header) is too long! Length: "
+        "%d, max length %d. Truncating field to its max length.",
+        idx_col,
+        idx_row,
+        len(cell),
+        column.length,
+    )
+    return cell[: column.length]
+
+
+def iter_convert_rows(
+    input_content,
+    columns,
+    date_field_to_report_on=None,
+    report=None,
+    first_row=1,
+    rejected_rows=None,
+    raise_errors=False,
+):
+    # Convert the rows using the compiled configuration from `compile_config`,
+    # yielding one (divert_row, record) tuple per input row. The number of rows,
+    # the oldest/most recent dates, the number of diverted rows and the number
+    # of truncated values (in total and per field) are stored in the optional
+    # `report` dictionary once the input is exhausted (see `get_empty_report`).
+    # `first_row` is the (1-based) row number of the first row, as reported in
+    # error messages.
+    # By default, the first value that can't be converted stops the program, or
+    # raises its ConversionError with `raise_errors`. If `rejected_rows` is a
+    # list, the rows with such a value are skipped instead and appended to it
+    # as (ConversionError, row) tuples.
+    num_columns = len(columns)
+    # Empty padding for the fields defined in the configuration file but not
+    # present in a row, indexed by the number of fields present in that row
+    missing_fields_padding = [
+        "".join(column.empty_value for column in columns[idx:])
+        for idx in range(num_columns + 1)
+    ]
+    date_idx = -1
+    if date_field_to_report_on:
+        # Argument is 1-based
+        date_idx = date_field_to_report_on - 1
+    last_row = first_row - 1
+    oldest_date = "99999999"
+    most_recent_date = "00000000"
+    num_diverted = 0
+    num_truncated = 0
+    truncated_fields = [0] * num_columns
+    for idx_row, row in enumerate(input_content, first_row):
+        last_row = idx_row
+        num_fields = len(row)
+        converted_row_content = []
+        divert_row = False
+        date_value = None
+        try:
+            # Confirm that the input_content doesn't have more fields than are
+            # defined in the configuration file
+            if num_fields > num_columns:
+                raise ConversionError(
+                    "Row %d (ignoring the header) has more fields than are defined "
+                    "in the configuration file! The row has %d fields while the "
+                    "configuration defines only %d possible fields."
+                    % (idx_row, num_fields, num_columns),
+                    23,
+                    num_columns + 1,
+                    idx_row,
+                )
+            for idx_col, cell in enumerate(row):
+                column = columns[idx_col]
+
+                if column.divert_values and str(cell) in column.divert_values:
+                    # This field contains a value marked for content diversion
+                    # The content for the entire row will be diverted to a
+                    # separate file
+                    if not divert_row:
+                        num_diverted += 1
+                    divert_row = True
+
+                if column.skip_field:
+                    padded_output_value = column.empty_value
+                else:
+                    cell = column.convert(cell, idx_col + 1, idx_row)
+                    if len(cell) > column.length:
+                        cell = truncate_cell(cell, column, idx_col + 1, idx_row)
+                        num_truncated += 1
+                        truncated_fields[idx_col] += 1
+                    padded_output_value = column.pad(cell)
+                converted_row_content.append(padded_output_value)
+
+                if idx_col == date_idx:
+                    date_value = padded_output_value
+        except ConversionError as e:
+            if rejected_rows is None:
+                stop_conversion(e, raise_errors)
+            rejected_rows.append((e, row))
+            if divert_row:
+                num_diverted -= 1
+            continue
+        # Process fields not in the input content but defined in the
+        # configuration file: empty padding, based on the defined output format
+        converted_row_content.append(missing_fields_padding[num_fields])
+        if date_value is not None:
+            if date_value < oldest_date:
+                oldest_date = date_value
+            if date_value > most_recent_date:
+                most_recent_date = date_value
+        yield (divert_row, "".join(converted_row_content))
+
+    if report is not None:
+        report["num_rows"] = last_row - first_row + 1
+        report["oldest_date"] = oldest_date
+        report["most_recent_date"] = most_recent_date
+        report["num_diverted"] = num_diverted
+        report["num_truncated"] = num_truncated
+        report["truncated_fields"] = truncated_fields
+
+
+def get_empty_report():
+    # The report of the conversion of no rows, see `iter_convert_rows`
+    return {
+        "num_rows": 0,
+        "oldest_date": "99999999",
+        "most_recent_date": "00000000",
+        "num_diverted": 0,
+        "num_truncated": 0,
+        # Number of truncated values of each field, in the order of the fields
+        "truncated_fields": [],
+    }
+
+
+def merge_report(report, other_report):
+    # Add to `report` the report of the conversion of other rows
+    report["num_rows"] += other_report["num_rows"]
+    report["oldest_date"] = min(report["oldest_date"], other_report["oldest_date"])
+    report["most_recent_date"] = max(
+        report["most_recent_date"], other_report["most_recent_date"]
+    )
+    report["num_diverted"] += other_report["num_diverted"]
+    report["num_truncated"] += other_report["num_truncated"]
+    truncated_fields = report["truncated_fields"]
+    for (idx, num_truncated) in enumerate(other_report["truncated_fields"]):
+        if idx < len(truncated_fields):
+            truncated_fields[idx] += num_truncated
+        else:
+            truncated_fields.append(num_truncated)
+
+
+def log_report(input_file, report):
+    # Log the truncated values once per input file and field, rather than once
+    # per value
+    for (idx_col, num_truncated) in enumerate(report["truncated_fields"], 1):
+        if num_truncated:
+            logging.info(
+                "%d values of field %d of the input file %s were too long and got "
+                "truncated to their max length",
+                num_truncated,
+                idx_col,
+                input_file,
+            )
+
+
+def get_numpy_codes(values):
+    # Matrix of the Unicode code points of a numpy array of strings, with one row
+    # per string padded with zeros, and the length of each string
+    import numpy
+
+    codes = values.view(numpy.uint32).reshape(len(values), -1)
+    return (codes, numpy.count_nonzero(codes, axis=1))
+
+
+def fill_empty_numpy(codes, lengths, empty):
+    # Replace the values flagged in `empty` by "0"
+    if empty.any():
+        codes = codes.copy()
+        lengths = lengths.copy()
+        codes[empty] = 0
+        codes[empty, 0] = ord("0")
+        lengths[empty] = 1
+    return (codes, lengths)
+
+
+def is_digit_numpy(codes):
+    return (codes >= ord("0")) & (codes <= ord("9"))
+
+
+def is_ascii_whitespace_numpy(codes):
+    import numpy
+
+    return numpy.isin(codes, [ord(c) for c in ASCII_WHITESPACE])
+
+
+def convert_integers_numpy(codes, lengths):
+    # Same as `convert_integer` for ASCII values
+    blank = (is_ascii_whitespace_numpy(codes) | (codes == 0)).all(axis=1)
+    return fill_empty_numpy(codes, lengths, blank)
+
+
+def convert_keep_numeric_numpy(codes, lengths):
+    # Same as `convert_keep_numeric` for ASCII values: the digits are moved to
+    # the front of each row, keeping their order
+    import numpy
+
+    digits = is_digit_numpy(codes)
+    order = numpy.argsort(~digits, axis=1, kind="stable")
+    codes = numpy.take_along_axis(codes, order, axis=1)
+    lengths = numpy.count_nonzero(digits, axis=1)
+    codes *= numpy.arange(codes.shape[1]) < lengths[:, None]
+    return fill_empty_numpy(codes, lengths, lengths == 0)
+
+
+def convert_times_numpy(codes, lengths):
+    # Same as `convert_time`, returns None if any value is invalid
+    import numpy
+
+    if codes.shape[1] < 5:
+        codes = numpy.pad(codes, ((0, 0), (0, 5 - codes.shape[1])))
+    digits = is_digit_numpy(codes[:, :5])
+    with_colon = digits[:, [0, 1, 3, 4]].all(axis=1) & (codes[:, 2] == ord(":"))
+    without_colon = digits[:, :4].all(axis=1)
+    if not (with_colon | without_colon).all():
+        return None
+    codes = numpy.where(with_colon[:, None], codes[:, [0, 1, 3, 4]], codes[:, :4])
+    return (codes, numpy.full(len(codes), 4))
+
+
+def convert_decimals_numpy(values, codes, lengths, decimal_format):
+    # Same as `DecimalFormat.parse`, returns None if any value is invalid. The
+    # plain ASCII numbers with at most 18 significant digits are converted using
+    # 64-bit integers, the other values (e.g. with exponents or whitespace) are
+    # parsed one by one.
+    import numpy
+
+    places = decimal_format.decimal_places
+    decimal_point = decimal_format.decimal_point
+    thousands_sep = decimal_format.thousands_sep
+    (num_rows, width) = codes.shape
+    fast = numpy.zeros(num_rows, dtype=bool)
+    if (
+        len(decimal_point) == 1
+        and len(thousands_sep) <= 1
+        and is_ascii(decimal_point + thousands_sep)
+        and places < 18
     ):
-        converted_value = "%s%s%s%s%s" % (year, out_delim, month, out_delim, day)
-    if output_format.endswith(
-        " to DD{out_delim}MM{out_delim}YYYY)".format(out_delim=out_delim)
+        fast = (codes < 128).all(axis=1) & (lengths > 0)
+        fast &= ~is_ascii_whitespace_numpy(codes).any(axis=1)
+        positions = numpy.arange(width)
+        if thousands_sep:
+            separators = codes == ord(thousands_sep)
+            if separators.any():
+                order = numpy.argsort(separators, axis=1, kind="stable")
+                codes = numpy.take_along_axis(codes, order, axis=1)
+                lengths = lengths - numpy.count_nonzero(separators, axis=1)
+                codes = codes * (positions < lengths[:, None])
+        negative = codes[:, 0] == ord("-")
+        signed = negative | (codes[:, 0] == ord("+"))
+        body = (positions >= signed[:, None]) & (positions < lengths[:, None])
+        points = (codes == ord(decimal_point)) & body
+        num_points = numpy.count_nonzero(points, axis=1)
+        point_position = numpy.where(num_points == 1, points.argmax(axis=1), lengths)
+        digits = is_digit_numpy(codes) & body
+        int_length = point_position - signed
+        fast &= (num_points <= 1) & (digits | points | ~body).all(axis=1)
+        fast &= (int_length > 0) | (lengths - point_position > 1)
+        fast &= int_length + places <= 18
+        # The digits up to `last_position` are kept in the converted value, the
+        # next one is used to round it
+        last_position = point_position + places
+        kept = digits & (positions <= last_position[:, None]) & fast[:, None]
+        converted_values = numpy.zeros(num_rows, dtype=numpy.int64)
+        for position in range(width):
+            converted_values = numpy.where(
+                kept[:, position],
+                converted_values * 10 + (codes[:, position] - ord("0")),
+                converted_values,
+            )
+        # Add the missing decimal places
+        kept_places = numpy.minimum(lengths - 1, last_position) - point_position
+        converted_values *= numpy.int64(10) ** (places - numpy.maximum(kept_places, 0))
+        # Round half up
+        round_position = numpy.minimum(last_position + 1, width - 1)
+        round_digits = numpy.take_along_axis(codes, round_position[:, None], axis=1)
+        converted_values += (last_position + 1 < lengths) & (
+            round_digits[:, 0] >= ord("5")
+        )
+        converted_values = numpy.where(negative, -converted_values, converted_values)
+        converted = converted_values.astype(str)
+    else:
+        converted = numpy.zeros(num_rows, dtype="U1")
+    slow = numpy.flatnonzero(~fast)
+    if len(slow):
+        parsed = [decimal_format.parse(value) for value in values[slow].tolist()]
+        if None in parsed:
+            return None
+        width = max(converted.itemsize // 4, max(map(len, parsed)))
+        converted = converted.astype("U%d" % width)
+        converted[slow] = parsed
+    return get_numpy_codes(converted)
+
+
+def convert_dates_numpy(values, date_format):
+    # Same as `DateFormat.convert`, returns None if any value is invalid. Each
+    # distinct value only gets converted once.
+    import numpy
+
+    (unique_values, inverse) = numpy.unique(values, return_inverse=True)
+    converted = []
+    for value in unique_values.tolist():
+        (converted_value, error_code) = date_format.convert_value(value)
+        if error_code:
+            return None
+        converted.append(converted_value)
+    return get_numpy_codes(numpy.array(converted)[inverse.ravel()])
+
+
+def convert_column_numpy(values, codes, lengths, column):
+    # Convert the values of a column with vectorized operations, returning the
+    # code points and lengths of the converted values, or None if the values
+    # can't be converted that way (e.g. invalid values)
+    import numpy
+
+    output_format = column.output_format
+    if output_format == "Text":
+        return (codes, lengths)
+    if output_format.startswith("Date ("):
+        return convert_dates_numpy(values, get_date_format(output_format))
+    if output_format == "Time":
+        return convert_times_numpy(codes, lengths)
+    if output_format == "Decimal":
+        decimal_format = column.value_format
+        if decimal_format is None:
+            decimal_format = DecimalFormat(*get_locale_separators())
+        return convert_decimals_numpy(values, codes, lengths, decimal_format)
+    if not (codes < 128).all():
+        # Converted one by one, these conversions can't fail
+        converted = [column.convert(value, 0, 0) for value in values.tolist()]
+        return get_numpy_codes(numpy.array(converted, dtype=str))
+    if output_format == "Integer":
+        return convert_integers_numpy(codes, lengths)
+    return convert_keep_numeric_numpy(codes, lengths)
+
+
+def pad_column_numpy(codes, lengths, column):
+    # Fixed-width matrix of the padded values of a column, which must not be
+    # longer than the length of the column, see `make_padder`
+    import numpy
+
+    length = column.length
+    if length == 0:
+        return numpy.empty((len(codes), 0), dtype=numpy.uint32)
+    values = numpy.ascontiguousarray(codes).view(numpy.dtype(("U", codes.shape[1])))
+    if is_numeric_output_format(column.output_format):
+        padded = numpy.char.zfill(values.ravel(), length)
+    else:
+        padded = numpy.char.ljust(values.ravel(), length)
+    return padded.view(numpy.uint32).reshape(len(codes), -1)[:, :length]
+
+
+def split_block_numpy(rows, num_columns):
+    # Transpose a block of rows to columns: all the values are encoded at once
+    # to their Unicode code points, separated by NUL characters, from which the
+    # (code points matrix, lengths) of each column get extracted. Returns None
+    # if that's not possible, e.g. if a value isn't a string or contains NUL
+    # characters.
+    import numpy
+
+    try:
+        text = "\x00".join(itertools.chain.from_iterable(rows)) + "\x00"
+        buffer = text.encode("utf-32-le")
+    except (TypeError, UnicodeEncodeError):
+        return None
+    codes = numpy.frombuffer(buffer, dtype="<u4").astype(numpy.uint32, copy=False)
+    ends = numpy.flatnonzero(codes == 0)
+    if len(ends) != len(rows) * num_columns:
+        return None
+    # One row per column
+    starts = numpy.concatenate(([0], ends[:-1] + 1)).reshape(len(rows), num_columns)
+    lengths = ends.reshape(len(rows), num_columns) - starts
+    starts = numpy.ascontiguousarray(starts.T)
+    lengths = numpy.ascontiguousarray(lengths.T)
+    columns = []
+    for (column_starts, column_lengths) in zip(starts, lengths):
+        positions = numpy.arange(max(int(column_lengths.max()), 1))
+        column_codes = numpy.take(
+            codes, column_starts[:, None] + positions, mode="clip"
+        )
+        column_codes *= positions < column_lengths[:, None]
+        columns.append((column_codes, column_lengths))
+    return columns
+
+
+def convert_block_numpy(rows, columns, date_idx, report):
+    # Convert a block of rows for `iter_convert_rows_numpy`, returning the
+    # (divert_row, record) tuples, or None if the block must be converted by
+    # `iter_convert_rows` instead
+    import time
+
+    import numpy
+
+    record_length = sum(column.length for column in columns)
+    if record_length == 0 or set(map(len, rows)) != {len(columns)}:
+        return None
+    split_columns = split_block_numpy(rows, len(columns))
+    if split_columns is None:
+        return None
+    records = numpy.empty((len(rows), record_length), dtype=numpy.uint32)
+    divert_rows = numpy.zeros(len(rows), dtype=bool)
+    report.update(get_empty_report())
+    report["truncated_fields"] = [0] * len(columns)
+    position = 0
+    for (idx_col, (column, (codes, lengths))) in enumerate(zip(columns, split_columns)):
+        values = codes.view(numpy.dtype(("U", codes.shape[1]))).ravel()
+        if column.divert_values:
+            divert_rows |= numpy.isin(values, list(column.divert_values))
+        end = position + column.length
+        if column.skip_field:
+            records[:, position:end] = ord(column.empty_value[:1] or " ")
+        else:
+            start = time.perf_counter()
+            converted = convert_column_numpy(values, codes, lengths, column)
+            if column.stats is not None:
+                column.stats["convert_seconds"] += time.perf_counter() - start
+            if converted is None:
+                return None
+            (codes, lengths) = converted
+            if (lengths > column.length).any():
+                if not column.truncate or logging.getLogger().isEnabledFor(
+                    logging.DEBUG
+                ):
+                    # Let `iter_convert_rows` report the error, or log each
+                    # truncated field
+                    return None
+                num_truncated = int((lengths > column.length).sum())
+                report["num_truncated"] += num_truncated
+                report["truncated_fields"][idx_col] += num_truncated
+                codes = codes[:, : column.length]
+                lengths = numpy.minimum(lengths, column.length)
+            start = time.perf_counter()
+            records[:, position:end] = pad_column_numpy(codes, lengths, column)
+            if column.stats is not None:
+                column.stats["pad_seconds"] += time.perf_counter() - start
+        if idx_col == date_idx:
+            padded_values = [""]
+            if column.length:
+                padded_values = numpy.unique(
+                    numpy.ascontiguousarray(records[:, position:end])
+                    .view(numpy.dtype(("U", column.length)))
+                    .ravel()
+                ).tolist()
+            report["oldest_date"] = min(report["oldest_date"], padded_values[0])
+            report["most_recent_date"] = max(
+                report["most_recent_date"], padded_values[-1]
+            )
+        position = end
+    records = records.view(numpy.dtype(("U", record_length))).ravel().tolist()
+    report["num_rows"] = len(rows)
+    report["num_diverted"] = int(divert_rows.sum())
+    for column in columns:
+        if column.stats is not None:
+            column.stats["num_values"] += len(rows)
+    return zip(divert_rows.tolist(), records)
+
+
+def iter_convert_rows_numpy(
+    input_content,
+    columns,
+    date_field_to_report_on=None,
+    report=None,
+    first_row=1,
+    rejected_rows=None,
+    raise_errors=False,
+):
+    # Same as `iter_convert_rows`, but converting blocks of rows at once: each
+    # block is transposed to columns that get converted, validated and padded
+    # with vectorized NumPy operations, before being assembled into fixed-width
+    # records. The blocks that can't be converted that way (e.g. rows with
+    # missing fields, invalid values or too long fields) are converted by
+    # `iter_convert_rows`, which also reports the errors.
+    date_idx = -1
+    if date_field_to_report_on:
+        # Argument is 1-based
+        date_idx = date_field_to_report_on - 1
+    total_report = get_empty_report()
+    input_content = iter(input_content)
+    while True:
+        rows = list(itertools.islice(input_content, NUMPY_BLOCK_SIZE))
+        if not rows:
+            break
+        block_report = {}
+        converted_rows = convert_block_numpy(rows, columns, date_idx, block_report)
+        if converted_rows is None:
+            converted_rows = iter_convert_rows(
+                rows,
+                columns,
+                date_field_to_report_on,
+                block_report,
+                first_row + total_report["num_rows"],
+                rejected_rows,
+                raise_errors,
+            )
+        yield from converted_rows
+        merge_report(total_report, block_report)
+
+    if report is not None:
+        report.update(total_report)
+
+
+def get_rows_converter(engine):
+    # The function converting the rows for the given `--engine`
+    if engine == "numpy":
+        return iter_convert_rows_numpy
+    return iter_convert_rows
+
+
+def iter_convert_content(
+    input_content,
+    config,
+    date_field_to_report_on=None,
+    truncate=None,
+    divert=None,
+    report=None,
+    engine="python",
+    rejected_rows=None,
+    first_row=1,
+    format_stats=None,
+    separators=None,
+):
+    # Generator version of `convert_content`, see `iter_convert_rows`. The
+    # decimal `separators` are by default those of the current locale.
+    columns = compile_config(config, truncate, divert, separators, format_stats)
+    return get_rows_converter(engine)(
+        input_content,
+        columns,
+        date_field_to_report_on,
+        report,
+        first_row,
+        rejected_rows,
+    )
+
+
+def init_conversion_worker(
+    config,
+    date_field_to_report_on,
+    truncate,
+    divert,
+    locale,
+    engine="python",
+    reject_rows=False,
+    collect_format_stats=False,
+):
+    # Runs once in each worker process of the pool used by
+    # `iter_convert_content_parallel`, to compile the configuration only once
+    get_supported_output_formats()
+    WORKER_STATE["format_stats"] = {} if collect_format_stats else None
+    WORKER_STATE["columns"] = compile_config(
+        config,
+        truncate,
+        divert,
+        get_locale_separators(locale),
+        WORKER_STATE["format_stats"],
+    )
+    WORKER_STATE["date_field_to_report_on"] = date_field_to_report_on
+    WORKER_STATE["convert_rows"] = get_rows_converter(engine)
+    WORKER_STATE["reject_rows"] = reject_rows
+
+
+def convert_chunk(first_row, rows):
+    # Convert a chunk of rows in a worker process. The converted records are
+    # returned in their original order, separately for the main and the
+    # diverted output, together with the report for that chunk. When rejecting
+    # the rows that can't be converted, these are part of the report, as are
+    # the statistics per output format when collecting them.
+    output_content = []
+    diverted_output_content = []
+    report = {}
+    rejected_rows = None
+    if WORKER_STATE.get("reject_rows"):
+        rejected_rows = report["rejected_rows"] = []
+    for (divert_row, record) in WORKER_STATE["convert_rows"](
+        rows,
+        WORKER_STATE["columns"],
+        WORKER_STATE["date_field_to_report_on"],
+        report,
+        first_row,
+        rejected_rows,
     ):
-        converted_value = "%s%s%s%s%s" % (day, out_delim, month, out_delim, year)
-    if output_format.endswith(
-        " to MM{out_delim}DD{out_delim}YYYY)".format(out_delim=out_delim)
+        if divert_row:
+            diverted_output_content.append(record)
+        else:
+            output_content.append(record)
+    if WORKER_STATE.get("format_stats") is not None:
+        report["format_stats"] = pop_format_stats(WORKER_STATE["format_stats"])
+    return (output_content, diverted_output_content, report)
+
+
+def iter_row_chunks(input_content, chunk_size, first_row=1):
+    # Group the rows in chunks of `chunk_size` rows, each chunk being returned
+    # with the (1-based) row number of its first row
+    input_content = iter(input_content)
+    while True:
+        rows = list(itertools.islice(input_content, chunk_size))
+        if not rows:
+            return
+        yield (first_row, rows)
+        first_row += len(rows)
+
+
+def iter_convert_content_parallel(
+    input_content,
+    config,
+    date_field_to_report_on=None,
+    truncate=None,
+    divert=None,
+    report=None,
+    locale="",
+    jobs=2,
+    chunk_size=PARALLEL_CHUNK_SIZE,
+    engine="python",
+    rejected_rows=None,
+    first_row=1,
+    format_stats=None,
+):
+    # Same as `iter_convert_content`, but the chunks of rows get converted in
+    # parallel by a pool of `jobs` processes. The chunks are split on row
+    # boundaries by the csv reader (so quoted fields spanning several lines are
+    # never cut), and their results are yielded back in the original order.
+    # Only a bounded number of chunks is in flight at any given time.
+    total_report = get_empty_report()
+    executor = get_process_pool(
+        jobs,
+        init_conversion_worker,
+        (
+            config,
+            date_field_to_report_on,
+            truncate,
+            divert,
+            locale,
+            engine,
+            rejected_rows is not None,
+            format_stats is not None,
+        ),
+    )
+    chunks = iter_row_chunks(input_content, chunk_size, first_row)
+    results = iter_pool_results(executor, convert_chunk, chunks, 2 * jobs)
+    try:
+        for (output_content, diverted_output_content, chunk_report) in results:
+            merge_report(total_report, chunk_report)
+            if format_stats is not None:
+                merge_format_stats(format_stats, chunk_report["format_stats"])
+            if rejected_rows is not None:
+                rejected_rows.extend(chunk_report["rejected_rows"])
+            # Within a chunk, the relative order between the main and diverted
+            # records doesn't matter since they go to separate files
+            for record in output_content:
+                yield (False, record)
+            for record in diverted_output_content:
+                yield (True, record)
+    finally:
+        results.close()
+        executor.shutdown(wait=True)
+
+    if report is not None:
+        report.update(total_report)
+
+
+def get_process_pool(workers, initializer, initargs):
+    # A pool of `workers` processes, each of which runs `initializer(*initargs)`
+    # once before its first task
+    import concurrent.futures
+
+    if PROCESS_POOL_INITIALIZER:
+        return concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=initializer, initargs=initargs
+        )
+
+    class InitializingProcessPoolExecutor(concurrent.futures.ProcessPoolExecutor):
+        # Before Python 3.7, each task is sent along with the initializer, run
+        # by the first task of the pool in each worker process
+        def submit(self, function, *args):
+            return super().submit(
+                run_in_initialized_worker,
+                (os.getpid(), id(self)),
+                initializer,
+                initargs,
+                function,
+                *args
+            )
+
+    return InitializingProcessPoolExecutor(workers)
+
+
+def run_in_initialized_worker(pool_key, initializer, initargs, function, *args):
+    # Run `function(*args)` in a worker process of the pool identified by
+    # `pool_key`, after its `initializer` if that's the first task of the pool
+    # in this process (see `get_process_pool`)
+    if WORKER_STATE.get("pool_key") != pool_key:
+        initializer(*initargs)
+        WORKER_STATE["pool_key"] = pool_key
+    return function(*args)
+
+
+def iter_pool_results(executor, function, arguments, max_pending):
+    # Submit `function` to the pool for each tuple of `arguments`, yielding the
+    # results in the original order. Only `max_pending` tasks are in flight at
+    # any given time, the next arguments being consumed as the results come in.
+    pending = collections.deque()
+    arguments = iter(arguments)
+    try:
+        while True:
+            for args in arguments:
+                pending.append(executor.submit(function, *args))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                return
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def init_positional_worker(
+    config,
+    date_field_to_report_on,
+    truncate,
+    divert,
+    locale,
+    engine,
+    output_file,
+    record_size,
+    encoding,
+    collect_format_stats=False,
+):
+    # Runs once in each worker process of the pool used by
+    # `write_output_positional`, which additionally needs the (temporary)
+    # output file in which the records of each chunk get written
+    init_conversion_worker(
+        config,
+        date_field_to_report_on,
+        truncate,
+        divert,
+        locale,
+        engine,
+        collect_format_stats=collect_format_stats,
+    )
+    WORKER_STATE["output_file"] = output_file
+    WORKER_STATE["record_size"] = record_size
+    WORKER_STATE["encoding"] = encoding
+
+
+def write_chunk_positional(first_row, rows, first_record, num_records):
+    # Convert a chunk of rows in a worker process and write its `num_records`
+    # main records directly at their position in the output file, the record
+    # number `first_record` starting at byte `first_record * record_size`.
+    # Only the diverted records (in their original order) and the report for
+    # that chunk are returned, or None if the records couldn't be written
+    # because they aren't all `record_size` bytes long once encoded.
+    (output_content, diverted_output_content, report) = convert_chunk(first_row, rows)
+    record_size = WORKER_STATE["record_size"]
+    if len(output_content) != num_records:
+        return None
+    data = b""
+    if output_content:
+        output_content.append("")
+        data = "\n".join(output_content).encode(WORKER_STATE["encoding"])
+    if len(data) != num_records * record_size:
+        return None
+    data = memoryview(data)
+    offset = first_record * record_size
+    # Opened for each chunk, so that the worker processes never keep the output
+    # file open once all the chunks have been written
+    output_fd = os.open(WORKER_STATE["output_file"], os.O_WRONLY)
+    try:
+        while data:
+            written = os.pwrite(output_fd, data, offset)
+            data = data[written:]
+            offset += written
+    finally:
+        os.close(output_fd)
+    return (diverted_output_content, report)
+
+
+def iter_positional_chunks(chunks, columns, output_fd, record_size, state):
+    # Add to each chunk of rows the number of its first main record and its
+    # number of main records (the rows that aren't diverted), growing the
+    # output file accordingly. The total number of main records is kept in
+    # `state["num_records"]`.
+    divert_columns = [
+        (idx_col, column.divert_values)
+        for (idx_col, column) in enumerate(columns)
+        if column.divert_values
+    ]
+    for (first_row, rows) in chunks:
+        num_records = len(rows)
+        for row in rows:
+            for (idx_col, divert_values) in divert_columns:
+                if idx_col < len(row) and row[idx_col] in divert_values:
+                    num_records -= 1
+                    break
+        first_record = state["num_records"]
+        state["num_records"] += num_records
+        if num_records:
+            offset = first_record * record_size
+            length = num_records * record_size
+            try:
+                os.posix_fallocate(output_fd, offset, length)
+            except (AttributeError, OSError):
+                # Not supported by the platform or the file system
+                os.ftruncate(output_fd, offset + length)
+        yield (first_row, rows, first_record, num_records)
+
+
+def can_write_positional(max_errors=None, checkpoint_interval=None):
+    # Whether the records can be written with `write_output_positional`,
+    # warning about it otherwise
+    issue = None
+    if not hasattr(os, "pwrite"):
+        issue = "is not supported on this platform"
+    elif max_errors is not None:
+        issue = "can't be used with the `--max-errors` argument"
+    elif checkpoint_interval:
+        issue = "can't be used with checkpoints"
+    if issue is not None:
+        logging.warning(
+            "The `--positional-writes` argument %s, the records are written in "
+            "order instead." % issue
+        )
+    return issue is None
+
+
+def write_output_positional(
+    input_content,
+    config,
+    output_file,
+    diverted_output_file,
+    date_field_to_report_on=None,
+    truncate=None,
+    divert=None,
+    report=None,
+    locale="",
+    jobs=2,
+    chunk_size=PARALLEL_CHUNK_SIZE,
+    engine="python",
+    buffer_size=WRITE_BUFFER_SIZE,
+    fsync=None,
+    stats=None,
+):
+    # Alternative to `iter_convert_content_parallel` + `write_output_stream`:
+    # every main record having the same length, the position of each record in
+    # the output file is known from its number. Each worker process writes the
+    # records of its chunk directly at their position in the preallocated
+    # output file, so they never have to be sent back to be written in order.
+    # Only the diverted records are, to be written to their file in order.
+    # Returns False (without writing any output file) if a record isn't of the
+    # expected length once encoded, e.g. with non-ASCII characters in UTF-8.
+    # With a `ConversionStats`, the conversion and writing of the records are
+    # timed together as the "convert" stage.
+    format_stats = None
+    if stats is not None:
+        start_times = stats.start_stage("convert")
+        input_content = iter_timed(input_content, stats, "read")
+        format_stats = stats.formats
+
+    columns = compile_config(config, truncate, divert, get_locale_separators(locale))
+    record_size = sum(column.length for column in columns) + 1
+    total_report = get_empty_report()
+    state = {"num_records": 0}
+    unsynced_size = 0
+    writer = OutputWriter(output_file, buffer_size, fsync)
+    diverted_writer = None
+    executor = None
+    try:
+        output_fd = writer.file.fileno()
+        executor = get_process_pool(
+            jobs,
+            init_positional_worker,
+            (
+                config,
+                date_field_to_report_on,
+                truncate,
+                divert,
+                locale,
+                engine,
+                writer.temp_file,
+                record_size,
+                writer.file.encoding,
+                format_stats is not None,
+            ),
+        )
+        chunks = iter_positional_chunks(
+            iter_row_chunks(input_content, chunk_size),
+            columns,
+            output_fd,
+            record_size,
+            state,
+        )
+        results = iter_pool_results(executor, write_chunk_positional, chunks, 2 * jobs)
+        try:
+            for result in results:
+                if result is None:
+                    writer.abort()
+                    if diverted_writer is not None:
+                        diverted_writer.abort()
+                    return False
+                (diverted_output_content, chunk_report) = result
+                merge_report(total_report, chunk_report)
+                if format_stats is not None:
+                    merge_format_stats(format_stats, chunk_report["format_stats"])
+                if diverted_output_content and diverted_writer is None:
+                    diverted_writer = OutputWriter(
+                        diverted_output_file, buffer_size, fsync
+                    )
+                for record in diverted_output_content:
+                    diverted_writer.write(record)
+                if fsync:
+                    unsynced_size += (
+                        chunk_report["num_rows"] - len(diverted_output_content)
+                    ) * record_size
+                    if unsynced_size >= fsync:
+                        writer.sync()
+                        unsynced_size = 0
+        finally:
+            results.close()
+        # No trailing newline after the last record
+        os.ftruncate(output_fd, max(state["num_records"] * record_size - 1, 0))
+        writer.commit()
+        if diverted_writer is not None:
+            diverted_writer.commit()
+    except BaseException:
+        # Don't leave partially-written output files behind
+        writer.abort()
+        if diverted_writer is not None:
+            diverted_writer.abort()
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        # Also when falling back to writing the records in order, which times
+        # its own conversion
+        if stats is not None:
+            stats.end_stage("convert", start_times)
+
+    if report is not None:
+        report.update(total_report)
+    return True
+
+
+class RejectedRowsWriter:
+    # Logs the rows rejected because of a value that couldn't be converted, and
+    # writes them to the reject file if set: delimited like the input file, each
+    # row being prefixed by its row number, field number and error code.
+    # `resume_size` and `num_rows` resume the writing after a checkpoint.
+    def __init__(
+        self,
+        reject_file=None,
+        delimiter=",",
+        quotechar='"',
+        resume_size=None,
+        num_rows=0,
     ):
-        converted_value = "%s%s%s%s%s" % (month, out_delim, day, out_delim, year)
-    return converted_value
+        import csv
 
+        self.num_rows = num_rows
+        self.writer = None
+        if reject_file is not None:
+            self.writer = OutputWriter(reject_file, resume_size=resume_size)
+        self.buffer = io.StringIO()
+        self.csv_writer = csv.writer(
+            self.buffer, delimiter=delimiter, quotechar=quotechar, lineterminator=""
+        )
 
-def convert_date(value, output_format, idx_col, idx_row):
-    converted_value = ""
-    (in_delim, out_delim) = determine_date_delimiters(output_format)
-    if in_delim == "" and len(value) != 8:
+    def write(self, rejected_rows):
+        # Write and empty the list of (ConversionError, row) tuples
+        for (error, row) in rejected_rows:
+            logging.error("%s The row is rejected." % error)
+            if self.writer is not None:
+                self.csv_writer.writerow(
+                    [error.idx_row, error.idx_col, error.code] + row
+                )
+                self.writer.write(self.buffer.getvalue())
+                self.buffer.seek(0)
+                self.buffer.truncate()
+        self.num_rows += len(rejected_rows)
+        rejected_rows.clear()
+
+    def commit(self):
+        if self.writer is not None:
+            self.writer.commit()
+
+    def checkpoint(self):
+        if self.writer is not None:
+            return self.writer.checkpoint()
+        return None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.abort()
+
+
+def check_num_rejected_rows(num_rows, max_errors):
+    # Stop the program if more than `max_errors` rows have been rejected
+    if num_rows > max_errors:
         logging.critical(
-            "Invalid date value '%s' for format '%s' in field %d on row %d "
-            "(ignoring the header), day and month must contain leading 0's. Exiting..."
-            % (value, output_format, idx_col, idx_row)
+            "%d rows could not be converted, more than the %d allowed by the "
+            "`--max-errors` argument. Exiting..." % (num_rows, max_errors)
+        )
+        sys.exit(53)
+
+
+def iter_checking_rejected_rows(
+    converted_content,
+    rejected_rows,
+    max_errors,
+    reject_file=None,
+    delimiter=",",
+    quotechar='"',
+    report=None,
+):
+    # Pass on the converted records, writing the rows rejected in the meantime
+    # with a `RejectedRowsWriter`. Once all the rows have been converted, the
+    # program stops if more than `max_errors` rows have been rejected, before
+    # the output files get written. Their number is stored in the optional
+    # `report` dictionary as "num_rejected".
+    rejected_rows_writer = RejectedRowsWriter(reject_file, delimiter, quotechar)
+    try:
+        for converted_row in converted_content:
+            if rejected_rows:
+                rejected_rows_writer.write(rejected_rows)
+            yield converted_row
+        rejected_rows_writer.write(rejected_rows)
+    except BaseException:
+        rejected_rows_writer.abort()
+        raise
+    rejected_rows_writer.commit()
+    if report is not None:
+        report["num_rejected"] = rejected_rows_writer.num_rows
+    check_num_rejected_rows(rejected_rows_writer.num_rows, max_errors)
+
+
+def iter_convert_input(
+    input_content,
+    config,
+    date_field_to_report_on,
+    truncate,
+    divert,
+    report,
+    locale,
+    jobs,
+    engine,
+    rejected_rows=None,
+    first_row=1,
+    stats=None,
+):
+    # Convert the rows with `iter_convert_content`, or with
+    # `iter_convert_content_parallel` when using several jobs. With a
+    # `ConversionStats`, the reading and conversion of the rows get timed.
+    format_stats = None
+    if stats is not None:
+        input_content = iter_timed(input_content, stats, "read")
+        format_stats = stats.formats
+    if jobs > 1:
+        converted_content = iter_convert_content_parallel(
+            input_content,
+            config,
+            date_field_to_report_on,
+            truncate,
+            divert,
+            report,
+            locale,
+            jobs,
+            engine=engine,
+            rejected_rows=rejected_rows,
+            first_row=first_row,
+            format_stats=format_stats,
         )
-        sys.exit(24)
+    else:
+        converted_content = iter_convert_content(
+            input_content,
+            config,
+            date_field_to_report_on,
+            truncate,
+            divert,
+            report,
+            engine,
+            rejected_rows,
+            first_row,
+            format_stats,
+            get_locale_separators(locale),
+        )
+    if stats is not None:
+        # Including the time spent reading the rows
+        converted_content = iter_timed(converted_content, stats, "convert")
+    return converted_content
+
+
+def iter_convert_input_range(
+    input_file,
+    delimiter,
+    quotechar,
+    encoding,
+    config,
+    date_field_to_report_on,
+    truncate,
+    divert,
+    locale,
+    jobs,
+    engine,
+    rejected_rows,
+    stats,
+    progress,
+    tracer,
+    byte_range,
+    report,
+    first_row,
+):
+    # Convert the rows between the (start, stop) offsets of `byte_range` of the
+    # input file, as called by `write_output_checkpointed` for each segment
+    input_content = iter_input_file(
+        input_file, delimiter, quotechar, 0, 0, encoding, byte_range, progress
+    )
+    input_content = tracer.iter_traced(input_content, first_row)
+    return iter_convert_input(
+        input_content,
+        config,
+        date_field_to_report_on,
+        truncate,
+        divert,
+        report,
+        locale,
+        jobs,
+        engine,
+        rejected_rows,
+        first_row,
+        stats,
+    )
+
+
+def convert_content(
+    input_content, config, date_field_to_report_on=None, truncate=None, divert=None
+):
+    output_content = []
+    diverted_output_content = []
+    report = {}
+    for (divert_row, record) in iter_convert_content(
+        input_content, config, date_field_to_report_on, truncate, divert, report
+    ):
+        if divert_row:
+            diverted_output_content.append(record)
+        else:
+            output_content.append(record)
+
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("The output content:\n%s", "\n".join(output_content))
+    return (
+        output_content,
+        diverted_output_content,
+        report["oldest_date"],
+        report["most_recent_date"],
+    )
+
+
+def skip_last_rows(rows, num_rows):
+    # Bounded look-behind buffer: a row only gets passed on once `num_rows` more
+    # rows have been read after it, so the last `num_rows` rows never are
+    buffer = collections.deque()
+    for row in rows:
+        buffer.append(row)
+        if len(buffer) > num_rows:
+            yield buffer.popleft()
+
+
+@functools.lru_cache(maxsize=None)
+def is_single_byte_ascii_encoding(encoding):
+    # True for the single-byte encodings in which the ASCII characters are
+    # encoded as themselves, such as WINDOWS-1252 or ISO-8859-15 (but not
+    # Latin-1 itself), based on the decoding table of their codec
+    import importlib
+
+    name = codecs.lookup(encoding).name
+    if name == "iso8859-1":
+        return False
+    try:
+        module = importlib.import_module("encodings." + name.replace("-", "_"))
+    except ImportError:
+        return False
+    decoding_table = getattr(module, "decoding_table", None)
+    return (
+        isinstance(decoding_table, str)
+        and len(decoding_table) == 256
+        and decoding_table[:128] == "".join(map(chr, range(128)))
+    )
+
+
+def iter_flagged_lines(lines, non_ascii):
+    # Flag the lines that aren't plain ASCII (a constant-time check for the
+    # strings read as Latin-1 from Python 3.7) as they get read by the CSV
+    # parser
+    for line in lines:
+        if not is_ascii(line):
+            non_ascii[0] = True
+        yield line
+
+
+def iter_transcoded_rows(rows, encoding, non_ascii):
+    # Decode the values read as Latin-1 from a row that isn't plain ASCII
+    # using their actual encoding. The parser reading only the lines needed
+    # for each row, the flag set while reading them always matches that row.
+    for row in rows:
+        if non_ascii[0]:
+            non_ascii[0] = False
+            row = [
+                cell if is_ascii(cell) else cell.encode("latin-1").decode(encoding)
+                for cell in row
+            ]
+        yield row
+
+
+if hasattr(str, "isascii"):
+    is_ascii = str.isascii
+else:
+
+    def is_ascii(value):
+        # Before Python 3.7, which added `str.isascii`
+        try:
+            value.encode("ascii")
+        except UnicodeEncodeError:
+            return False
+        return True
+
+
+def is_ascii_compatible_encoding(encoding):
+    # True for the encodings in which the ASCII characters are encoded as
+    # themselves and their bytes never are part of another character
+    return codecs.lookup(encoding).name in (
+        "ascii",
+        "utf-8",
+        "iso8859-1",
+    ) or is_single_byte_ascii_encoding(encoding)
+
+
+def release_mapped_pages(mapping, start, stop):
+    # Release the pages of the memory-mapped input file between the `start` and
+    # `stop` offsets from the resident memory of the process once they have
+    # been read, so that it doesn't grow with the size of the input file (the
+    # pages get read again from the page cache or the file if needed). Reading
+    # a page can map back the other pages of the same block of the page cache
+    # (of up to `MMAP_RELEASE_ALIGNMENT` bytes), which get released again.
+    import mmap
+
+    if not hasattr(mmap, "MADV_DONTNEED"):
+        # Before Python 3.8 or on Windows
+        return
+    start -= start % MMAP_RELEASE_ALIGNMENT
+    if stop > start:
+        mapping.madvise(mmap.MADV_DONTNEED, start, stop - start)
+
+
+def mapping_contains(mapping, pattern, start=0, stop=None):
+    # Whether the memory-mapped input file contains the `pattern` between the
+    # `start` and `stop` offsets (by default in the whole file), a single byte
+    # or a compiled regular expression matching a single byte (possibly with a
+    # look-ahead of one byte), searched in chunks released once searched
+    size = len(mapping)
+    stop = size if stop is None else stop
+    for pos in range(start, stop, MMAP_SCAN_SIZE):
+        end = min(pos + MMAP_SCAN_SIZE, stop)
+        if isinstance(pattern, bytes):
+            found = mapping.find(pattern, pos, end) != -1
+        else:
+            match = pattern.search(mapping, pos, min(end + 1, size))
+            found = match is not None and match.start() < end
+        release_mapped_pages(mapping, pos, end)
+        if found:
+            return True
+    return False
+
+
+def get_mapped_line_separator(mapping, delimiter, quotechar, encoding, byte_range=None):
+    # The line separator on which the memory-mapped input file can be split
+    # directly, or None if it must be parsed by the CSV reader: when the quote
+    # character is present, when the lines don't all end the same way or when
+    # the delimiter can't be searched for as a single byte. With `byte_range`,
+    # only the rows between its (start, stop) offsets get searched, so that the
+    # segments of a file converted with checkpoints or in shards aren't each
+    # searched through the whole file.
+    if not (
+        is_ascii_compatible_encoding(encoding)
+        and is_ascii(delimiter)
+        and is_ascii(quotechar or "")
+    ):
+        return None
+    (start, stop) = byte_range or (0, len(mapping))
+    if quotechar and mapping_contains(mapping, quotechar.encode("ascii"), start, stop):
+        return None
+    first_lf = mapping.find(b"\n", start, stop)
+    if first_lf > start and mapping[first_lf - 1 : first_lf] == b"\r":
+        if mapping_contains(mapping, NON_CRLF_PATTERN, start, stop):
+            return None
+        return b"\r\n"
+    if mapping_contains(mapping, b"\r", start, stop):
+        return None
+    return b"\n"
+
+
+def get_mapped_rows_range(mapping, line_sep, skip_header, skip_footer):
+    # The offsets between which are the rows of the memory-mapped input file
+    # left after skipping the header and footer lines
+    (start, stop) = (0, len(mapping))
+    for _ in range(skip_header):
+        idx = mapping.find(line_sep, start, stop)
+        start = stop if idx == -1 else idx + len(line_sep)
+    for _ in range(skip_footer):
+        if start >= stop:
+            break
+        search_end = stop
+        if mapping[max(start, stop - len(line_sep)) : stop] == line_sep:
+            # Search for the end of the previous line
+            search_end -= len(line_sep)
+        idx = mapping.rfind(line_sep, start, search_end)
+        stop = start if idx == -1 else idx + len(line_sep)
+    return (start, stop)
+
+
+def iter_mapped_rows(
+    mapping, start, stop, line_sep, delimiter, encoding, position=None
+):
+    # Split the rows between the `start` and `stop` offsets of the memory-mapped
+    # input file, in chunks of complete lines that each get decoded at once.
+    # The offset up to which the file has been read is kept in the optional
+    # one-item `position` list.
+    sep = line_sep.decode("ascii")
+    pos = start
+    while pos < stop:
+        end = stop
+        if pos + MMAP_CHUNK_SIZE < stop:
+            idx = mapping.rfind(line_sep, pos, pos + MMAP_CHUNK_SIZE)
+            if idx == -1:
+                # Line longer than a chunk
+                idx = mapping.find(line_sep, pos, stop)
+            if idx != -1:
+                end = idx + len(line_sep)
+        lines = mapping[pos:end].decode(encoding).split(sep)
+        if end < stop or mapping[end - len(line_sep) : end] == line_sep:
+            # Nothing follows the last line separator
+            lines.pop()
+        release_mapped_pages(mapping, pos, end)
+        if position is not None:
+            position[0] = end
+        # Like the CSV reader, an empty line is an empty row
+        yield from [line.split(delimiter) if line else [] for line in lines]
+        pos = end
+
+
+class ByteRangeReader(io.RawIOBase):
+    # Raw binary stream only reading the next `length` bytes of `file`
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        num_bytes = self.file.readinto(memoryview(buffer)[:size])
+        self.remaining -= num_bytes
+        return num_bytes
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def open_input_file(input_file, encoding, byte_range=None):
+    # Open the input file as text for the CSV reader, only reading the bytes
+    # between the (start, stop) offsets of `byte_range` if set
+    if byte_range is None:
+        return open(input_file, "r", encoding=encoding, newline="")
+    (start, stop) = byte_range
+    f = open(input_file, "rb", buffering=0)
+    f.seek(start)
+    return io.TextIOWrapper(
+        io.BufferedReader(ByteRangeReader(f, stop - start)),
+        encoding=encoding,
+        newline="",
+    )
+
+
+def iter_csv_input_file(
+    input_file,
+    delimiter,
+    quotechar,
+    skip_header,
+    skip_footer,
+    encoding,
+    byte_range=None,
+    progress=None,
+):
+    import csv
+
+    # With a single-byte encoding, the bytes are parsed as Latin-1 (which maps
+    # each byte to the character with the same code point, at almost no cost)
+    # and only the values that aren't ASCII get decoded using the actual
+    # encoding. The delimiter and quote character being ASCII, they are the
+    # same bytes in both encodings.
+    read_as_latin1 = (
+        is_single_byte_ascii_encoding(encoding)
+        and is_ascii(delimiter)
+        and is_ascii(quotechar or "")
+    )
+    with open_input_file(
+        input_file, "latin-1" if read_as_latin1 else encoding, byte_range
+    ) as csvfile:
+        lines = csvfile
+        if read_as_latin1:
+            non_ascii = [False]
+            lines = iter_flagged_lines(csvfile, non_ascii)
+        content = csv.reader(lines, delimiter=delimiter, quotechar=quotechar)
+        if read_as_latin1:
+            content = iter_transcoded_rows(content, encoding, non_ascii)
+        content = itertools.islice(content, skip_header, None)
+        if skip_footer > 0:
+            content = skip_last_rows(content, skip_footer)
+        if progress is not None:
+            # The position of the file, ahead of the parser by its buffers
+            fd = csvfile.buffer.raw.fileno()
+            progress.get_offset = lambda: os.lseek(fd, 0, os.SEEK_CUR)
+        for row in content:
+            yield row
+        if progress is not None:
+            offset = os.lseek(fd, 0, os.SEEK_CUR)
+            progress.get_offset = lambda: offset
+
+
+def iter_input_file(
+    input_file,
+    delimiter,
+    quotechar,
+    skip_header,
+    skip_footer,
+    encoding,
+    byte_range=None,
+    progress=None,
+):
+    # Streaming version of `read_input_file`: the rows are yielded one at a time
+    # as they get parsed, without ever loading the whole file in memory.
+    # The input file gets memory-mapped, and when it doesn't contain the quote
+    # character its lines and fields are split directly, the header and footer
+    # being skipped by offset. Otherwise it gets parsed by the CSV reader.
+    # With `byte_range`, only the rows between its (start, stop) offsets (which
+    # must be the start of a row or the end of the file) are read.
+    # With a `ProgressReporter`, the rows read and the position in the input
+    # file get reported to it.
+    rows = iter_input_file_rows(
+        input_file,
+        delimiter,
+        quotechar,
+        skip_header,
+        skip_footer,
+        encoding,
+        byte_range,
+        progress,
+    )
+    if progress is not None:
+        rows = iter_progress(rows, progress)
+    return rows
+
+
+def iter_input_file_rows(
+    input_file,
+    delimiter,
+    quotechar,
+    skip_header,
+    skip_footer,
+    encoding,
+    byte_range,
+    progress,
+):
+    import mmap
+
+    with open(input_file, "rb") as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty file or a file that can't be memory-mapped
+            mapping = None
+        if mapping is not None:
+            with mapping:
+                line_sep = get_mapped_line_separator(
+                    mapping, delimiter, quotechar, encoding, byte_range
+                )
+                if line_sep is not None:
+                    if byte_range is None:
+                        (start, stop) = get_mapped_rows_range(
+                            mapping, line_sep, skip_header, skip_footer
+                        )
+                    else:
+                        (start, stop) = byte_range
+                    position = [start]
+                    if progress is not None:
+                        progress.get_offset = lambda: position[0]
+                    yield from iter_mapped_rows(
+                        mapping, start, stop, line_sep, delimiter, encoding, position
+                    )
+                    return
+    yield from iter_csv_input_file(
+        input_file,
+        delimiter,
+        quotechar,
+        skip_header,
+        skip_footer,
+        encoding,
+        byte_range,
+        progress,
+    )
+
+
+def count_quotes(mapping, quote, start, stop):
+    # Number of quote characters between the `start` and `stop` offsets of the
+    # memory-mapped input file
+    if not quote:
+        return 0
+    count = 0
+    for pos in range(start, stop, MMAP_CHUNK_SIZE):
+        end = min(pos + MMAP_CHUNK_SIZE, stop)
+        count += mapping[pos:end].count(quote)
+        release_mapped_pages(mapping, pos, end)
+    return count
+
+
+def follows_line_end(mapping, offset):
+    # Whether `offset` is right after a line ending, "\r\n" being one
+    previous = mapping[offset - 1 : offset]
+    return previous == b"\n" or (
+        previous == b"\r" and mapping[offset : offset + 1] != b"\n"
+    )
 
-    (year, month, day) = parse_input_date(value, output_format, in_delim)
 
-    # Is it a valid date?
-    try:
-        datetime.datetime.strptime("%s%s%s" % (year, month, day), "%Y%m%d")
-    except ValueError:
-        pass
-    else:
-        converted_value = generate_output_date(
-            year, month, day, output_format, out_delim
-        )
-    if not converted_value:
-        logging.critical(
-            "Invalid date value '%s' for format '%s' in field %d on row %d "
-            "(ignoring the header). Exiting..."
-            % (value, output_format, idx_col, idx_row)
-        )
-        sys.exit(18)
-    return converted_value
+def find_next_row_start(mapping, offset, quote):
+    # The offset of the first row starting at or after `offset`: right after a
+    # line ending preceded by an even number of quote characters, so not within
+    # a quoted value (escaped quote characters being doubled). The size of the
+    # file is returned if there is none.
+    size = len(mapping)
+    if offset <= 0:
+        return 0
+    if offset >= size:
+        return size
+    pos = offset - 1
+    return find_row_start(mapping, pos, quote, count_quotes(mapping, quote, 0, pos))[0]
 
 
-def convert_cell(value, output_format, idx_col, idx_row):
-    if output_format not in SUPPORTED_OUTPUT_FORMATS:
-        logging.critical(
-            "Invalid output format '%s', must be one of '%s'. "
-            "Exiting..."
-            % (
-                output_format,
-                "', '".join(SUPPORTED_OUTPUT_FORMATS),
-            )
-        )
-        sys.exit(27)
-    converted_value = ""
-    if "Keep numeric" == output_format:
-        # Strip all non-numeric characters
-        value = re.sub(r"\D", "", value)
-    if (
-        output_format in ("Integer", "Decimal", "Keep numeric")
-        and str(value).strip() == ""
-    ):
-        value = "0"
-    if "Time" == output_format:
-        m = re.match(r"(\d{2})(:)?(\d{2})", value)
-        if m:
-            converted_value = "%s%s" % (m.group(1), m.group(3))
-        else:
-            logging.critical(
-                "Invalid time format '%s' in field %d on row %d (ignoring the header). "
-                "Exiting..." % (value, idx_col, idx_row)
-            )
-            sys.exit(17)
-    elif output_format.startswith("Date ("):
-        converted_value = convert_date(value, output_format, idx_col, idx_row)
-    elif "Decimal" == output_format:
-        # Decimal numbers must be sent with 2 decimal places and
-        # *without* the decimal separator
-        try:
-            # Convert to string, then float respecting the user's Locale,
-            # multiply by 100, round without decimals,
-            # convert to integer (to drop the extra decimal values) then
-            # finally back to string...
-            converted_value = str(value)
-            converted_value = atof(converted_value)
-            converted_value = float(converted_value)
-            converted_value = converted_value * 100
-            converted_value = round(converted_value, 0)
-            converted_value = int(converted_value)
-            converted_value = str(converted_value)
-        except ValueError:
-            logging.critical(
-                "Invalid decimal format '%s' in field %d on row %d (ignoring the "
-                "header). Exiting..." % (value, idx_col, idx_row)
-            )
-            sys.exit(19)
-    else:
-        converted_value = value
-    return converted_value
+def find_row_start(mapping, pos, quote, quotes):
+    # Same as `find_next_row_start(mapping, pos + 1, quote)`, `quotes` being the
+    # number of quote characters before `pos`, returned together with the
+    # number of quote characters before that row
+    size = len(mapping)
+    while True:
+        match = LINE_END_PATTERN.search(mapping, pos)
+        if match is None:
+            return (size, quotes + count_quotes(mapping, quote, pos, size))
+        quotes += count_quotes(mapping, quote, pos, match.start())
+        pos = match.end()
+        if quotes % 2 == 0 and follows_line_end(mapping, pos):
+            return (pos, quotes)
 
 
-def convert_content(
-    input_content, config, date_field_to_report_on=None, truncate=None, divert=None
-):
-    output_content = []
-    diverted_output_content = []
-    if date_field_to_report_on:
-        # Argument is 1-based
-        date_field_to_report_on -= 1
-    oldest_date = "99999999"
-    most_recent_date = "00000000"
-    for idx_row, row in enumerate(input_content):
-        converted_row_content = []
-        divert_row = False
-        # Confirm that the input_content doesn't have more fields than are
-        # defined in the configuration file
-        if len(row) > len(config):
-            logging.critical(
-                "Row %d (ignoring the header) has more fields than are defined in the "
-                "configuration file! The row has %d fields while the configuration "
-                "defines only %d possible fields. Exiting..."
-                % (idx_row + 1, len(row), len(config))
-            )
-            sys.exit(23)
-        for idx_col, cell in enumerate(row):
-            output_format = config[idx_col]["output_format"]
-            length = config[idx_col]["length"]
+def find_previous_row_start(mapping, offset, quote, quotes):
+    # The offset of the last row starting before `offset`, `quotes` being the
+    # number of quote characters before `offset`, returned together with the
+    # number of quote characters before that row
+    pos = offset
+    while pos > 0:
+        line_end = max(
+            mapping.rfind(b"\n", 0, pos - 1), mapping.rfind(b"\r", 0, pos - 1)
+        )
+        if line_end == -1:
+            break
+        quotes -= count_quotes(mapping, quote, line_end + 1, pos)
+        pos = line_end + 1
+        if quotes % 2 == 0 and follows_line_end(mapping, pos):
+            return (pos, quotes)
+    return (0, 0)
 
-            if divert and idx_col + 1 in divert and str(cell) in divert[idx_col + 1]:
-                # This field contains a value marked for content diversion
-                # The content for the entire row will be diverted to a separate file
-                divert_row = True
 
-            if config[idx_col]["skip_field"]:
-                cell = ""
-            else:
-                cell = convert_cell(cell, output_format, idx_col + 1, idx_row + 1)
-
-            # Confirm that the length of the field (before padding) is less
-            # than the maximum allowed length
-            if len(cell) > config[idx_col]["length"]:
-                if not truncate or idx_col + 1 not in truncate:
-                    logging.critical(
-                        "Field %d on row %d (ignoring the header) is too long! Length: "
-                        "%d, max length %d. Exiting..."
-                        % (
-                            idx_col + 1,
-                            idx_row + 1,
-                            len(cell),
-                            config[idx_col]["length"],
-                        )
-                    )
-                    sys.exit(20)
-                else:
-                    # Truncate to the defined maximum field length
-                    logging.info(
-                        "Field %d on row %d (ignoring the header) is too long! Length: "
-                        "%d, max length %d. Truncating field to its max length."
-                        % (
-                            idx_col + 1,
-                            idx_row + 1,
-                            len(cell),
-                            config[idx_col]["length"],
-                        )
-                    )
-                    cell = cell[: config[idx_col]["length"]]
+def get_shard_range(input_file, quotechar, skip_header, skip_footer, shard, num_shards):
+    # The byte range of the rows to convert for the shard number `shard` (out of
+    # `num_shards`): the rows starting in that shard's part of the input file,
+    # the header and footer rows being excluded from the first and last shards.
+    # The file gets memory-mapped and the rows are delimited by their offsets,
+    # without being parsed.
+    import mmap
+
+    with open(input_file, "rb") as f:
+        try:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty file
+            return (0, 0)
+    with mapping:
+        size = len(mapping)
+        quote = (quotechar or "").encode("ascii")
+        header_end = 0
+        for _ in range(skip_header):
+            header_end = find_next_row_start(mapping, header_end + 1, quote)
+        footer_start = size
+        if skip_footer > 0:
+            quotes = count_quotes(mapping, quote, 0, size)
+            for _ in range(skip_footer):
+                (footer_start, quotes) = find_previous_row_start(
+                    mapping, footer_start, quote, quotes
+                )
+        footer_start = max(footer_start, header_end)
+        start = find_next_row_start(mapping, size * (shard - 1) // num_shards, quote)
+        stop = find_next_row_start(mapping, size * shard // num_shards, quote)
+    start = min(max(start, header_end), footer_start)
+    stop = max(min(stop, footer_start), start)
+    return (start, stop)
 
-            padded_output_value = pad_output_value(cell, output_format, length)
-            converted_row_content.append(padded_output_value)
 
-            if date_field_to_report_on and date_field_to_report_on == idx_col:
-                if padded_output_value < oldest_date:
-                    oldest_date = padded_output_value
-                if padded_output_value > most_recent_date:
-                    most_recent_date = padded_output_value
-        # Process fields not in the input content but defined in the
-        # configuration file: empty padding, based on the defined output format
-        for idx_col in range(len(row), len(config)):
-            output_format = config[idx_col]["output_format"]
-            length = config[idx_col]["length"]
-            padded_output_value = pad_output_value("", output_format, length)
-            converted_row_content.append(padded_output_value)
-        if divert_row:
-            diverted_output_content.append("".join(converted_row_content))
-        else:
-            output_content.append("".join(converted_row_content))
+def iter_checkpoint_segments(input_file, quotechar, start, stop, interval):
+    # Split the rows between the `start` and `stop` offsets of the input file
+    # (`start` being the start of a row) in segments of about `interval` bytes,
+    # yielded as (start, stop) offsets ending at the start of a row
+    import mmap
 
-    logging.debug("The output content:\n%s" % "\n".join(output_content))
-    return (output_content, diverted_output_content, oldest_date, most_recent_date)
+    if start >= stop:
+        return
+    quote = (quotechar or "").encode("ascii")
+    with open(input_file, "rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with mapping:
+        quotes = count_quotes(mapping, quote, 0, start)
+        while start + interval < stop:
+            pos = start + interval - 1
+            quotes += count_quotes(mapping, quote, start, pos)
+            (end, quotes) = find_row_start(mapping, pos, quote, quotes)
+            if end >= stop:
+                break
+            yield (start, end)
+            start = end
+    yield (start, stop)
 
 
 def read_input_file(
     input_file, delimiter, quotechar, skip_header, skip_footer, encoding
 ):
+    import csv
+
     content = None
-    with codecs.open(input_file, "r", encoding) as csvfile:
+    with open(input_file, "r", encoding=encoding, newline="") as csvfile:
         content = csv.reader(csvfile, delimiter=delimiter, quotechar=quotechar)
         # Skip the header and footer if necessary
         content = list(content)
         num_lines = len(content)
         content = content[skip_header : num_lines - skip_footer]
-        logging.debug(
-            "There are %d lines in the input file %s:" % (num_lines, input_file)
-        )
+        logging.debug("There are %d lines in the input file %s:", num_lines, input_file)
         if skip_header > 0 or skip_footer > 0:
             logging.debug(
-                "Skipping %d header and %d footer lines" % (skip_header, skip_footer)
+                "Skipping %d header and %d footer lines", skip_header, skip_footer
             )
-        for row in content:
-            logging.debug(" ||| ".join(row))
+        tracer = RowTracer(*DEFAULT_TRACE_ROWS)
+        for _ in tracer.iter_traced(content):
+            pass
+        tracer.finish()
     return content
 
 
-def load_config(config_file):
+def get_config_fingerprint(config_file):
+    # Identifies a specific version of a configuration file. The version of
+    # this program is included since the validation rules could change.
+    import hashlib
+
+    stat = os.stat(config_file)
+    with open(config_file, "rb") as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+    return {
+        "version": __version__,
+        "config_file": os.path.abspath(config_file),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": content_hash,
+    }
+
+
+def get_config_cache_file(config_file, cache_dir):
+    import hashlib
+
+    key = hashlib.sha256(os.path.abspath(config_file).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, "%s.json" % key)
+
+
+def load_cached_config(cache_file, fingerprint):
+    # Returns None if there is no valid cached configuration
+    import json
+
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("fingerprint") != fingerprint:
+        return None
+    return cached.get("config")
+
+
+def save_cached_config(cache_file, fingerprint, config):
+    import json
+
+    temp_cache_file = "%s.%d.tmp" % (cache_file, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(temp_cache_file, "w") as f:
+            json.dump({"fingerprint": fingerprint, "config": config}, f)
+        os.replace(temp_cache_file, cache_file)
+    except OSError as e:
+        logging.warning(
+            "Unable to save the configuration cache %s: %s" % (cache_file, e)
+        )
+
+
+def load_config(config_file, cache_dir=None):
+    # See `read_config`, stopping the program if the configuration is invalid
+    try:
+        return read_config(config_file, cache_dir)
+    except ConfigError as e:
+        exit_on_config_error(e)
+
+
+def read_config(config_file, cache_dir=None):
+    # Load and validate the configuration file, raising ConfigError if it is
+    # invalid. When a cache directory is specified, the validated configuration
+    # gets saved there so that the configuration file only needs to be parsed
+    # again when it changes
+    if cache_dir:
+        cache_file = get_config_cache_file(config_file, cache_dir)
+        fingerprint = get_config_fingerprint(config_file)
+        config = load_cached_config(cache_file, fingerprint)
+        if config is not None:
+            logging.info("Config '%s' loaded from the cache" % config_file)
+            return config
+    config = read_config_file(config_file)
+    if cache_dir:
+        save_cached_config(cache_file, fingerprint, config)
+    return config
+
+
+def parse_decimal_places(value, idx_row):
+    decimal_places = -1
+    if isinstance(value, int):
+        decimal_places = value
+    if isinstance(value, str) and value.isnumeric():
+        decimal_places = int(value)
+    if decimal_places < 0:
+        raise ConfigError(
+            "Invalid value '%s' for the 'Decimal places' column on row %d, must be "
+            "a positive number." % (value, idx_row),
+            40,
+        )
+    return decimal_places
+
+
+def read_config_file(config_file):
+    # Imported here since this is slow and not needed when using the cache
+    from openpyxl import load_workbook
+
     config = []
+    supported_output_formats = get_supported_output_formats()
     supported_skip_field = ("True", "False", "", None)
     logging.debug("Loading configuration %s" % config_file)
 
-    # Open the configuration file (an Excel .xlsx file)
-    wk = load_workbook(filename=config_file)
+    # Open the configuration file (an Excel .xlsx file), in read-only mode since
+    # only the cell values are needed
+    wk = load_workbook(filename=config_file, read_only=True)
     ws = wk.active  # Get active worksheet or wk['some_worksheet']
+    rows = list(ws.iter_rows())
+    wk.close()
 
-    # Analyze the header to identify the relevant columns
-    length_col = -1
-    output_format_col = -1
-    skip_field_col = -1
-    for row in ws.iter_rows(max_row=1):
+    # Analyze the header to identify the relevant columns ("Decimal places" being
+    # optional)
+    header_columns = {
+        "Length": -1,
+        "Output format": -1,
+        "Skip field": -1,
+        "Decimal places": -1,
+    }
+    for row in rows[:1]:
         for idx, cell in enumerate(row):
-            if "Length" == cell.value:
-                length_col = idx
-            elif "Output format" == cell.value:
-                output_format_col = idx
-            elif "Skip field" == cell.value:
-                skip_field_col = idx
+            if cell.value in header_columns:
+                header_columns[cell.value] = idx
+    length_col = header_columns["Length"]
+    output_format_col = header_columns["Output format"]
+    skip_field_col = header_columns["Skip field"]
+    decimal_places_col = header_columns["Decimal places"]
     column_indices = (length_col, output_format_col, skip_field_col)
     if -1 in column_indices:
-        logging.critical(
+        raise ConfigError(
             "Invalid config file, missing one of the columns 'Length', 'Output format' "
-            "or 'Skip field'. Exiting..."
+            "or 'Skip field'.",
+            13,
         )
-        sys.exit(13)
 
     # Loop over all the config rows (skipping the header)
-    for idx_row, row in enumerate(ws.iter_rows(min_row=2)):
+    for idx_row, row in enumerate(rows[1:]):
         config.append({})
         for idx_col, cell in enumerate(row):
             if idx_col == length_col:
@@ -380,35 +2618,38 @@ def load_config(config_file):
                 if isinstance(cell.value, str) and cell.value.isnumeric():
                     config[idx_row]["length"] = int(cell.value)
                 if config[idx_row]["length"] < 0:
-                    logging.critical(
+                    raise ConfigError(
                         "Invalid value '%s' for the 'Length' column on row %d, must be "
-                        "a positive number. Exiting..." % (cell.value, idx_row + 2)
+                        "a positive number." % (cell.value, idx_row + 2),
+                        14,
                     )
-                    sys.exit(14)
             if idx_col == output_format_col:
-                if cell.value in SUPPORTED_OUTPUT_FORMATS:
+                if cell.value in supported_output_formats:
                     config[idx_row]["output_format"] = cell.value
                 else:
-                    logging.critical(
-                        "Invalid output format '%s' on row %d, must be one of '%s'. "
-                        "Exiting..."
+                    raise ConfigError(
+                        "Invalid output format '%s' on row %d, must be one of '%s'."
                         % (
                             cell.value,
                             idx_row + 2,
-                            "', '".join(SUPPORTED_OUTPUT_FORMATS),
-                        )
+                            "', '".join(supported_output_formats),
+                        ),
+                        15,
                     )
-                    sys.exit(15)
             if idx_col == skip_field_col:
                 if cell.value in supported_skip_field:
                     config[idx_row]["skip_field"] = "True" == cell.value
                 else:
-                    logging.critical(
+                    raise ConfigError(
                         "Invalid value '%s' for the 'Skip field' column on row %d, "
-                        "must be one  of 'True', 'False' or empty. Exiting..."
-                        % (cell.value, idx_row + 2)
+                        "must be one  of 'True', 'False' or empty."
+                        % (cell.value, idx_row + 2),
+                        16,
                     )
-                    sys.exit(16)
+            if idx_col == decimal_places_col and cell.value not in ("", None):
+                config[idx_row]["decimal_places"] = parse_decimal_places(
+                    cell.value, idx_row + 2
+                )
 
     logging.info("Config '%s' loaded successfully" % config_file)
     logging.debug(config)
@@ -460,7 +2701,238 @@ def validate_input_output_args(args):
             )
             sys.exit(33)
         if not os.path.isdir(args.output_directory):
-            pathlib.Path(args.output_directory).mkdir(parents=True, exist_ok=True)
+            os.makedirs(args.output_directory, exist_ok=True)
+
+
+def validate_parallel_args(args):
+    if args.jobs != 1:
+        try:
+            args.jobs = int(args.jobs)
+        except ValueError:
+            args.jobs = 0
+        if args.jobs < 1:
+            logging.critical(
+                "The `--jobs` argument must be a positive number. Exiting..."
+            )
+            sys.exit(36)
+    if args.workers != 1:
+        try:
+            args.workers = int(args.workers)
+        except ValueError:
+            args.workers = 0
+        if args.workers < 1:
+            logging.critical(
+                "The `--workers` argument must be a positive number. Exiting..."
+            )
+            sys.exit(37)
+        if not args.input_directory:
+            logging.critical(
+                "The `--workers` argument can only be used in combination with the "
+                "`--input-directory` argument. Exiting..."
+            )
+            sys.exit(38)
+        if args.jobs > 1:
+            logging.critical(
+                "The `--workers` and `--jobs` arguments can not be used together. "
+                "Exiting..."
+            )
+            sys.exit(39)
+    if args.worker_type == "thread":
+        if args.workers == 1:
+            logging.critical(
+                "The `--worker-type thread` argument can only be used in "
+                "combination with the `--workers` argument. Exiting..."
+            )
+            sys.exit(62)
+        if args.memory_report:
+            logging.critical(
+                "The `--worker-type thread` and `--memory-report` arguments can "
+                "not be used together, the memory of the process being shared by "
+                "the threads. Exiting..."
+            )
+            sys.exit(63)
+    if args.positional_writes and args.jobs == 1:
+        logging.critical(
+            "The `--positional-writes` argument can only be used in combination "
+            "with the `--jobs` argument. Exiting..."
+        )
+        sys.exit(44)
+
+
+def can_split_input_files(args):
+    # Whether the input files can be split on row boundaries without being
+    # parsed, as needed by `--shard` and the checkpoints
+    try:
+        ascii_compatible = is_ascii_compatible_encoding(args.input_encoding)
+    except LookupError:
+        ascii_compatible = False
+    return (
+        ascii_compatible and is_ascii(args.delimiter) and is_ascii(args.quotechar or "")
+    )
+
+
+def validate_shard_args(args):
+    # Convert `--shard` to a (shard, num_shards) tuple and `--merge-shards` to
+    # a number of shards
+    if args.shard:
+        try:
+            (shard, num_shards) = (int(v) for v in args.shard.split("/"))
+        except ValueError:
+            (shard, num_shards) = (0, 0)
+        if not 1 <= shard <= num_shards:
+            logging.critical(
+                "The `--shard` argument must be in the form I/N, to convert the "
+                "I-th of N shards of the input file. Exiting..."
+            )
+            sys.exit(45)
+        args.shard = (shard, num_shards)
+    if args.merge_shards:
+        try:
+            args.merge_shards = int(args.merge_shards)
+        except ValueError:
+            args.merge_shards = 0
+        if args.merge_shards < 1:
+            logging.critical(
+                "The `--merge-shards` argument must be a positive number. Exiting..."
+            )
+            sys.exit(46)
+    if (args.shard or args.merge_shards) and not args.input:
+        logging.critical(
+            "The `--shard` and `--merge-shards` arguments can only be used in "
+            "combination with the `--input` argument. Exiting..."
+        )
+        sys.exit(47)
+    if args.shard and not can_split_input_files(args):
+        logging.critical(
+            "The `--shard` argument requires an input encoding in which the "
+            "ASCII characters are single bytes (such as UTF-8), and an ASCII "
+            "delimiter and quote character. Exiting..."
+        )
+        sys.exit(49)
+
+
+def validate_reject_args(args):
+    if args.max_errors is not None:
+        try:
+            args.max_errors = int(args.max_errors)
+        except ValueError:
+            args.max_errors = -1
+        if args.max_errors < 0:
+            logging.critical(
+                "The `--max-errors` argument must be a positive number or 0. "
+                "Exiting..."
+            )
+            sys.exit(50)
+    if args.reject_file:
+        if args.max_errors is None:
+            logging.critical(
+                "The `--reject-file` argument can only be used in combination with "
+                "the `--max-errors` argument. Exiting..."
+            )
+            sys.exit(51)
+        if not args.input:
+            logging.critical(
+                "The `--reject-file` argument can only be used in combination with "
+                "the `--input` argument. Exiting..."
+            )
+            sys.exit(52)
+
+
+def validate_checkpoint_args(args):
+    # Convert `--checkpoint-interval` to bytes
+    if args.checkpoint_interval is not None:
+        try:
+            args.checkpoint_interval = int(args.checkpoint_interval) * 1024 * 1024
+        except ValueError:
+            args.checkpoint_interval = 0
+        if args.checkpoint_interval < 1:
+            logging.critical(
+                "The `--checkpoint-interval` argument must be a positive number. "
+                "Exiting..."
+            )
+            sys.exit(54)
+    if (args.checkpoint_interval or args.resume) and not can_split_input_files(args):
+        logging.critical(
+            "The `--checkpoint-interval` and `--resume` arguments require an input "
+            "encoding in which the ASCII characters are single bytes (such as "
+            "UTF-8), and an ASCII delimiter and quote character. Exiting..."
+        )
+        sys.exit(55)
+
+
+def validate_progress_args(args):
+    if args.progress_interval is not None:
+        try:
+            args.progress_interval = float(args.progress_interval)
+        except ValueError:
+            args.progress_interval = 0
+        if not args.progress_interval > 0:
+            logging.critical(
+                "The `--progress-interval` argument must be a positive number. "
+                "Exiting..."
+            )
+            sys.exit(57)
+    if args.progress_file and args.progress_interval is None:
+        logging.critical(
+            "The `--progress-file` argument can only be used in combination with "
+            "the `--progress-interval` argument. Exiting..."
+        )
+        sys.exit(58)
+    if args.profile_mode and not args.profile_output:
+        logging.critical(
+            "The `--profile-mode` argument can only be used in combination with "
+            "the `--profile-output` argument. Exiting..."
+        )
+        sys.exit(59)
+
+
+def validate_trace_args(args):
+    if args.trace_rows is not None:
+        try:
+            args.trace_rows = parse_trace_rows(args.trace_rows)
+        except ValueError:
+            logging.critical(
+                "The `--trace-rows` argument must be a comma-delimited list of "
+                "'first:N', 'last:N' and 'every:N', N being a positive number. "
+                "Exiting..."
+            )
+            sys.exit(60)
+        if args.loglevel != logging.DEBUG:
+            logging.critical(
+                "The `--trace-rows` argument can only be used in combination with "
+                "the `--debug` argument. Exiting..."
+            )
+            sys.exit(61)
+
+
+def validate_output_args(args):
+    # Convert `--write-buffer-size` to bytes and `--fsync` to the `fsync`
+    # argument of `OutputWriter`
+    try:
+        args.write_buffer_size = int(args.write_buffer_size) * 1024
+    except ValueError:
+        args.write_buffer_size = 0
+    if args.write_buffer_size < 1:
+        logging.critical(
+            "The `--write-buffer-size` argument must be a positive number. "
+            "Exiting..."
+        )
+        sys.exit(42)
+    if args.fsync == "none":
+        args.fsync = None
+    elif args.fsync == "end":
+        args.fsync = 0
+    else:
+        try:
+            args.fsync = int(args.fsync) * 1024 * 1024
+        except ValueError:
+            args.fsync = 0
+        if args.fsync < 1:
+            logging.critical(
+                "The `--fsync` argument must be 'none', 'end' or a positive number. "
+                "Exiting..."
+            )
+            sys.exit(43)
 
 
 def validate_shared_args(args):
@@ -500,6 +2972,22 @@ def validate_shared_args(args):
         args.truncate = truncate
     if args.divert:
         args.divert = validate_divert(args.divert)
+    validate_parallel_args(args)
+    validate_shard_args(args)
+    validate_reject_args(args)
+    validate_checkpoint_args(args)
+    validate_progress_args(args)
+    validate_trace_args(args)
+    validate_output_args(args)
+    if args.engine == "numpy":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            logging.critical(
+                "The `--engine numpy` argument requires NumPy to be installed. "
+                "Exiting..."
+            )
+            sys.exit(41)
 
 
 def add_shared_args(parser):
@@ -610,9 +3098,222 @@ def add_shared_args(parser):
         required=False,
         default=[],
     )
+    parser.add_argument(
+        "-me",
+        "--max-errors",
+        help="Instead of stopping on the first value that can't be converted, "
+        "reject the rows containing such a value and only stop once all the rows "
+        "have been converted, if more than this number of rows were rejected (in "
+        "which case no output file is written). With `--shard`, this applies to "
+        "each shard.",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-rf",
+        "--reject-file",
+        help="With `--max-errors`, the file in which to write the rejected rows, "
+        "delimited like the input file and prefixed by their row number, field "
+        "number and error code",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-cc",
+        "--config-cache-dir",
+        help="Directory in which to cache the validated configuration, to avoid "
+        "parsing the configuration file again as long as it doesn't change",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="The number of processes used to convert each input file in parallel "
+        "(default 1)",
+        action="store",
+        required=False,
+        default=1,
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="The number of processes (or threads, see `--worker-type`) used to "
+        "convert the files from the `--input-directory` concurrently, largest "
+        "files first (default 1)",
+        action="store",
+        required=False,
+        default=1,
+    )
+    parser.add_argument(
+        "-wt",
+        "--worker-type",
+        help="With `--workers`, whether the files are converted in separate "
+        "processes, or in threads of the same process sharing the loaded "
+        "configuration, which use less memory but only overlap the reading and "
+        "writing of the files, Python running one thread at a time (default "
+        "'process')",
+        choices=WORKER_TYPES,
+        required=False,
+        default="process",
+    )
+    parser.add_argument(
+        "-pw",
+        "--positional-writes",
+        help="With `--jobs`, have each process write the converted records "
+        "directly at their position in the preallocated output file, instead of "
+        "sending them back to be written in order. Requires all the records to have "
+        "the same length in bytes, the records being written in order otherwise.",
+        action="store_true",
+        required=False,
+    )
+    shard_group = parser.add_mutually_exclusive_group()
+    shard_group.add_argument(
+        "-sd",
+        "--shard",
+        help="Only convert the I-th of N parts of the input file, in the form I/N, "
+        "for instance to spread the conversion of a file over several machines. "
+        "The output is written to a part file (e.g. `output.part2of4.txt`), to be "
+        "merged with `--merge-shards` once all the shards have been converted. The "
+        "row numbers in the error messages are relative to the shard.",
+        action="store",
+        required=False,
+    )
+    shard_group.add_argument(
+        "-ms",
+        "--merge-shards",
+        help="Merge the part files of the N shards of the input file converted "
+        "with `--shard` into the output file, and delete them",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-ci",
+        "--checkpoint-interval",
+        help="Save a checkpoint next to the output file each time this number of "
+        "MiB of the input file have been converted, from which the conversion can "
+        "be resumed with `--resume` if it gets interrupted (default %d with "
+        "`--resume`)" % (CHECKPOINT_INTERVAL // 1024 // 1024),
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-rs",
+        "--resume",
+        help="Resume an interrupted conversion (run with the same arguments) from "
+        "its last checkpoint, once the partially written output files have been "
+        "validated. Without a checkpoint, the conversion starts from the "
+        "beginning.",
+        action="store_true",
+        required=False,
+    )
+    parser.add_argument(
+        "-st",
+        "--stats",
+        help="Save statistics about the conversion to this JSON file: the wall "
+        "and CPU time spent loading the configuration, reading, converting and "
+        "writing, the time spent on the values of each output format, the rows "
+        "per second, the bytes read and written and the numbers of diverted rows, "
+        "truncated values and rejected rows, per input file and in total",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-mr",
+        "--memory-report",
+        help="Save the peak memory usage of the conversion to this JSON file, per "
+        "input file and per stage (loading the configuration, reading, converting "
+        "and writing): the memory allocated by Python, traced with tracemalloc, "
+        "and the resident memory of the process. Tracing the memory slows the "
+        "conversion down.",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-pi",
+        "--progress-interval",
+        help="Report the progress of the conversion every this number of "
+        "seconds: the rows read, the MiB of the input files consumed, the current "
+        "rows per second and the estimated time left. With `--workers`, the "
+        "progress only gets updated once each input file has been converted.",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-pf",
+        "--progress-file",
+        help="With `--progress-interval`, append the progress reports to this "
+        "status file instead of printing them to the standard error",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-tr",
+        "--trace-rows",
+        help="With `--debug`, log a sample of the rows read from the input files: "
+        "a comma-delimited list of 'first:N' (the first N rows), 'last:N' (the "
+        "last N rows) and 'every:N' (every N-th row), e.g. 'first:5,every:10000'. "
+        "No rows are logged without this argument.",
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-po",
+        "--profile-output",
+        help="Profile the conversion and save the results to this file: with "
+        "`--profile-mode cprofile` (default), a `pstats` file of the time spent "
+        "in each function, to be read with e.g. `python -m pstats`; with "
+        "`--profile-mode sampling`, a JSON report of the functions that were "
+        "running most often when sampled every %d ms, with a low overhead. Only "
+        "the main process is profiled, not the workers of `--jobs` and "
+        "`--workers`." % (PROFILE_SAMPLE_INTERVAL * 1000),
+        action="store",
+        required=False,
+    )
+    parser.add_argument(
+        "-pm",
+        "--profile-mode",
+        help="The profiler used with `--profile-output`: 'cprofile' (default) or "
+        "'sampling'",
+        action="store",
+        required=False,
+        choices=PROFILE_MODES,
+    )
+    parser.add_argument(
+        "-e",
+        "--engine",
+        help="The engine used to convert the rows: 'python' (default) or 'numpy', "
+        "which converts blocks of rows with vectorized operations and requires "
+        "NumPy to be installed. Both engines generate the same output.",
+        action="store",
+        required=False,
+        choices=SUPPORTED_ENGINES,
+        default="python",
+    )
+    parser.add_argument(
+        "-wb",
+        "--write-buffer-size",
+        help="The size in KiB of the buffer used to write the output files "
+        "(default %d)" % (WRITE_BUFFER_SIZE // 1024),
+        action="store",
+        required=False,
+        default=WRITE_BUFFER_SIZE // 1024,
+    )
+    parser.add_argument(
+        "-fs",
+        "--fsync",
+        help="When to force the output files to be written to disk: 'none' "
+        "(default, left to the operating system), 'end' (once fully written) or "
+        "a number of MiB after which to do so (and at the end)",
+        action="store",
+        required=False,
+        default="none",
+    )
 
 
 def parse_args(arguments):
+    import argparse
+
     parser = argparse.ArgumentParser(
         description="Convert files from delimited (e.g. CSV) to fixed width format"
     )
@@ -681,6 +3382,615 @@ def parse_args(arguments):
     return args
 
 
+def get_times():
+    # The wall clock and the CPU time of this process, in seconds
+    import time
+
+    return (time.perf_counter(), time.process_time())
+
+
+def add_elapsed_times(stage_times, start_times):
+    # Add to the [wall, CPU] `stage_times` the times elapsed since `start_times`
+    times = get_times()
+    stage_times[0] += times[0] - start_times[0]
+    stage_times[1] += times[1] - start_times[1]
+
+
+def iter_timed(iterable, stats, stage, batch_size=STATS_BATCH_SIZE):
+    # Pass on the items of `iterable`, adding the time spent producing them to
+    # that `stage` of the `ConversionStats`. The items are fetched in batches of
+    # `batch_size`, to only read the clocks once per batch.
+    iterator = iter(iterable)
+    while True:
+        start_times = stats.start_stage(stage)
+        items = list(itertools.islice(iterator, batch_size))
+        stats.end_stage(stage, start_times)
+        if not items:
+            return
+        yield from items
+
+
+def iter_progress(rows, progress, batch_size=STATS_BATCH_SIZE):
+    # Pass on the rows, counting them in the `ProgressReporter` by batches of
+    # `batch_size`, so that the clock only gets read once per batch
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        progress.add_rows(len(batch))
+        yield from batch
+
+
+class RowTracer:
+    # Logs a sample of the rows of an input file at the DEBUG level, for
+    # `--trace-rows`: the `first` rows, every `every`-th row and the `last` rows
+    # (logged by `finish`, once all the rows have been read). The rows can be
+    # passed in several parts, numbered from their `first_row`. When no row gets
+    # logged, the rows are passed on as they are, at no cost.
+    def __init__(self, first=0, last=0, every=0):
+        self.first = first
+        self.every = every
+        self.last_rows = collections.deque(maxlen=last) if last else None
+        debugging = logging.getLogger().isEnabledFor(logging.DEBUG)
+        self.enabled = debugging and bool(first or last or every)
+
+    def is_sampled(self, idx_row):
+        return idx_row <= self.first or (self.every and idx_row % self.every == 0)
+
+    def iter_traced(self, rows, first_row=1):
+        if not self.enabled:
+            return rows
+        return self.iter_logged(rows, first_row)
+
+    def iter_logged(self, rows, first_row):
+        for (idx_row, row) in enumerate(rows, first_row):
+            if self.is_sampled(idx_row):
+                self.log_row(idx_row, row)
+            elif self.last_rows is not None:
+                self.last_rows.append((idx_row, row))
+            yield row
+
+    def log_row(self, idx_row, row):
+        logging.debug("Row %d (ignoring the header): %s", idx_row, " ||| ".join(row))
+
+    def finish(self):
+        if self.enabled and self.last_rows is not None:
+            for (idx_row, row) in self.last_rows:
+                self.log_row(idx_row, row)
+            self.last_rows.clear()
+
+
+def parse_trace_rows(value):
+    # Parse the `--trace-rows` argument, e.g. "first:5,last:5,every:1000", into
+    # the arguments of `RowTracer`, raising a ValueError if invalid
+    counts = {"first": 0, "last": 0, "every": 0}
+    for item in value.split(","):
+        (key, _, count) = item.strip().partition(":")
+        if key not in counts or int(count) < 1:
+            raise ValueError(item)
+        counts[key] = int(count)
+    return (counts["first"], counts["last"], counts["every"])
+
+
+class ConversionStats:
+    # Statistics about the conversion of an input file for `--stats`, collected
+    # by `process`: the [wall, CPU] times of the `STATS_STAGES`, the time taken
+    # by the values of each output format (see `add_format_stats`, only if
+    # `time_formats`), and the numbers of rows and bytes. The "convert" stage is
+    # timed including the "read" one, and the "write" stage is what remains.
+    # With `track_memory`, the peak memory usage of each stage is tracked too
+    # for `--memory-report` (see `MemoryTracker`).
+    def __init__(self, time_formats=True, track_memory=False):
+        self.memory = MemoryTracker() if track_memory else None
+        self.start_times = self.start_stage("load_config")
+        self.stages = {stage: [0.0, 0.0] for stage in STATS_STAGES}
+        self.formats = {} if time_formats else None
+
+    def start_stage(self, stage):
+        # Returns the start times to pass to `end_stage`
+        if self.memory is not None:
+            self.memory.enter(stage)
+        return get_times()
+
+    def end_stage(self, stage, start_times):
+        add_elapsed_times(self.stages[stage], start_times)
+        if self.memory is not None:
+            self.memory.exit()
+
+    def end_load_config(self):
+        # Called by `process` once the configuration has been loaded, the rest
+        # of the conversion being the "write" stage, apart from the reading and
+        # conversion of the rows
+        self.end_stage("load_config", self.start_times)
+        if self.memory is not None:
+            self.memory.enter("write")
+
+    def get_summary(self, input_file, output_files, byte_range, report):
+        # The statistics as saved in the `--stats` file, `output_files` being
+        # the output and diverted output files, and `byte_range` the (start,
+        # stop) offsets of the rows converted if not the whole input file
+        total_times = [0.0, 0.0]
+        add_elapsed_times(total_times, self.start_times)
+        stages = {stage: list(times) for (stage, times) in self.stages.items()}
+        for idx in (0, 1):
+            stages["convert"][idx] -= stages["read"][idx]
+            stages["write"][idx] = max(
+                total_times[idx]
+                - stages["load_config"][idx]
+                - self.stages["convert"][idx],
+                0.0,
+            )
+        return {
+            "input_file": input_file,
+            "output_file": output_files[0],
+            "num_rows": report["num_rows"],
+            "num_diverted": report["num_diverted"],
+            "num_truncated": report["num_truncated"],
+            "num_rejected": report.get("num_rejected", 0),
+            "input_bytes": (
+                os.path.getsize(input_file)
+                if byte_range is None
+                else byte_range[1] - byte_range[0]
+            ),
+            "output_bytes": sum(
+                os.path.getsize(f) for f in output_files if os.path.isfile(f)
+            ),
+            "wall_seconds": total_times[0],
+            "cpu_seconds": total_times[1],
+            "rows_per_second": report["num_rows"] / max(total_times[0], 1e-9),
+            "stages": {
+                stage: {"wall_seconds": wall, "cpu_seconds": cpu}
+                for (stage, (wall, cpu)) in stages.items()
+            },
+            "formats": self.formats,
+        }
+
+
+def get_current_rss():
+    # The resident set size of the current process in bytes, or None where it
+    # can't be read (only on Linux)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def get_peak_rss():
+    # The peak resident set size of the current process in bytes, or None where
+    # it can't be read (on Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # In bytes on macOS, in KiB elsewhere
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+class MemoryTracker:
+    # Peak memory usage of each of the `STATS_STAGES` of the conversion of an
+    # input file for `--memory-report`: the peak size of the memory allocated by
+    # Python (traced by `tracemalloc`), and the peak resident set size of the
+    # process (sampled by a thread every `sample_interval` seconds). The stages
+    # get nested as the rows flow through them (the rows being read while
+    # converting them, while writing the records), the memory being accounted
+    # to the innermost stage at the time.
+    def __init__(self, sample_interval=MEMORY_SAMPLE_INTERVAL):
+        import threading
+        import tracemalloc
+
+        self.started_tracing = not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+        self.stages = {
+            stage: {"peak_traced_bytes": 0, "peak_rss_bytes": None}
+            for stage in STATS_STAGES
+        }
+        self.active_stages = []
+        self.stopped = threading.Event()
+        self.sampler = None
+        if get_current_rss() is not None:
+            self.sampler = threading.Thread(
+                target=self.sample_rss, args=(sample_interval,), daemon=True
+            )
+            self.sampler.start()
+
+    def update(self):
+        # Account the peak traced memory since the previous update to the
+        # current stage. Without `tracemalloc.reset_peak` (before Python 3.9),
+        # only the current traced memory is accounted.
+        import tracemalloc
+
+        (current, peak) = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+            current = peak
+        if self.active_stages:
+            stats = self.stages[self.active_stages[-1]]
+            stats["peak_traced_bytes"] = max(stats["peak_traced_bytes"], current)
+
+    def sample_rss(self, sample_interval):
+        while not self.stopped.wait(sample_interval):
+            rss = get_current_rss()
+            active_stages = self.active_stages
+            if active_stages and rss is not None:
+                stats = self.stages[active_stages[-1]]
+                stats["peak_rss_bytes"] = max(stats["peak_rss_bytes"] or 0, rss)
+
+    def enter(self, stage):
+        self.update()
+        self.active_stages.append(stage)
+
+    def exit(self):
+        self.update()
+        self.active_stages.pop()
+
+    def get_summary(self):
+        # Stop tracking the memory, returning its peak usage in total and per
+        # stage
+        import tracemalloc
+
+        self.update()
+        self.stopped.set()
+        if self.sampler is not None:
+            self.sampler.join()
+        if self.started_tracing:
+            tracemalloc.stop()
+        peak_rss_values = [
+            stats["peak_rss_bytes"]
+            for stats in self.stages.values()
+            if stats["peak_rss_bytes"] is not None
+        ]
+        return {
+            "peak_traced_bytes": max(
+                stats["peak_traced_bytes"] for stats in self.stages.values()
+            ),
+            # The peak of the whole process where the memory can't be sampled
+            "peak_rss_bytes": max(peak_rss_values or [get_peak_rss()]),
+            "stages": self.stages,
+        }
+
+
+def save_memory_report(memory_report_file, files_memory_reports):
+    # Save the peak memory usage of the conversion of each input file (see
+    # `MemoryTracker`) and in total as JSON
+    import json
+
+    files_memory_reports = sorted(
+        files_memory_reports, key=lambda memory_report: memory_report["input_file"]
+    )
+    total = {}
+    for key in ("peak_traced_bytes", "peak_rss_bytes"):
+        values = [memory_report[key] for memory_report in files_memory_reports]
+        total[key] = max([value for value in values if value is not None] or [None])
+    with OutputWriter(memory_report_file) as writer:
+        writer.write(
+            json.dumps(
+                {
+                    "version": __version__,
+                    "files": files_memory_reports,
+                    "total": total,
+                },
+                indent=2,
+            )
+        )
+
+
+def get_total_stats(files_stats, start_times):
+    # Aggregate the statistics of the input files, the rows per second being
+    # based on the time elapsed since `start_times` (as the files may have
+    # been converted concurrently)
+    total = {"num_files": len(files_stats)}
+    for key in (
+        "num_rows",
+        "num_diverted",
+        "num_truncated",
+        "num_rejected",
+        "input_bytes",
+        "output_bytes",
+        "cpu_seconds",
+    ):
+        total[key] = sum(file_stats[key] for file_stats in files_stats)
+    total_times = [0.0, 0.0]
+    add_elapsed_times(total_times, start_times)
+    total["wall_seconds"] = total_times[0]
+    total["rows_per_second"] = total["num_rows"] / max(total_times[0], 1e-9)
+    total["stages"] = {
+        stage: {
+            key: sum(file_stats["stages"][stage][key] for file_stats in files_stats)
+            for key in ("wall_seconds", "cpu_seconds")
+        }
+        for stage in STATS_STAGES
+    }
+    total["formats"] = {}
+    for file_stats in files_stats:
+        merge_format_stats(total["formats"], file_stats["formats"])
+    return total
+
+
+def save_stats(stats_file, files_stats, start_times):
+    # Save the statistics of the conversion of each input file (see
+    # `ConversionStats`) and their total as JSON
+    import json
+
+    files_stats = sorted(files_stats, key=lambda file_stats: file_stats["input_file"])
+    with OutputWriter(stats_file) as writer:
+        writer.write(
+            json.dumps(
+                {
+                    "version": __version__,
+                    "files": files_stats,
+                    "total": get_total_stats(files_stats, start_times),
+                },
+                indent=2,
+            )
+        )
+
+
+class ProgressReporter:
+    # Reports the progress of the conversion of the `input_files` every
+    # `interval` seconds for `--progress-interval`, to stderr or appended to the
+    # `status_file`: the number of rows read, the bytes of the input files
+    # consumed out of their total size, the current rows per second and the
+    # estimated time left, based on the average bytes per second.
+    # `process` reports the file it converts with `start_file` and `end_file`,
+    # and its reader the rows read with `add_rows` and its position in the file
+    # with `get_offset`. The files converted in other processes get reported
+    # once converted with `add_converted_file`.
+    def __init__(self, interval, input_files, status_file=None):
+        import time
+
+        self.interval = interval
+        self.status_file = status_file
+        self.num_files = len(input_files)
+        self.file_sizes = {f: os.path.getsize(f) for f in input_files}
+        # Bytes of the files not started yet
+        self.pending_bytes = sum(self.file_sizes.values())
+        self.num_files_done = 0
+        self.bytes_done = 0
+        self.rows_done = 0
+        self.file_rows = 0
+        self.file_range = (0, 0)
+        self.get_offset = None
+        self.start_time = time.monotonic()
+        self.next_time = self.start_time + interval
+        self.last_report = (self.start_time, 0)
+
+    def start_file(self, input_file, byte_range=None):
+        # Starting again a file that was already started (to convert it again)
+        # only resets its rows
+        if input_file in self.file_sizes:
+            self.pending_bytes -= self.file_sizes.pop(input_file)
+        self.file_range = byte_range or (0, os.path.getsize(input_file))
+        self.file_rows = 0
+        self.get_offset = None
+
+    def end_file(self):
+        self.num_files_done += 1
+        self.bytes_done += self.file_range[1] - self.file_range[0]
+        self.rows_done += self.file_rows
+        self.file_range = (0, 0)
+        self.file_rows = 0
+        self.get_offset = None
+        self.report_if_due()
+
+    def add_converted_file(self, input_file, num_rows):
+        self.start_file(input_file)
+        self.file_rows = num_rows
+        self.end_file()
+
+    def add_rows(self, num_rows):
+        self.file_rows += num_rows
+        self.report_if_due()
+
+    def report_if_due(self):
+        import time
+
+        now = time.monotonic()
+        if now >= self.next_time:
+            self.next_time = now + self.interval
+            self.report(now)
+
+    def get_consumed_bytes(self):
+        (start, stop) = self.file_range
+        offset = start if self.get_offset is None else self.get_offset()
+        return self.bytes_done + min(max(offset, start), stop) - start
+
+    def report(self, now, done=False):
+        import datetime
+
+        num_rows = self.rows_done + self.file_rows
+        consumed_bytes = self.get_consumed_bytes()
+        total_bytes = (
+            self.bytes_done
+            + self.file_range[1]
+            - self.file_range[0]
+            + self.pending_bytes
+        )
+        elapsed = now - self.start_time
+        if done:
+            rates = "%d rows/s on average, in %s" % (
+                num_rows / max(elapsed, 1e-9),
+                datetime.timedelta(seconds=round(elapsed)),
+            )
+        else:
+            (last_time, last_rows) = self.last_report
+            self.last_report = (now, num_rows)
+            eta = "unknown"
+            if consumed_bytes > 0:
+                eta = datetime.timedelta(
+                    seconds=round(
+                        elapsed * (total_bytes - consumed_bytes) / consumed_bytes
+                    )
+                )
+            rates = "%d rows/s, ETA %s" % (
+                (num_rows - last_rows) / max(now - last_time, 1e-9),
+                eta,
+            )
+        line = (
+            "%s %s: %d of %d files done, %d rows, %.1f of %.1f MiB (%.1f%%), "
+            "%s\n"
+            % (
+                datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "Done" if done else "Progress",
+                self.num_files_done,
+                self.num_files,
+                num_rows,
+                consumed_bytes / 1024 / 1024,
+                total_bytes / 1024 / 1024,
+                100 * consumed_bytes / max(total_bytes, 1),
+                rates,
+            )
+        )
+        if self.status_file:
+            with open(self.status_file, "a") as f:
+                f.write(line)
+        else:
+            sys.stderr.write(line)
+            sys.stderr.flush()
+
+    def finish(self):
+        import time
+
+        self.report(time.monotonic(), done=True)
+
+
+class SamplingProfiler:
+    # Low overhead profiler for `--profile-mode sampling`: a thread records
+    # every `interval` seconds the function being run by the thread that
+    # enabled the profiler ("self" samples) and the functions of its call stack
+    # ("total" samples). Same interface as `cProfile.Profile`.
+    def __init__(self, interval=PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.num_samples = 0
+        self.self_samples = collections.Counter()
+        self.total_samples = collections.Counter()
+        self.thread = None
+
+    def enable(self):
+        import threading
+
+        self.profiled_thread_id = threading.get_ident()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+
+    def disable(self):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.profiled_thread_id)
+            if frame is None:
+                continue
+            self.num_samples += 1
+            self.self_samples[get_function_key(frame.f_code)] += 1
+            # Recursive functions only count once per sample
+            functions = set()
+            while frame is not None:
+                functions.add(get_function_key(frame.f_code))
+                frame = frame.f_back
+            self.total_samples.update(functions)
+
+    def get_summary(self, num_functions=PROFILE_NUM_FUNCTIONS):
+        # The `num_functions` functions with the most samples, as saved in the
+        # `--profile-output` file
+        functions = []
+        top_functions = sorted(
+            self.total_samples,
+            key=lambda key: (self.self_samples[key], self.total_samples[key]),
+            reverse=True,
+        )[:num_functions]
+        for key in top_functions:
+            (file_name, line, name) = key
+            functions.append(
+                {
+                    "function": name,
+                    "file": file_name,
+                    "line": line,
+                    "self_samples": self.self_samples[key],
+                    "total_samples": self.total_samples[key],
+                    "self_percent": 100 * self.self_samples[key] / self.num_samples,
+                    "total_percent": 100 * self.total_samples[key] / self.num_samples,
+                }
+            )
+        return {
+            "version": __version__,
+            "mode": "sampling",
+            "interval": self.interval,
+            "num_samples": self.num_samples,
+            "functions": functions,
+        }
+
+    def dump_stats(self, file):
+        import json
+
+        with OutputWriter(file) as writer:
+            writer.write(json.dumps(self.get_summary(), indent=2))
+
+
+def get_function_key(code):
+    # Identify the function the same way as `pstats`
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def start_profiler(profile_mode):
+    # Start profiling the conversion for `--profile-output`, with `cProfile`
+    # (whose results can be read with `pstats`) or the `SamplingProfiler`
+    if profile_mode == "sampling":
+        profiler = SamplingProfiler()
+    else:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def save_profile(profiler, profile_output):
+    profiler.disable()
+    profiler.dump_stats(profile_output)
+
+
+def validate_config_args(config, truncate=None, divert=None):
+    # See `check_config_args`, stopping the program if they are invalid
+    try:
+        check_config_args(config, truncate, divert)
+    except ConfigError as e:
+        exit_on_config_error(e)
+
+
+def check_config_args(config, truncate=None, divert=None):
+    # Check that the output formats of the configuration are supported and that
+    # the fields passed to `--truncate` and `--divert` are defined in it,
+    # raising ConfigError otherwise
+    for field in config:
+        check_output_format(field["output_format"])
+    if truncate:
+        for t in truncate:
+            if t > len(config):
+                raise ConfigError(
+                    "The value %d passed in the `--truncate` argument is invalid, it "
+                    "is higher than the %d fields defined in the configuration "
+                    "file." % (t, len(config)),
+                    26,
+                )
+    if divert:
+        for d in divert.keys():
+            if d > len(config):
+                raise ConfigError(
+                    "The value %d passed as field ID in the `--divert` argument is "
+                    "invalid, it is higher than the %d fields defined in the "
+                    "configuration file." % (d, len(config)),
+                    30,
+                )
+
+
 def process(
     input,
     output,
@@ -694,55 +4004,876 @@ def process(
     truncate=None,
     divert=None,
     input_encoding="utf-8",
+    jobs=1,
+    engine="python",
+    write_buffer_size=WRITE_BUFFER_SIZE,
+    fsync=None,
+    positional_writes=False,
+    shard=None,
+    max_errors=None,
+    reject_file=None,
+    checkpoint_interval=None,
+    resume=False,
+    trace_rows=None,
+    config_cache_dir=None,
+    stats=None,
+    progress=None,
+    memory_report=None,
 ):
-    # By default, set to the user's default locale, used to appropriately handle
-    # Decimal separators
-    setlocale(LC_NUMERIC, locale)
+    # If `stats` is a dictionary, the statistics about the conversion get
+    # collected in it (see `ConversionStats.get_summary`), and if
+    # `memory_report` is a dictionary, the peak memory usage of the conversion
+    # (see `MemoryTracker`). The progress of the conversion gets reported to the
+    # optional `ProgressReporter`. `trace_rows` are the arguments of the
+    # `RowTracer` logging a sample of the rows when debugging.
+    conversion_stats = None
+    if stats is not None or memory_report is not None:
+        conversion_stats = ConversionStats(stats is not None, memory_report is not None)
 
-    define_supported_output_formats()
+    # By default, the user's default locale is used to appropriately handle
+    # Decimal separators, without changing the locale of the process (see
+    # `get_locale_separators`), which fails before any output file gets written
+    # if the locale isn't available
+    get_locale_separators(locale)
+    get_supported_output_formats()
 
-    config = load_config(config)
+    # The configuration can also be passed already loaded by `load_config`
+    if not isinstance(config, list):
+        config = load_config(config, config_cache_dir)
+    if conversion_stats is not None:
+        conversion_stats.end_load_config()
+    validate_config_args(config, truncate, divert)
 
-    if truncate:
-        for t in truncate:
-            if t > len(config):
-                logging.critical(
-                    "The value %d passed in the `--truncate` argument is invalid, it "
-                    "is higher than the %d fields defined in the configuration file. "
-                    "Exiting..." % (t, len(config))
-                )
-                sys.exit(26)
-    if divert:
-        for d in divert.keys():
-            if d > len(config):
-                logging.critical(
-                    "The value %d passed as field ID in the `--divert` argument is "
-                    "invalid, it is higher than the %d fields defined in the "
-                    "configuration file. Exiting..." % (d, len(config))
+    # The rows flow from the input file through the conversion to the output
+    # files one at a time, keeping the memory usage flat regardless of the size
+    # of the input file
+    # The diverted content gets saved to its separate file with "_diverted" added
+    # before the extension
+    diverted_output = "%s_diverted%s" % (os.path.splitext(output))
+    byte_range = None
+    if shard:
+        # Only convert the rows of that shard, to part files merged afterwards
+        byte_range = get_shard_range(input, quotechar, skip_header, skip_footer, *shard)
+        (skip_header, skip_footer) = (0, 0)
+        output = get_shard_file(output, *shard)
+        diverted_output = get_shard_file(diverted_output, *shard)
+        if reject_file:
+            reject_file = get_shard_file(reject_file, *shard)
+    if progress is not None:
+        progress.start_file(input, byte_range)
+    input_content = iter_input_file(
+        input,
+        delimiter,
+        quotechar,
+        skip_header,
+        skip_footer,
+        input_encoding,
+        byte_range,
+        progress,
+    )
+    tracer = RowTracer(*(trace_rows or ()))
+    input_content = tracer.iter_traced(input_content)
+    report = {}
+    # With `max_errors`, the rows that can't be converted are rejected instead
+    # of stopping the program
+    rejected_rows = None if max_errors is None else []
+    # Resuming requires the checkpoints to be saved
+    if resume and not checkpoint_interval:
+        checkpoint_interval = CHECKPOINT_INTERVAL
+    written = False
+    if (
+        jobs > 1
+        and positional_writes
+        and can_write_positional(max_errors, checkpoint_interval)
+    ):
+        written = write_output_positional(
+            input_content,
+            config,
+            output,
+            diverted_output,
+            date_field_to_report_on,
+            truncate,
+            divert,
+            report,
+            locale,
+            jobs,
+            engine=engine,
+            buffer_size=write_buffer_size,
+            fsync=fsync,
+            stats=conversion_stats,
+        )
+        if not written:
+            logging.warning(
+                "The records of the output file %s don't all have the same "
+                "length in bytes, they are converted again to be written in "
+                "order instead." % output
+            )
+            if progress is not None:
+                progress.start_file(input, byte_range)
+            input_content = iter_input_file(
+                input,
+                delimiter,
+                quotechar,
+                skip_header,
+                skip_footer,
+                input_encoding,
+                byte_range,
+                progress,
+            )
+            # The rows read again are logged again, the last ones only once
+            input_content = tracer.iter_traced(input_content)
+    if not written and checkpoint_interval:
+        # Convert the rows in segments, saving a checkpoint after each one
+        rows_range = byte_range or get_shard_range(
+            input, quotechar, skip_header, skip_footer, 1, 1
+        )
+        settings = [
+            config,
+            truncate,
+            divert,
+            date_field_to_report_on,
+            delimiter,
+            quotechar,
+            input_encoding,
+            locale,
+        ]
+        write_output_checkpointed(
+            functools.partial(
+                iter_convert_input_range,
+                input,
+                delimiter,
+                quotechar,
+                input_encoding,
+                config,
+                date_field_to_report_on,
+                truncate,
+                divert,
+                locale,
+                jobs,
+                engine,
+                rejected_rows,
+                conversion_stats,
+                progress,
+                tracer,
+            ),
+            get_initial_checkpoint(input, rows_range, settings, reject_file),
+            output,
+            diverted_output,
+            report,
+            quotechar,
+            checkpoint_interval,
+            resume,
+            write_buffer_size,
+            fsync,
+            rejected_rows,
+            max_errors,
+            reject_file,
+            delimiter,
+        )
+        written = True
+    if not written:
+        converted_content = iter_convert_input(
+            input_content,
+            config,
+            date_field_to_report_on,
+            truncate,
+            divert,
+            report,
+            locale,
+            jobs,
+            engine,
+            rejected_rows,
+            stats=conversion_stats,
+        )
+        if rejected_rows is not None:
+            converted_content = iter_checking_rejected_rows(
+                converted_content,
+                rejected_rows,
+                max_errors,
+                reject_file,
+                delimiter,
+                quotechar,
+                report,
+            )
+        write_output_stream(
+            converted_content, output, diverted_output, write_buffer_size, fsync
+        )
+
+    tracer.finish()
+    log_report(input, report)
+    if shard:
+        save_shard_report(output, input, byte_range, report, *shard)
+    if progress is not None:
+        progress.end_file()
+    if stats is not None:
+        stats.update(
+            conversion_stats.get_summary(
+                input, (output, diverted_output), byte_range, report
+            )
+        )
+    if memory_report is not None:
+        memory_report["input_file"] = input
+        memory_report.update(conversion_stats.memory.get_summary())
+    return (report["num_rows"], report["oldest_date"], report["most_recent_date"])
+
+
+class Converter:
+    # Reusable conversion of rows to fixed width records, for use as a library
+    # by long-lived programs converting many input files with the same
+    # configuration. The configuration (the path of a configuration file or a
+    # list as returned by `load_config`) gets loaded and compiled only once,
+    # with the decimal `separators` (by default those of the `locale`, itself by
+    # default the current one) captured at that time, and nothing is stored in
+    # module-level state, so that converters using different locales can be
+    # used concurrently in several threads:
+    #     converter = Converter("configuration.xlsx", truncate=[7])
+    #     report = converter.convert_file("input.txt", "output.txt", "^")
+    #     records = list(converter.convert_rows([["1", "20/6/2020"]]))
+    # `truncate`, `divert`, `date_field_to_report_on` and `engine` are the same
+    # as the arguments of `process`. As with `process`, the records of the
+    # diverted rows are always kept apart from the other ones.
+    # Unlike `process`, errors never stop the program: an invalid configuration
+    # raises ConfigError (a ValueError) and, unless `rejected_rows` is given, a
+    # value that can't be converted raises its ConversionError.
+    def __init__(
+        self,
+        config,
+        truncate=None,
+        divert=None,
+        date_field_to_report_on=None,
+        separators=None,
+        engine="python",
+        config_cache_dir=None,
+        locale=None,
+    ):
+        if not isinstance(config, list):
+            config = read_config(config, config_cache_dir)
+        check_config_args(config, truncate, divert)
+        if separators is None:
+            separators = get_locale_separators(locale)
+        self.config = config
+        self.divert = divert
+        self.columns = compile_config(config, truncate, divert, separators)
+        self.date_field_to_report_on = date_field_to_report_on
+        self.convert_content = get_rows_converter(engine)
+
+    def iter_convert(self, rows, report=None, rejected_rows=None, first_row=1):
+        # The (divert_row, record) tuples of the rows, see `iter_convert_rows`
+        return self.convert_content(
+            rows,
+            self.columns,
+            self.date_field_to_report_on,
+            report,
+            first_row,
+            rejected_rows,
+            raise_errors=True,
+        )
+
+    def check_diverted_output(self, diverted_output, name):
+        # Like `process`, the records of the diverted rows are never mixed with
+        # the other ones: raises ValueError if rows can be diverted but there is
+        # no separate `diverted_output` for them
+        if self.divert and diverted_output is None:
+            raise ValueError(
+                "Rows can be diverted, `%s` is needed to get their records "
+                "(`iter_convert` yields all the records in order)" % name
+            )
+
+    def convert_rows(
+        self, rows, report=None, diverted_records=None, rejected_rows=None, first_row=1
+    ):
+        # The records of the rows (lists of values), the records of the diverted
+        # rows being appended to the `diverted_records` list instead of being
+        # yielded. That list is required when rows can be diverted.
+        self.check_diverted_output(diverted_records, "diverted_records")
+        return self.iter_records(
+            rows, report, diverted_records, rejected_rows, first_row
+        )
+
+    def iter_records(self, rows, report, diverted_records, rejected_rows, first_row):
+        # Generator of the records returned by `convert_rows`
+        for (divert_row, record) in self.iter_convert(
+            rows, report, rejected_rows, first_row
+        ):
+            if divert_row:
+                diverted_records.append(record)
+            else:
+                yield record
+
+    def convert_file(
+        self,
+        input_file,
+        output_file,
+        delimiter=",",
+        quotechar='"',
+        skip_header=0,
+        skip_footer=0,
+        encoding="utf-8",
+        buffer_size=WRITE_BUFFER_SIZE,
+        fsync=None,
+    ):
+        # Convert the input file like `process`, the diverted rows being written
+        # to the output file with "_diverted" added before its extension.
+        # Returns the report of the conversion (see `get_empty_report`).
+        rows = iter_input_file(
+            input_file, delimiter, quotechar, skip_header, skip_footer, encoding
+        )
+        report = {}
+        write_output_stream(
+            self.iter_convert(rows, report),
+            output_file,
+            "%s_diverted%s" % os.path.splitext(output_file),
+            buffer_size,
+            fsync,
+        )
+        log_report(input_file, report)
+        return report
+
+    def convert_stream(
+        self,
+        input_stream,
+        output_stream,
+        diverted_output_stream=None,
+        delimiter=",",
+        quotechar='"',
+        skip_header=0,
+        skip_footer=0,
+    ):
+        # Convert the rows read from a text file object (opened with
+        # `newline=""`) to records written to another one, separated by "\n".
+        # The records of the diverted rows are written to
+        # `diverted_output_stream`, which is required when rows can be
+        # diverted. Returns the report of the conversion (see
+        # `get_empty_report`).
+        import csv
+
+        self.check_diverted_output(diverted_output_stream, "diverted_output_stream")
+
+        rows = csv.reader(input_stream, delimiter=delimiter, quotechar=quotechar)
+        rows = itertools.islice(rows, skip_header, None)
+        if skip_footer > 0:
+            rows = skip_last_rows(rows, skip_footer)
+        report = {}
+        # Streams in which a record has been written, to separate the next ones
+        written_streams = set()
+        for (divert_row, record) in self.iter_convert(rows, report):
+            stream = diverted_output_stream if divert_row else output_stream
+            if id(stream) in written_streams:
+                stream.write("\n")
+            else:
+                written_streams.add(id(stream))
+            stream.write(record)
+        return report
+
+
+def get_shard_file(output_file, shard, num_shards):
+    # The part file in which the output of a shard gets written, e.g.
+    # "output.part2of4.txt" for the output file "output.txt"
+    return "%s.part%dof%d%s" % (
+        os.path.splitext(output_file)[0],
+        shard,
+        num_shards,
+        os.path.splitext(output_file)[1],
+    )
+
+
+def save_shard_report(part_file, input_file, byte_range, report, shard, num_shards):
+    # Save next to the part file the information needed to merge it, which also
+    # marks that shard as completed
+    import json
+
+    with OutputWriter(part_file + ".json") as writer:
+        writer.write(
+            json.dumps(
+                {
+                    "version": __version__,
+                    "input_file": os.path.abspath(input_file),
+                    "input_size": os.path.getsize(input_file),
+                    "shard": shard,
+                    "num_shards": num_shards,
+                    "start": byte_range[0],
+                    "stop": byte_range[1],
+                    "num_rows": report["num_rows"],
+                    "oldest_date": report["oldest_date"],
+                    "most_recent_date": report["most_recent_date"],
+                }
+            )
+        )
+
+
+def load_shard_reports(input_file, output_file, num_shards):
+    # Load the information saved by `save_shard_report` for each shard, checking
+    # that all the shards have been converted from that input file, each one
+    # starting where the previous one stopped
+    import json
+
+    input_size = os.path.getsize(input_file)
+    shard_reports = []
+    previous_stop = 0
+    for shard in range(1, num_shards + 1):
+        report_file = get_shard_file(output_file, shard, num_shards) + ".json"
+        try:
+            with open(report_file) as f:
+                shard_report = json.load(f)
+        except (OSError, ValueError):
+            shard_report = {}
+        if (
+            not isinstance(shard_report, dict)
+            or shard_report.get("input_file") != os.path.abspath(input_file)
+            or shard_report.get("input_size") != input_size
+            or shard_report.get("num_shards") != num_shards
+            or shard_report.get("start", previous_stop) < previous_stop
+        ):
+            logging.critical(
+                "The shard %d of %d has not been converted from the input file %s "
+                "to the part file %s. Exiting..."
+                % (
+                    shard,
+                    num_shards,
+                    input_file,
+                    get_shard_file(output_file, shard, num_shards),
                 )
-                sys.exit(30)
+            )
+            sys.exit(48)
+        previous_stop = shard_report["stop"]
+        shard_reports.append(shard_report)
+    return shard_reports
+
+
+def copy_file_content(source_file, output_fd):
+    # Append the content of `source_file` at the current position of
+    # `output_fd`, copied within the kernel when supported
+    with open(source_file, "rb") as source:
+        source_fd = source.fileno()
+        remaining = os.fstat(source_fd).st_size
+        for copy_function in ("copy_file_range", "sendfile"):
+            try:
+                while remaining > 0:
+                    if copy_function == "copy_file_range":
+                        num_bytes = os.copy_file_range(source_fd, output_fd, remaining)
+                    else:
+                        num_bytes = os.sendfile(output_fd, source_fd, None, remaining)
+                    if num_bytes == 0:
+                        break
+                    remaining -= num_bytes
+                return
+            except (AttributeError, OSError):
+                # Not supported by the platform or between these file systems,
+                # the offsets of both files having moved by what got copied
+                continue
+        while True:
+            data = source.read(WRITE_BUFFER_SIZE)
+            if not data:
+                return
+            while data:
+                data = data[os.write(output_fd, data) :]
+
+
+def merge_shards(input_file, output_file, num_shards, fsync=None, reject_file=None):
+    # Concatenate in order the part files of the `num_shards` shards of the
+    # input file into the output file (and their diverted and reject part files
+    # into the diverted output file and reject file), before deleting them.
+    # Returns the combined number of rows and oldest/most recent dates, like
+    # `process`.
+    diverted_output_file = "%s_diverted%s" % (os.path.splitext(output_file))
+    shard_reports = load_shard_reports(input_file, output_file, num_shards)
+    separator = os.linesep.encode("ascii")
+    part_files = []
+    for merged_file in (output_file, diverted_output_file, reject_file):
+        if merged_file is None:
+            continue
+        parts = [
+            get_shard_file(merged_file, shard, num_shards)
+            for shard in range(1, num_shards + 1)
+        ]
+        parts = [part for part in parts if os.path.isfile(part)]
+        part_files.extend(parts)
+        if merged_file != output_file and not parts:
+            # No row got diverted or rejected
+            continue
+        with OutputWriter(merged_file, fsync=fsync) as writer:
+            output_fd = writer.file.fileno()
+            first_part = True
+            for part in parts:
+                if os.path.getsize(part) == 0:
+                    continue
+                if not first_part:
+                    os.write(output_fd, separator)
+                first_part = False
+                copy_file_content(part, output_fd)
+    for part_file in part_files:
+        os.remove(part_file)
+    for shard in range(1, num_shards + 1):
+        os.remove(get_shard_file(output_file, shard, num_shards) + ".json")
 
-    input_content = read_input_file(
-        input, delimiter, quotechar, skip_header, skip_footer, input_encoding
+    return (
+        sum(shard_report["num_rows"] for shard_report in shard_reports),
+        min(shard_report["oldest_date"] for shard_report in shard_reports),
+        max(shard_report["most_recent_date"] for shard_report in shard_reports),
     )
 
-    (
-        output_content,
-        diverted_output_content,
-        oldest_date,
-        most_recent_date,
-    ) = convert_content(
-        input_content, config, date_field_to_report_on, truncate, divert
+
+def get_checkpoint_file(output_file):
+    # The sidecar file in which `write_output_checkpointed` saves the progress
+    # of the conversion to `output_file`
+    return output_file + ".checkpoint.json"
+
+
+def get_initial_checkpoint(input_file, rows_range, settings, reject_file=None):
+    # The checkpoint before any row has been converted: the input file and its
+    # (start, stop) offsets of the rows to convert, a hash of the `settings`
+    # that determine the output, the offset of the next row to convert, the
+    # report of the rows converted so far (see `get_empty_report`), and the
+    # [size, checksum] of the partially written output files (None for the
+    # diverted output file until a row gets diverted, and for the reject file
+    # if there is none)
+    import hashlib
+    import json
+
+    stat = os.stat(input_file)
+    return {
+        "version": __version__,
+        "input_file": os.path.abspath(input_file),
+        "input_size": stat.st_size,
+        "input_mtime_ns": stat.st_mtime_ns,
+        "start": rows_range[0],
+        "stop": rows_range[1],
+        "settings": hashlib.sha256(
+            json.dumps(settings, sort_keys=True).encode("utf-8")
+        ).hexdigest(),
+        "input_offset": rows_range[0],
+        **get_empty_report(),
+        "output": [0, 0],
+        "diverted_output": None,
+        "reject_file": None if reject_file is None else [0, 0],
+        "num_rejected_rows": 0,
+    }
+
+
+def load_checkpoint(
+    checkpoint_file, initial_checkpoint, output_file, diverted_output_file, reject_file
+):
+    # Load the checkpoint saved by an interrupted run, returning
+    # `initial_checkpoint` if there is none. It must have been saved for the
+    # same input file, rows and settings as `initial_checkpoint`, and the
+    # partially written output files must still be as they were at that time.
+    import json
+
+    try:
+        with open(checkpoint_file) as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        logging.info("No checkpoint %s, starting from the beginning" % checkpoint_file)
+        return initial_checkpoint
+    except (OSError, ValueError):
+        checkpoint = None
+    valid = isinstance(checkpoint, dict) and all(
+        checkpoint.get(key) == value
+        for (key, value) in initial_checkpoint.items()
+        if key in ("version", "input_file", "input_size", "input_mtime_ns")
+        or key in ("start", "stop", "settings")
+    )
+    for (key, partial_file) in (
+        ("output", output_file),
+        ("diverted_output", diverted_output_file),
+        ("reject_file", reject_file),
+    ):
+        if not valid:
+            break
+        if key != "diverted_output" and (initial_checkpoint[key] is None) != (
+            checkpoint.get(key) is None
+        ):
+            valid = False
+        elif checkpoint.get(key) is not None:
+            valid = resume_size_is_valid(partial_file, checkpoint[key])
+    if not valid:
+        logging.critical(
+            "The checkpoint %s doesn't match the input file %s, the arguments or "
+            "the partially written output files. Delete it to convert the input "
+            "file from the beginning. Exiting..."
+            % (checkpoint_file, initial_checkpoint["input_file"])
+        )
+        sys.exit(56)
+    logging.info(
+        "Resuming after row %d from the checkpoint %s"
+        % (checkpoint["num_rows"], checkpoint_file)
+    )
+    return checkpoint
+
+
+def update_checkpoint(
+    checkpoint,
+    byte_range,
+    segment_report,
+    writer,
+    diverted_writer,
+    rejected_rows_writer,
+):
+    # Record in the checkpoint the conversion of the segment of rows between the
+    # (start, stop) offsets of `byte_range`, once its records have been written
+    checkpoint["input_offset"] = byte_range[1]
+    merge_report(checkpoint, segment_report)
+    checkpoint["output"] = writer.checkpoint()
+    if diverted_writer is not None:
+        checkpoint["diverted_output"] = diverted_writer.checkpoint()
+    checkpoint["reject_file"] = rejected_rows_writer.checkpoint()
+    checkpoint["num_rejected_rows"] = rejected_rows_writer.num_rows
+
+
+def save_checkpoint(checkpoint_file, checkpoint):
+    import json
+
+    with OutputWriter(checkpoint_file, fsync=0) as writer:
+        writer.write(json.dumps(checkpoint))
+
+
+def write_output_checkpointed(
+    convert_range,
+    checkpoint,
+    output_file,
+    diverted_output_file,
+    report,
+    quotechar,
+    checkpoint_interval=CHECKPOINT_INTERVAL,
+    resume=False,
+    buffer_size=WRITE_BUFFER_SIZE,
+    fsync=None,
+    rejected_rows=None,
+    max_errors=None,
+    reject_file=None,
+    delimiter=",",
+):
+    # Convert the rows of the input file in segments of about
+    # `checkpoint_interval` bytes, `convert_range(byte_range, report,
+    # first_row)` returning the converted content of a segment. Once the
+    # records of a segment have been written to disk, the progress is saved as
+    # a checkpoint next to the output file, from which `resume` continues the
+    # conversion after an interruption. The records are written to temporary
+    # files with a fixed name, which only replace the output files (and the
+    # checkpoint gets deleted) once all the rows have been converted.
+    checkpoint_file = get_checkpoint_file(output_file)
+    if resume:
+        checkpoint = load_checkpoint(
+            checkpoint_file, checkpoint, output_file, diverted_output_file, reject_file
+        )
+    writer = OutputWriter(output_file, buffer_size, fsync, checkpoint["output"][0])
+    diverted_writer = None
+    if checkpoint["diverted_output"] is not None:
+        diverted_writer = OutputWriter(
+            diverted_output_file, buffer_size, fsync, checkpoint["diverted_output"][0]
+        )
+    rejected_rows_writer = RejectedRowsWriter(
+        reject_file,
+        delimiter,
+        quotechar,
+        (checkpoint["reject_file"] or [0])[0],
+        checkpoint["num_rejected_rows"],
+    )
+    try:
+        for byte_range in iter_checkpoint_segments(
+            checkpoint["input_file"],
+            quotechar,
+            checkpoint["input_offset"],
+            checkpoint["stop"],
+            checkpoint_interval,
+        ):
+            segment_report = {}
+            for (divert_row, record) in convert_range(
+                byte_range, segment_report, checkpoint["num_rows"] + 1
+            ):
+                if rejected_rows:
+                    rejected_rows_writer.write(rejected_rows)
+                if divert_row:
+                    if diverted_writer is None:
+                        diverted_writer = OutputWriter(
+                            diverted_output_file, buffer_size, fsync, 0
+                        )
+                    diverted_writer.write(record)
+                else:
+                    writer.write(record)
+            if rejected_rows:
+                rejected_rows_writer.write(rejected_rows)
+            update_checkpoint(
+                checkpoint,
+                byte_range,
+                segment_report,
+                writer,
+                diverted_writer,
+                rejected_rows_writer,
+            )
+            save_checkpoint(checkpoint_file, checkpoint)
+    except BaseException:
+        # Keep the partially written files, to resume from the last checkpoint
+        writer.close()
+        rejected_rows_writer.close()
+        if diverted_writer is not None:
+            diverted_writer.close()
+        raise
+
+    if os.path.isfile(checkpoint_file):
+        os.remove(checkpoint_file)
+    rejected_rows_writer.commit()
+    if max_errors is not None and rejected_rows_writer.num_rows > max_errors:
+        writer.abort()
+        if diverted_writer is not None:
+            diverted_writer.abort()
+        check_num_rejected_rows(rejected_rows_writer.num_rows, max_errors)
+    writer.commit()
+    if diverted_writer is not None:
+        diverted_writer.commit()
+    report.update((key, checkpoint[key]) for key in get_empty_report())
+    report["num_rejected"] = checkpoint["num_rejected_rows"]
+
+
+def init_directory_worker(config_file, config_cache_dir):
+    # Runs once in each worker process of the pool used by `process_files`, to
+    # load the configuration file only once per worker
+    get_supported_output_formats()
+    WORKER_STATE["config"] = load_config(config_file, config_cache_dir)
+
+
+def process_in_worker(
+    input_file,
+    output_file,
+    process_args,
+    collect_stats=False,
+    collect_memory=False,
+    config=None,
+):
+    # Returns the number of rows converted, the statistics of the conversion if
+    # `collect_stats` and its memory report if `collect_memory`. The worker
+    # threads share the loaded `config`, the worker processes each load their
+    # own (see `init_directory_worker`).
+    logging.info("Processing input file %s", input_file)
+    stats = {} if collect_stats else None
+    memory_report = {} if collect_memory else None
+    (num_rows, _, _) = process(
+        input_file,
+        output_file,
+        WORKER_STATE["config"] if config is None else config,
+        *process_args,
+        stats=stats,
+        memory_report=memory_report
+    )
+    return (num_rows, stats, memory_report)
+
+
+def process_files(
+    input_output_files,
+    config_file,
+    process_args,
+    workers=1,
+    move_input_files_to=None,
+    config_cache_dir=None,
+    stats=None,
+    progress=None,
+    memory_reports=None,
+    worker_type="process",
+):
+    # Process each (input file, output file) combination, passing `process_args`
+    # as the remaining arguments to `process`. With several workers, the files
+    # are processed concurrently in a pool of processes, or of threads sharing
+    # the configuration depending on the `worker_type`, the largest files being
+    # scheduled first to minimize the total duration. An input file only gets
+    # moved once its output has been fully written. If `stats` is a list, the
+    # statistics of the conversion of each file get appended to it, and if
+    # `memory_reports` is a list, their memory reports.
+    # The progress gets reported to the optional `ProgressReporter`, only once
+    # each file has been converted when using several workers.
+    import shutil
+
+    if workers <= 1:
+        for (input_file, output_file) in input_output_files:
+            logging.info("Processing input file %s", input_file)
+            file_stats = None if stats is None else {}
+            memory_report = None if memory_reports is None else {}
+            process(
+                input_file,
+                output_file,
+                config_file,
+                *process_args,
+                config_cache_dir=config_cache_dir,
+                stats=file_stats,
+                progress=progress,
+                memory_report=memory_report
+            )
+            if stats is not None:
+                stats.append(file_stats)
+            if memory_reports is not None:
+                memory_reports.append(memory_report)
+            if move_input_files_to:
+                shutil.move(input_file, move_input_files_to)
+        if progress is not None:
+            progress.finish()
+        return
+
+    import concurrent.futures
+
+    input_output_files = sorted(
+        input_output_files, key=lambda f: os.path.getsize(f[0]), reverse=True
     )
+    config = None
+    if worker_type == "thread":
+        # The decimal separators being resolved per conversion, the files can be
+        # converted concurrently in threads of this process without changing its
+        # locale
+        get_supported_output_formats()
+        config = load_config(config_file, config_cache_dir)
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    else:
+        executor = get_process_pool(
+            workers, init_directory_worker, (config_file, config_cache_dir)
+        )
+    with executor:
+        futures = {}
+        for (input_file, output_file) in input_output_files:
+            future = executor.submit(
+                process_in_worker,
+                input_file,
+                output_file,
+                process_args,
+                stats is not None,
+                memory_reports is not None,
+                config,
+            )
+            futures[future] = input_file
+        try:
+            for future in iter_completed(futures, progress):
+                (num_rows, file_stats, memory_report) = future.result()
+                if progress is not None:
+                    progress.add_converted_file(futures[future], num_rows)
+                if stats is not None:
+                    stats.append(file_stats)
+                if memory_reports is not None:
+                    memory_reports.append(memory_report)
+                if move_input_files_to:
+                    shutil.move(futures[future], move_input_files_to)
+        except BaseException:
+            # Don't start processing the remaining files
+            for future in futures:
+                future.cancel()
+            raise
+    if progress is not None:
+        progress.finish()
+
 
-    write_output_file(output_content, output)
-    if diverted_output_content:
-        # Save the diverted content to its separate file with "_diverted" added before
-        # the extension
-        diverted_output = "%s_diverted%s" % (os.path.splitext(output))
-        write_output_file(diverted_output_content, diverted_output)
+def iter_completed(futures, progress=None):
+    # Yield the futures as they complete, like `concurrent.futures.as_completed`,
+    # waking up every interval of the `ProgressReporter` to report the progress
+    import concurrent.futures
 
-    return (len(input_content), oldest_date, most_recent_date)
+    if progress is None:
+        yield from concurrent.futures.as_completed(futures)
+        return
+    pending = set(futures)
+    while pending:
+        (done, pending) = concurrent.futures.wait(
+            pending,
+            timeout=progress.interval,
+            return_when=concurrent.futures.FIRST_COMPLETED,
+        )
+        yield from done
+        progress.report_if_due()
 
 
 def init():
@@ -764,24 +4895,79 @@ def init():
                 )
                 input_output_files.append((input_file, output_file))
 
-        for (input_file, output_file) in input_output_files:
-            logging.info("Processing input file %s", input_file)
-            process(
-                input_file,
-                output_file,
+        process_args = (
+            args.delimiter,
+            args.quotechar,
+            args.skip_header,
+            args.skip_footer,
+            None,
+            args.locale,
+            args.truncate,
+            args.divert,
+            args.input_encoding,
+            args.jobs,
+            args.engine,
+            args.write_buffer_size,
+            args.fsync,
+            args.positional_writes,
+            args.shard,
+            args.max_errors,
+            args.reject_file,
+            args.checkpoint_interval,
+            args.resume,
+            args.trace_rows,
+        )
+        profiler = None
+        if args.profile_output:
+            profiler = start_profiler(args.profile_mode)
+        try:
+            if args.merge_shards:
+                merge_shards(
+                    args.input,
+                    args.output,
+                    args.merge_shards,
+                    args.fsync,
+                    args.reject_file,
+                )
+                return
+            start_times = get_times()
+            files_stats = None if args.stats is None else []
+            memory_reports = None if args.memory_report is None else []
+            progress = None
+            if args.progress_interval:
+                progress = ProgressReporter(
+                    args.progress_interval,
+                    [input_file for (input_file, _) in input_output_files],
+                    args.progress_file,
+                )
+            process_files(
+                input_output_files,
                 args.config,
-                args.delimiter,
-                args.quotechar,
-                args.skip_header,
-                args.skip_footer,
-                None,
-                args.locale,
-                args.truncate,
-                args.divert,
-                args.input_encoding,
-            )
-            if args.move_input_files:
-                shutil.move(input_file, args.output_directory)
+                process_args,
+                args.workers,
+                args.output_directory if args.move_input_files else None,
+                args.config_cache_dir,
+                files_stats,
+                progress,
+                memory_reports,
+                args.worker_type,
+            )
+            if files_stats is not None:
+                save_stats(args.stats, files_stats, start_times)
+            if memory_reports is not None:
+                save_memory_report(args.memory_report, memory_reports)
+        finally:
+            # Also save the profile of a conversion that failed
+            if profiler is not None:
+                save_profile(profiler, args.profile_output)
+
 
+CELL_CONVERTERS = {
+    "Integer": convert_integer,
+    "Decimal": convert_decimal,
+    "Keep numeric": convert_keep_numeric,
+    "Time": convert_time,
+    "Text": convert_text,
+}
 
 init()
@@ -9,21 +9,44 @@
 #   --title="Code test coverage for delimited2fixedwidth"
 
 import contextlib
+import csv
 import datetime
+import importlib.util
 import io
+import json
 import logging
 import os
 import re
 import shutil
+import subprocess
 import sys
 import tempfile
+import time
 import unittest
+import unittest.mock
 from locale import LC_NUMERIC
 from locale import Error as localeError
 from locale import getlocale, setlocale
 
 CURRENT_VERSION = "1.0.12-dev"
 
+# Startup time budgets (in seconds) for running the program from the command line
+STARTUP_BUDGET_VERSION = 0.5
+STARTUP_BUDGET_TRIVIAL_CONVERSION = 1.0
+# Modules that must not be imported when they are not needed
+DEFERRED_MODULES = (
+    "concurrent.futures",
+    "csv",
+    "datetime",
+    "hashlib",
+    "json",
+    "numpy",
+    "openpyxl",
+    "pathlib",
+)
+# The "numpy" conversion engine is optional
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None
+
 sys.path.append(".")
 target = __import__("delimited2fixedwidth")
 
@@ -125,6 +148,17 @@ def num_files_in_directory(dir):
     )
 
 
+def get_available_locale(*names):
+    # The first of the locales that is available, or None
+    for name in names:
+        try:
+            target.get_locale_separators(name)
+        except localeError:
+            continue
+        return name
+    return None
+
+
 class TestVersion(unittest.TestCase):
     def test_version_valid(self):
         """
@@ -150,6 +184,113 @@ class TestWriteOutputFile(unittest.TestCase):
         os.remove(temp_output_file)
 
 
+class TestWriteOutputStream(unittest.TestCase):
+    def test_write_output_stream(self):
+        """
+        Test writing the output files incrementally, with diverted content
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        diverted_output_file = os.path.join(temp_dir, "output_diverted.txt")
+        converted_content = iter(
+            [(False, "line 1"), (True, "diverted 1"), (False, "line 2")]
+        )
+        target.write_output_stream(converted_content, output_file, diverted_output_file)
+        with open(output_file) as f:
+            self.assertEqual(f.read(), "line 1\nline 2")
+        with open(diverted_output_file) as f:
+            self.assertEqual(f.read(), "diverted 1")
+        shutil.rmtree(temp_dir)
+
+    def test_write_output_stream_no_diverted_content(self):
+        """
+        Test that no diverted output file gets created without diverted content
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        diverted_output_file = os.path.join(temp_dir, "output_diverted.txt")
+        target.write_output_stream(
+            [(False, "line 1"), (False, "line 2")], output_file, diverted_output_file
+        )
+        self.assertTrue(os.path.isfile(output_file))
+        self.assertFalse(os.path.isfile(diverted_output_file))
+        shutil.rmtree(temp_dir)
+
+    def test_write_output_stream_interrupted(self):
+        """
+        Test that no partial output files are left behind after an error
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        diverted_output_file = os.path.join(temp_dir, "output_diverted.txt")
+
+        def converted_content():
+            yield (False, "line 1")
+            yield (True, "diverted 1")
+            sys.exit(20)
+
+        with self.assertRaises(SystemExit):
+            target.write_output_stream(
+                converted_content(), output_file, diverted_output_file
+            )
+        self.assertFalse(os.path.isfile(output_file))
+        self.assertFalse(os.path.isfile(diverted_output_file))
+        self.assertEqual(os.listdir(temp_dir), [])
+        shutil.rmtree(temp_dir)
+
+    def test_write_output_stream_atomic(self):
+        """
+        Test that an existing output file only gets replaced once the new
+        content has been fully written, and is left untouched after an error
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        diverted_output_file = os.path.join(temp_dir, "output_diverted.txt")
+        with open(output_file, "w") as f:
+            f.write("previous content")
+
+        def converted_content(fail):
+            for i in range(2500):
+                yield (False, "line %d" % i)
+            with open(output_file) as f:
+                self.assertEqual(f.read(), "previous content")
+            self.assertEqual(len(os.listdir(temp_dir)), 2)
+            if fail:
+                sys.exit(20)
+
+        with self.assertRaises(SystemExit):
+            target.write_output_stream(
+                converted_content(True), output_file, diverted_output_file
+            )
+        self.assertEqual(os.listdir(temp_dir), ["output.txt"])
+        target.write_output_stream(
+            converted_content(False), output_file, diverted_output_file, 4096
+        )
+        self.assertEqual(os.listdir(temp_dir), ["output.txt"])
+        with open(output_file) as f:
+            self.assertEqual(f.read(), "\n".join("line %d" % i for i in range(2500)))
+        shutil.rmtree(temp_dir)
+
+    def test_output_writer_fsync(self):
+        """
+        Test the different policies to force the output to be written to disk
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        for (fsync, expected_calls) in ((None, 0), (0, 2), (20, 4)):
+            with unittest.mock.patch.object(
+                target, "WRITE_BATCH_SIZE", 2
+            ), unittest.mock.patch.object(target.os, "fsync") as m:
+                with target.OutputWriter(output_file, fsync=fsync) as writer:
+                    writer.write_records("record %d" % i for i in range(10))
+            # With a number of characters: after the 2nd and 4th batches of 2
+            # records, then at the end for the file and for the directory
+            self.assertEqual(m.call_count, expected_calls)
+            with open(output_file) as f:
+                self.assertEqual(f.read().count("\n"), 9)
+        shutil.rmtree(temp_dir)
+
+
 class TestLoadConfig(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -252,6 +393,109 @@ class TestLoadConfig(unittest.TestCase):
             ],
         )
 
+    def test_load_config_decimal_places(self):
+        """
+        Test loading a configuration file with the optional decimal places column
+        """
+        config_file = "tests/sample_files/configuration1_decimal_places.xlsx"
+        config = target.load_config(config_file)
+        self.assertEqual(
+            config[3],
+            {
+                "length": 7,
+                "output_format": "Decimal",
+                "skip_field": False,
+                "decimal_places": 3,
+            },
+        )
+        self.assertNotIn("decimal_places", config[0])
+
+    def test_load_config_invalid_decimal_places(self):
+        """
+        Test loading a configuration file with an invalid decimal places value
+        """
+        config_file = "tests/sample_files/configuration1_invalid_decimal_places.xlsx"
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.load_config(config_file)
+        self.assertEqual(cm1.exception.code, 40)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:Invalid value 'three' for the 'Decimal places' "
+                "column on row 5, must be a positive number. Exiting..."
+            ],
+        )
+
+
+class TestLoadConfigCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        target.define_supported_output_formats()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+        self.config_file = os.path.join(self.temp_dir, "configuration.xlsx")
+        shutil.copy("tests/sample_files/configuration1.xlsx", self.config_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_load_config_cache_hit(self):
+        """
+        Test loading a configuration file a second time from the cache
+        """
+        config = target.load_config(self.config_file, self.cache_dir)
+        self.assertEqual(num_files_in_directory(self.cache_dir), 1)
+        with unittest.mock.patch.object(target, "read_config_file") as m:
+            cached_config = target.load_config(self.config_file, self.cache_dir)
+        m.assert_not_called()
+        self.assertEqual(cached_config, config)
+        self.assertEqual(
+            cached_config, target.load_config("tests/sample_files/configuration1.xlsx")
+        )
+
+    def test_load_config_cache_invalidated(self):
+        """
+        Test that the cache is not used anymore once the configuration file changes
+        """
+        config = target.load_config(self.config_file, self.cache_dir)
+        shutil.copy("tests/sample_files/configuration1_dates.xlsx", self.config_file)
+        new_config = target.load_config(self.config_file, self.cache_dir)
+        self.assertNotEqual(new_config, config)
+        self.assertEqual(
+            new_config,
+            target.load_config("tests/sample_files/configuration1_dates.xlsx"),
+        )
+        self.assertEqual(num_files_in_directory(self.cache_dir), 1)
+
+    def test_load_config_cache_invalid_config(self):
+        """
+        Test that an invalid configuration file doesn't get cached
+        """
+        shutil.copy(
+            "tests/sample_files/configuration1_invalid_length.xlsx", self.config_file
+        )
+        with self.assertRaises(SystemExit), self.assertLogs(level="CRITICAL"):
+            target.load_config(self.config_file, self.cache_dir)
+        self.assertFalse(os.path.isdir(self.cache_dir))
+
+    def test_load_config_cache_hit_no_openpyxl(self):
+        """
+        Test that openpyxl doesn't get imported when using the cache
+        """
+        target.load_config(self.config_file, self.cache_dir)
+        code = (
+            "import sys; sys.path.append('.'); import delimited2fixedwidth as t; "
+            "t.define_supported_output_formats(); "
+            "t.load_config(%r, %r); print('openpyxl' in sys.modules)"
+            % (self.config_file, self.cache_dir)
+        )
+        output = subprocess.check_output([sys.executable, "-c", code])
+        self.assertEqual(output.strip(), b"False")
+
 
 class TestReadInputFile(unittest.TestCase):
     def test_read_input_file_valid(self):
@@ -346,6 +590,167 @@ class TestReadInputFile(unittest.TestCase):
             self.assertEqual(row[17], expected_output[idx])
 
 
+class TestIterInputFile(unittest.TestCase):
+    def test_iter_input_file_valid(self):
+        """
+        Test streaming a valid input file, skipping the header and footer
+        """
+        input_file = "tests/sample_files/input1.txt"
+        rows = target.iter_input_file(input_file, "^", '"', 1, 1, "utf-8")
+        self.assertFalse(isinstance(rows, list))
+        self.assertEqual(
+            list(rows),
+            target.read_input_file(input_file, "^", '"', 1, 1, "utf-8"),
+        )
+
+    def test_iter_input_file_no_footer(self):
+        """
+        Test streaming a valid input file, skipping only the header
+        """
+        input_file = "tests/sample_files/input1.txt"
+        rows = list(target.iter_input_file(input_file, "^", '"', 2, 0, "utf-8"))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][1], "1330340")
+        self.assertEqual(rows[-1], ["T", "3", "15072020"])
+
+    def test_iter_input_file_single_byte_encoding(self):
+        """
+        Test streaming an input file in a single-byte encoding, parsed as
+        Latin-1 with only the non-ASCII values getting decoded
+        """
+        input_file = "tests/sample_files/input_WINDOWS-1252.txt"
+        with unittest.mock.patch.object(
+            target, "iter_transcoded_rows", wraps=target.iter_transcoded_rows
+        ) as m:
+            rows = list(
+                target.iter_csv_input_file(input_file, "^", '"', 1, 1, "WINDOWS-1252")
+            )
+        m.assert_called_once()
+        self.assertEqual(
+            rows, target.read_input_file(input_file, "^", '"', 1, 1, "WINDOWS-1252")
+        )
+        self.assertEqual(rows[0][17], "DOSAGE DU MAGNÉSIUM (MAXIMUM 1)")
+
+    def test_iter_input_file_undecodable_value(self):
+        """
+        Test that a value that can't be decoded still causes an error when
+        parsed as Latin-1
+        """
+        (temp_fd, input_file) = tempfile.mkstemp()
+        with os.fdopen(temp_fd, "wb") as f:
+            f.write(b"abc,d\x81f\r\n")
+        with self.assertRaises(UnicodeDecodeError):
+            list(target.iter_input_file(input_file, ",", '"', 0, 0, "WINDOWS-1252"))
+        with self.assertRaises(UnicodeDecodeError):
+            list(target.iter_csv_input_file(input_file, ",", '"', 0, 0, "WINDOWS-1252"))
+        os.remove(input_file)
+
+    def test_iter_input_file_single_byte_encoding_multiline(self):
+        """
+        Test that the non-ASCII values of a quoted value spanning several lines
+        get decoded in the right row
+        """
+        (temp_fd, input_file) = tempfile.mkstemp()
+        with os.fdopen(temp_fd, "wb") as f:
+            f.write('a,b\r\n"c\r\n€",d\r\ne,f\r\ng,é'.encode("cp1252"))
+        rows = list(target.iter_csv_input_file(input_file, ",", '"', 0, 0, "cp1252"))
+        self.assertEqual(rows, [["a", "b"], ["c\r\n€", "d"], ["e", "f"], ["g", "é"]])
+        os.remove(input_file)
+
+    def test_iter_input_file_mapped(self):
+        """
+        Test that the rows split from the memory-mapped input file are the same
+        as those parsed by the CSV reader, with any line ending and chunk size
+        """
+        contents = (
+            "a,b\r\n\r\nc,é,\r\n,d\r\ne\r\nf,g\r\n",
+            "a,b\n\nc,é,\n,d\ne\nf,g",
+            "\n\n\n",
+            "a,b",
+        )
+        for content in contents:
+            (temp_fd, input_file) = tempfile.mkstemp()
+            with os.fdopen(temp_fd, "wb") as f:
+                f.write(content.encode("utf-8"))
+            for chunk_size in (1, 4, 1024):
+                for skip_header in range(4):
+                    for skip_footer in range(4):
+                        with unittest.mock.patch.object(
+                            target, "MMAP_CHUNK_SIZE", chunk_size
+                        ), unittest.mock.patch.object(
+                            target, "iter_csv_input_file"
+                        ) as m:
+                            rows = list(
+                                target.iter_input_file(
+                                    input_file,
+                                    ",",
+                                    '"',
+                                    skip_header,
+                                    skip_footer,
+                                    "utf-8",
+                                )
+                            )
+                        m.assert_not_called()
+                        self.assertEqual(
+                            rows,
+                            list(
+                                target.iter_csv_input_file(
+                                    input_file,
+                                    ",",
+                                    '"',
+                                    skip_header,
+                                    skip_footer,
+                                    "utf-8",
+                                )
+                            ),
+                        )
+            os.remove(input_file)
+
+    def test_iter_input_file_mapped_fallback(self):
+        """
+        Test that the input files that can't be split directly get parsed by
+        the CSV reader
+        """
+        cases = (
+            (b'a,"b,c"\r\n', "utf-8"),
+            (b"a,b\r\nc,d\ne,f", "utf-8"),
+            (b"a,b\nc,d\re,f", "utf-8"),
+            (b"a,b\r\nc,d\r", "utf-8"),
+            ("a,b\nc,d".encode("utf-16"), "utf-16"),
+            (b"", "utf-8"),
+        )
+        for (content, encoding) in cases:
+            (temp_fd, input_file) = tempfile.mkstemp()
+            with os.fdopen(temp_fd, "wb") as f:
+                f.write(content)
+            with unittest.mock.patch.object(
+                target, "iter_csv_input_file", wraps=target.iter_csv_input_file
+            ) as m:
+                rows = list(
+                    target.iter_input_file(input_file, ",", '"', 0, 0, encoding)
+                )
+            m.assert_called_once()
+            with open(input_file, encoding=encoding, newline="") as f:
+                self.assertEqual(rows, list(csv.reader(f)))
+            os.remove(input_file)
+
+    def test_is_single_byte_ascii_encoding(self):
+        """
+        Test identifying the encodings that can be parsed as Latin-1
+        """
+        for encoding in ("WINDOWS-1252", "iso8859-15", "cp437"):
+            self.assertTrue(target.is_single_byte_ascii_encoding(encoding))
+        for encoding in ("utf-8", "latin-1", "ascii", "utf-16", "shift_jis"):
+            self.assertFalse(target.is_single_byte_ascii_encoding(encoding))
+
+    def test_skip_last_rows(self):
+        """
+        Test the bounded look-behind buffer used to skip the footer
+        """
+        self.assertEqual(list(target.skip_last_rows(iter(range(5)), 2)), [0, 1, 2])
+        self.assertEqual(list(target.skip_last_rows(iter(range(2)), 3)), [])
+
+
 class TestConvertContent(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -577,83 +982,694 @@ class TestConvertContent(unittest.TestCase):
         ]
         self.assertEqual(diverted_output_content, expected_diverted_output_content)
 
+    def get_reject_config(self):
+        return [
+            {"length": 4, "output_format": "Time", "skip_field": False},
+            {"length": 6, "output_format": "Decimal", "skip_field": False},
+            {
+                "length": 8,
+                "output_format": "Date (DD/MM/YYYY to YYYYMMDD)",
+                "skip_field": False,
+            },
+            {"length": 5, "output_format": "Text", "skip_field": False},
+        ]
+
+    def get_reject_content(self):
+        input_content = [["01:42", "1.5", "1/6/2020", "abc"] for _ in range(10)]
+        input_content[1] = ["0142", "1.5", "2/6/2020", "Text too long"]
+        input_content[3] = ["01:42", "1.5", "31/2/2020", "abc"]
+        input_content[4] = ["01:42", "1.5", "1/6/2020", "abc", "extra"]
+        input_content[6] = ["01:42", "1,5", "3/6/2020", "abc"]
+        input_content[8] = ["1:42", "1.5", "4/6/2020", "abc"]
+        input_content[9] = ["01:42", "1.5", "5/6/2020", "abc"]
+        return input_content
 
-class TestDefineSupportedOutputFormats(unittest.TestCase):
-    def test_define_supported_output_formats(self):
-        """
-        Test defining the supported output formats
-        """
+    def check_rejected_rows(self, converted_content, report, rejected_rows):
+        self.assertEqual(
+            [record for (_, record) in converted_content],
+            ["014200015020200601abc  "] * 4 + ["014200015020200605abc  "],
+        )
+        self.assertEqual(
+            report,
+            {
+                "num_rows": 10,
+                "oldest_date": "20200601",
+                "most_recent_date": "20200605",
+                "num_diverted": 0,
+                "num_truncated": 0,
+                "truncated_fields": [0, 0, 0, 0],
+            },
+        )
+        input_content = self.get_reject_content()
+        self.assertEqual(
+            [
+                (error.idx_row, error.idx_col, error.code, row)
+                for (error, row) in rejected_rows
+            ],
+            [
+                (2, 4, 20, input_content[1]),
+                (4, 3, 18, input_content[3]),
+                (5, 5, 23, input_content[4]),
+                (7, 2, 19, input_content[6]),
+                (9, 1, 17, input_content[8]),
+            ],
+        )
+        self.assertEqual(
+            str(rejected_rows[0][0]),
+            "Field 4 on row 2 (ignoring the header) is too long! Length: 13, max "
+            "length 5.",
+        )
 
-        target.define_supported_output_formats()
+    def test_iter_convert_content_rejected_rows(self):
+        """
+        Test rejecting the rows that can't be converted instead of stopping
+        """
+        rejected_rows = []
+        report = {}
+        converted_content = list(
+            target.iter_convert_content(
+                self.get_reject_content(),
+                self.get_reject_config(),
+                3,
+                report=report,
+                rejected_rows=rejected_rows,
+            )
+        )
+        self.check_rejected_rows(converted_content, report, rejected_rows)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy is not installed")
+    def test_iter_convert_content_rejected_rows_numpy(self):
+        """
+        Test rejecting the rows that can't be converted with the "numpy" engine
+        """
+        rejected_rows = []
+        report = {}
+        converted_content = list(
+            target.iter_convert_content(
+                self.get_reject_content(),
+                self.get_reject_config(),
+                3,
+                report=report,
+                engine="numpy",
+                rejected_rows=rejected_rows,
+            )
+        )
+        self.check_rejected_rows(converted_content, report, rejected_rows)
+
+    def test_iter_convert_content_parallel_rejected_rows(self):
+        """
+        Test rejecting the rows that can't be converted in parallel
+        """
+        rejected_rows = []
+        report = {}
+        converted_content = list(
+            target.iter_convert_content_parallel(
+                self.get_reject_content(),
+                self.get_reject_config(),
+                3,
+                report=report,
+                locale="C",
+                jobs=2,
+                chunk_size=3,
+                rejected_rows=rejected_rows,
+            )
+        )
+        self.check_rejected_rows(converted_content, report, rejected_rows)
+
+    def test_iter_checking_rejected_rows(self):
+        """
+        Test writing the rejected rows to the reject file, and stopping if
+        there are too many of them
+        """
+        temp_dir = tempfile.mkdtemp()
+        reject_file = os.path.join(temp_dir, "rejected.txt")
+        for max_errors in (5, 4):
+            rejected_rows = []
+            converted_content = target.iter_checking_rejected_rows(
+                target.iter_convert_content(
+                    self.get_reject_content(),
+                    self.get_reject_config(),
+                    rejected_rows=rejected_rows,
+                ),
+                rejected_rows,
+                max_errors,
+                reject_file,
+                "^",
+                '"',
+            )
+            with self.assertLogs(level="ERROR") as cm:
+                if max_errors == 5:
+                    self.assertEqual(len(list(converted_content)), 5)
+                else:
+                    with self.assertRaises(SystemExit) as cm2:
+                        list(converted_content)
+                    self.assertEqual(cm2.exception.code, 53)
+            self.assertEqual(len(cm.output), 5 if max_errors == 5 else 6)
+            self.assertEqual(
+                cm.output[0],
+                "ERROR:root:Field 4 on row 2 (ignoring the header) is too long! "
+                "Length: 13, max length 5. The row is rejected.",
+            )
+            with open(reject_file) as f:
+                self.assertEqual(
+                    f.read(),
+                    "2^4^20^0142^1.5^2/6/2020^Text too long\n"
+                    "4^3^18^01:42^1.5^31/2/2020^abc\n"
+                    "5^5^23^01:42^1.5^1/6/2020^abc^extra\n"
+                    "7^2^19^01:42^1,5^3/6/2020^abc\n"
+                    "9^1^17^1:42^1.5^4/6/2020^abc",
+                )
         self.assertEqual(
-            target.SUPPORTED_OUTPUT_FORMATS,
-            get_expected_supported_output_formats(),
+            cm.output[-1],
+            "CRITICAL:root:5 rows could not be converted, more than the 4 allowed by "
+            "the `--max-errors` argument. Exiting...",
         )
+        shutil.rmtree(temp_dir)
 
 
-class TestConvertCell(unittest.TestCase):
+class TestCompileConfig(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         target.define_supported_output_formats()
 
-    def test_convert_cell_time_colon(self):
+    def test_compile_config(self):
         """
-        Test converting a valid time element with a colon separator
+        Test compiling a configuration into per-column specifications
         """
-        output_value = target.convert_cell("01:42", "Time", 2, 3)
-        self.assertEqual(output_value, "0142")
+        config = [
+            {"length": 4, "output_format": "Time", "skip_field": False},
+            {"length": 6, "output_format": "Text", "skip_field": True},
+            {
+                "length": 8,
+                "output_format": "Date (DD/MM/YYYY to YYYYMMDD)",
+                "skip_field": False,
+            },
+        ]
+        columns = target.compile_config(config, [2], {3: ["1/1/2020"]})
+        self.assertEqual(len(columns), 3)
+        self.assertFalse(hasattr(columns[0], "__dict__"))
+        self.assertEqual([c.empty_value for c in columns], ["0000", "      ", "0" * 8])
+        self.assertEqual([c.truncate for c in columns], [False, True, False])
+        self.assertEqual(columns[2].divert_values, frozenset(["1/1/2020"]))
+        self.assertEqual(columns[0].convert("01:42", 1, 1), "0142")
+        self.assertEqual(columns[0].pad("42"), "0042")
+        self.assertEqual(columns[1].pad("ab"), "ab    ")
 
-    def test_convert_cell_time_nocolon(self):
+    def test_compile_config_invalid_output_format(self):
         """
-        Test converting a valid time element without a colon separator
+        Test compiling a configuration with an invalid output format
         """
-        output_value = target.convert_cell("0142", "Time", 2, 3)
-        self.assertEqual(output_value, "0142")
+        config = [{"length": 4, "output_format": "blabla", "skip_field": False}]
+        with self.assertRaises(SystemExit) as cm, self.assertLogs(level="CRITICAL"):
+            target.compile_config(config)
+        self.assertEqual(cm.exception.code, 27)
 
-    def test_convert_cell_time_invalid_numeric(self):
+    def test_iter_convert_rows_date_field_to_report_on_first_field(self):
         """
-        Test converting an invalid time element, numeric
+        Test reporting on the dates contained in the first field
         """
-        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
-            level="CRITICAL"
-        ) as cm2:
-            target.convert_cell("142", "Time", 2, 3)
-        self.assertEqual(cm1.exception.code, 17)
+        config = [
+            {
+                "length": 8,
+                "output_format": "Date (DD/MM/YYYY to YYYYMMDD)",
+                "skip_field": False,
+            },
+            {"length": 3, "output_format": "Integer", "skip_field": False},
+        ]
+        report = {}
+        records = list(
+            target.iter_convert_rows(
+                [["20/6/2020", "1"], ["3/2/2020"]],
+                target.compile_config(config),
+                1,
+                report,
+            )
+        )
+        self.assertEqual(records, [(False, "20200620001"), (False, "20200203000")])
         self.assertEqual(
-            cm2.output,
-            [
-                "CRITICAL:root:Invalid time format '142' in field 2 on row 3 "
-                "(ignoring the header). Exiting..."
+            report,
+            {
+                "num_rows": 2,
+                "oldest_date": "20200203",
+                "most_recent_date": "20200620",
+                "num_diverted": 0,
+                "num_truncated": 0,
+                "truncated_fields": [0, 0],
+            },
+        )
+
+
+class TestConvertContentParallel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        target.define_supported_output_formats()
+
+    def get_config(self):
+        return [
+            {"length": 4, "output_format": "Time", "skip_field": False},
+            {"length": 20, "output_format": "Text", "skip_field": False},
+            {
+                "length": 8,
+                "output_format": "Date (DD/MM/YYYY to YYYYMMDD)",
+                "skip_field": False,
+            },
+        ]
+
+    def test_iter_convert_content_parallel(self):
+        """
+        Test converting chunks of content in parallel, compared to the
+        sequential conversion
+        """
+        input_content = [
+            ["01:42", "Text %d" % i, "%d/6/2020" % (i % 28 + 1)] for i in range(50)
+        ]
+        divert = {2: ["Text 3", "Text 17", "Text 48"]}
+        report = {}
+        converted_content = list(
+            target.iter_convert_content_parallel(
+                input_content,
+                self.get_config(),
+                3,
+                None,
+                divert,
+                report,
+                "C",
+                jobs=2,
+                chunk_size=7,
+            )
+        )
+        output_content = [r for (d, r) in converted_content if not d]
+        diverted_output_content = [r for (d, r) in converted_content if d]
+        self.assertEqual(
+            (output_content, diverted_output_content),
+            target.convert_content(input_content, self.get_config(), 3, None, divert)[
+                :2
             ],
         )
+        self.assertEqual(
+            report,
+            {
+                "num_rows": 50,
+                "oldest_date": "20200601",
+                "most_recent_date": "20200628",
+                "num_diverted": 3,
+                "num_truncated": 0,
+                "truncated_fields": [0, 0, 0],
+            },
+        )
 
-    def test_convert_cell_time_invalid_alphanumeric(self):
+    def test_iter_convert_content_parallel_invalid(self):
         """
-        Test converting an invalid time element, alphanumeric value
+        Test that an invalid value stops the parallel conversion
+        """
+        input_content = [["01:42", "Text", "1/6/2020"]] * 20
+        input_content[13] = ["01:42", "Text", "33/6/2020"]
+        with self.assertRaises(SystemExit) as cm:
+            list(
+                target.iter_convert_content_parallel(
+                    input_content, self.get_config(), jobs=2, chunk_size=5
+                )
+            )
+        self.assertEqual(cm.exception.code, 18)
+
+    def test_convert_chunk_row_number(self):
+        """
+        Test that errors in a chunk report the global row number
         """
+        target.init_conversion_worker(self.get_config(), None, None, None, "C")
+        (output_content, _, report) = target.convert_chunk(
+            11, [["01:42", "Text", "1/6/2020"]]
+        )
+        self.assertEqual(output_content, ["0142Text                20200601"])
+        self.assertEqual(report["num_rows"], 1)
         with self.assertRaises(SystemExit) as cm1, self.assertLogs(
             level="CRITICAL"
         ) as cm2:
-            target.convert_cell("ab:cd", "Time", 2, 3)
-        self.assertEqual(cm1.exception.code, 17)
+            target.convert_chunk(
+                11, [["01:42", "Text", "1/6/2020"], ["01:42", "Text", "33/6/2020"]]
+            )
+        self.assertEqual(cm1.exception.code, 18)
         self.assertEqual(
             cm2.output,
             [
-                "CRITICAL:root:Invalid time format 'ab:cd' in field 2 on row 3 "
-                "(ignoring the header). Exiting..."
+                "CRITICAL:root:Invalid date value '33/6/2020' for format 'Date "
+                "(DD/MM/YYYY to YYYYMMDD)' in field 3 on row 12 (ignoring the "
+                "header). Exiting..."
             ],
         )
 
-    def test_convert_cell_date_global(self):
-        year = "1981"
-        month = "11"
-        day = "03"
-        for output_format in target.SUPPORTED_OUTPUT_FORMATS:
-            # print(year, month, day, output_format)
-            m = re.match(r"Date \((.*) to (.*)\)", output_format)
-            if m:
-                in_format = m.group(1)
-                out_format = m.group(2)
+    def test_write_output_positional(self):
+        """
+        Test writing the records converted in parallel at their position in
+        the output file, compared to the sequential conversion
+        """
+        input_content = [
+            ["01:42", "Text %d" % i, "%d/6/2020" % (i % 28 + 1)] for i in range(50)
+        ]
+        divert = {2: ["Text 3", "Text 17", "Text 48"]}
+        (output_content, diverted_output_content, _, _) = target.convert_content(
+            input_content, self.get_config(), 3, None, divert
+        )
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        diverted_output_file = os.path.join(temp_dir, "output_diverted.txt")
+        for fsync in (None, 0, 100):
+            report = {}
+            self.assertTrue(
+                target.write_output_positional(
+                    input_content,
+                    self.get_config(),
+                    output_file,
+                    diverted_output_file,
+                    3,
+                    None,
+                    divert,
+                    report,
+                    "C",
+                    jobs=2,
+                    chunk_size=7,
+                    fsync=fsync,
+                )
+            )
+            with open(output_file) as f:
+                self.assertEqual(f.read(), "\n".join(output_content))
+            with open(diverted_output_file) as f:
+                self.assertEqual(f.read(), "\n".join(diverted_output_content))
+            self.assertEqual(
+                report,
+                {
+                    "num_rows": 50,
+                    "oldest_date": "20200601",
+                    "most_recent_date": "20200628",
+                    "num_diverted": 3,
+                    "num_truncated": 0,
+                    "truncated_fields": [0, 0, 0],
+                },
+            )
+        self.assertEqual(
+            sorted(os.listdir(temp_dir)), ["output.txt", "output_diverted.txt"]
+        )
+        shutil.rmtree(temp_dir)
+
+    def test_write_output_positional_empty(self):
+        """
+        Test writing positionally the records of an empty input
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        report = {}
+        self.assertTrue(
+            target.write_output_positional(
+                [], self.get_config(), output_file, None, report=report, locale="C"
+            )
+        )
+        self.assertEqual(os.path.getsize(output_file), 0)
+        self.assertEqual(report["num_rows"], 0)
+        shutil.rmtree(temp_dir)
+
+    def test_write_output_positional_variable_length(self):
+        """
+        Test that no output file gets written if the records don't all have the
+        same length in bytes
+        """
+        input_content = [["01:42", "Text", "1/6/2020"]] * 20
+        input_content[13] = ["01:42", "Text é", "1/6/2020"]
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        diverted_output_file = os.path.join(temp_dir, "output_diverted.txt")
+        self.assertFalse(
+            target.write_output_positional(
+                input_content,
+                self.get_config(),
+                output_file,
+                diverted_output_file,
+                locale="C",
+                chunk_size=5,
+            )
+        )
+        self.assertEqual(os.listdir(temp_dir), [])
+        shutil.rmtree(temp_dir)
+
+    def test_iter_row_chunks(self):
+        """
+        Test splitting the rows in chunks
+        """
+        self.assertEqual(
+            list(target.iter_row_chunks(iter([[1], [2], [3]]), 2)),
+            [(1, [[1], [2]]), (3, [[3]])],
+        )
+
+
+@unittest.skipUnless(NUMPY_AVAILABLE, "NumPy is not installed")
+class TestConvertContentNumpy(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        target.define_supported_output_formats()
+
+    def get_config(self):
+        return [
+            {"length": 6, "output_format": "Integer", "skip_field": False},
+            {"length": 8, "output_format": "Decimal", "skip_field": False},
+            {
+                "length": 8,
+                "output_format": "Decimal",
+                "skip_field": False,
+                "decimal_places": 0,
+            },
+            {"length": 5, "output_format": "Keep numeric", "skip_field": False},
+            {"length": 4, "output_format": "Time", "skip_field": False},
+            {"length": 10, "output_format": "Text", "skip_field": False},
+            {
+                "length": 8,
+                "output_format": "Date (DD/MM/YYYY to YYYYMMDD)",
+                "skip_field": False,
+            },
+            {"length": 3, "output_format": "Integer", "skip_field": True},
+        ]
+
+    def get_input_content(self):
+        integers = ("12", "", " ", "-5", "+7", "00042", "١٢")
+        decimals = ("1.36", "-0.125", "1.005", "", "1e3", "12345.678", "-0.001")
+        keep_numeric = ("1-2.3a", "", "abc", "007", "٣4")
+        times = ("20:06", "2006", "12:345")
+        texts = ("Hello", "", "é à ü", "trailing  ", "Text %d")
+        return [
+            [
+                integers[i % 7],
+                decimals[i % 7],
+                decimals[(i + 3) % 7],
+                keep_numeric[i % 5],
+                times[i % 3],
+                texts[i % 5].replace("%d", str(i)),
+                "%d/%d/2020" % (i % 28 + 1, i % 12 + 1),
+                "skipped",
+            ]
+            for i in range(100)
+        ]
+
+    def convert(self, input_content, engine, config=None, truncate=None):
+        report = {}
+        converted_content = list(
+            target.iter_convert_content(
+                input_content,
+                config or self.get_config(),
+                7,
+                truncate,
+                {6: ["Text 14", "Text 49"]},
+                report,
+                engine,
+            )
+        )
+        return (converted_content, report)
+
+    def test_iter_convert_content_numpy(self):
+        """
+        Test that the "numpy" engine generates the same content as the
+        "python" engine, over several blocks
+        """
+        input_content = self.get_input_content()
+        with unittest.mock.patch.object(target, "NUMPY_BLOCK_SIZE", 30):
+            (converted_content, report) = self.convert(input_content, "numpy")
+        self.assertEqual(
+            (converted_content, report), self.convert(input_content, "python")
+        )
+        self.assertEqual(report["num_rows"], 100)
+        self.assertEqual(
+            converted_content[0],
+            (False, "000012000001360000000000123" "2006Hello     20200101000"),
+        )
+        self.assertEqual(sum(d for (d, r) in converted_content), 2)
+
+    def test_iter_convert_content_numpy_fallback(self):
+        """
+        Test the blocks that can't be converted with NumPy, which go through
+        the "python" engine
+        """
+        input_content = self.get_input_content()
+        # Rows with missing fields
+        input_content[5] = input_content[5][:3]
+        input_content[6] = []
+        # Values that must be truncated
+        input_content[42][5] = "Longer than 10 characters"
+        with unittest.mock.patch.object(target, "NUMPY_BLOCK_SIZE", 30):
+            with self.assertLogs(level="DEBUG") as cm1:
+                numpy_content = self.convert(input_content, "numpy", truncate=[6])
+            # Without logging each truncated value, they get truncated with NumPy
+            self.assertEqual(
+                self.convert(input_content, "numpy", truncate=[6]), numpy_content
+            )
+        with self.assertLogs(level="DEBUG") as cm2:
+            python_content = self.convert(input_content, "python", truncate=[6])
+        self.assertEqual(numpy_content, python_content)
+        self.assertEqual(cm1.output, cm2.output)
+        self.assertEqual(python_content[1]["truncated_fields"][5], 1)
+
+    def test_iter_convert_content_numpy_invalid(self):
+        """
+        Test that invalid values get reported like with the "python" engine
+        """
+        input_content = self.get_input_content()
+        input_content[47][6] = "31/02/2020"
+        input_content[48][4] = "2:06"
+        for engine in ("python", "numpy"):
+            with unittest.mock.patch.object(
+                target, "NUMPY_BLOCK_SIZE", 30
+            ), self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                self.convert(input_content, engine)
+            self.assertEqual(cm1.exception.code, 18)
+            self.assertEqual(
+                cm2.output,
+                [
+                    "CRITICAL:root:Invalid date value '31/02/2020' for format 'Date "
+                    "(DD/MM/YYYY to YYYYMMDD)' in field 7 on row 48 (ignoring the "
+                    "header). Exiting..."
+                ],
+            )
+
+    def test_convert_decimals_numpy(self):
+        """
+        Test the vectorized conversion of decimal values
+        """
+        import numpy
+
+        values = numpy.array(
+            [
+                "1.234,567",
+                "-0,125",
+                "1.005",
+                ",5",
+                "5,",
+                "",
+                " 2,5 ",
+                "1e3",
+                "123.456.789.012.345.678,5",
+            ]
+        )
+        (codes, lengths) = target.get_numpy_codes(values)
+        decimal_format = target.DecimalFormat(",", ".", 2)
+        (codes, lengths) = target.convert_decimals_numpy(
+            values, codes, lengths, decimal_format
+        )
+        self.assertEqual(
+            codes.view(numpy.dtype(("U", codes.shape[1]))).ravel().tolist(),
+            [decimal_format.parse(value) for value in values.tolist()],
+        )
+        self.assertEqual(lengths.tolist(), [6, 3, 6, 2, 3, 1, 3, 6, 20])
+        values = numpy.array(["1,2", "abc"])
+        (codes, lengths) = target.get_numpy_codes(values)
+        self.assertIsNone(
+            target.convert_decimals_numpy(values, codes, lengths, decimal_format)
+        )
+
+
+class TestDefineSupportedOutputFormats(unittest.TestCase):
+    def test_define_supported_output_formats(self):
+        """
+        Test defining the supported output formats
+        """
+
+        target.define_supported_output_formats()
+        self.assertEqual(
+            target.SUPPORTED_OUTPUT_FORMATS,
+            get_expected_supported_output_formats(),
+        )
+
+    def test_get_supported_output_formats(self):
+        """
+        Test that the supported output formats only get defined once
+        """
+        supported_output_formats = target.get_supported_output_formats()
+        self.assertEqual(
+            supported_output_formats, get_expected_supported_output_formats()
+        )
+        self.assertIs(target.get_supported_output_formats(), supported_output_formats)
+
+
+class TestConvertCell(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        target.define_supported_output_formats()
+
+    def test_convert_cell_time_colon(self):
+        """
+        Test converting a valid time element with a colon separator
+        """
+        output_value = target.convert_cell("01:42", "Time", 2, 3)
+        self.assertEqual(output_value, "0142")
+
+    def test_convert_cell_time_nocolon(self):
+        """
+        Test converting a valid time element without a colon separator
+        """
+        output_value = target.convert_cell("0142", "Time", 2, 3)
+        self.assertEqual(output_value, "0142")
+
+    def test_convert_cell_time_invalid_numeric(self):
+        """
+        Test converting an invalid time element, numeric
+        """
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.convert_cell("142", "Time", 2, 3)
+        self.assertEqual(cm1.exception.code, 17)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:Invalid time format '142' in field 2 on row 3 "
+                "(ignoring the header). Exiting..."
+            ],
+        )
+
+    def test_convert_cell_time_invalid_alphanumeric(self):
+        """
+        Test converting an invalid time element, alphanumeric value
+        """
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.convert_cell("ab:cd", "Time", 2, 3)
+        self.assertEqual(cm1.exception.code, 17)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:Invalid time format 'ab:cd' in field 2 on row 3 "
+                "(ignoring the header). Exiting..."
+            ],
+        )
+
+    def test_convert_cell_date_global(self):
+        year = "1981"
+        month = "11"
+        day = "03"
+        for output_format in target.SUPPORTED_OUTPUT_FORMATS:
+            # print(year, month, day, output_format)
+            m = re.match(r"Date \((.*) to (.*)\)", output_format)
+            if m:
+                in_format = m.group(1)
+                out_format = m.group(2)
                 # print(in_format, out_format)
                 in_format = (
                     in_format.replace("YYYY", "%Y")
@@ -945,6 +1961,134 @@ class TestConvertCell(unittest.TestCase):
         )
 
 
+class TestDateFormat(unittest.TestCase):
+    def test_is_valid_date(self):
+        """
+        Test the arithmetic date validation against the datetime module
+        """
+        for year in (1, 1900, 1981, 2000, 2020, 2100):
+            for month in range(0, 14):
+                for day in range(0, 33):
+                    try:
+                        datetime.date(year, month, day)
+                        expected = True
+                    except ValueError:
+                        expected = False
+                    self.assertEqual(target.is_valid_date(year, month, day), expected)
+        self.assertFalse(target.is_valid_date(0, 1, 1))
+
+    def test_date_format(self):
+        """
+        Test parsing a date output format once and converting values with it
+        """
+        date_format = target.DateFormat("Date (MM.DD.YYYY to DD-MM-YYYY)")
+        self.assertEqual(date_format.convert("6.21.2020", 2, 3), "21-06-2020")
+        self.assertEqual(date_format.convert("02.29.2020", 2, 3), "29-02-2020")
+        self.assertEqual(date_format.parse("02.29.2021"), (None, 18))
+        self.assertEqual(date_format.parse("0229202"), (None, 18))
+
+    def test_date_format_cache(self):
+        """
+        Test that the converted values are cached, with a bounded cache size
+        """
+        date_format = target.DateFormat("Date (DDMMYYYY to YYYYMMDD)", 2)
+        for value in ("01012020", "01012020", "02012020", "03012020", "01012020"):
+            date_format.convert(value, 1, 1)
+        cache_info = date_format.convert_value.cache_info()
+        self.assertEqual((cache_info.hits, cache_info.misses), (1, 4))
+        self.assertEqual(cache_info.currsize, 2)
+
+    def test_date_format_invalid_not_cached_as_valid(self):
+        """
+        Test that an invalid value keeps causing an error when converted again
+        """
+        date_format = target.DateFormat("Date (DD/MM/YYYY to YYYYMMDD)")
+        for _ in range(2):
+            with self.assertRaises(target.ConversionError) as cm:
+                date_format.convert("31/02/2020", 5, 8)
+            self.assertEqual(
+                (cm.exception.code, cm.exception.idx_col, cm.exception.idx_row),
+                (18, 5, 8),
+            )
+            self.assertEqual(
+                str(cm.exception),
+                "Invalid date value '31/02/2020' for format 'Date (DD/MM/YYYY to "
+                "YYYYMMDD)' in field 5 on row 8 (ignoring the header).",
+            )
+
+
+class TestDecimalFormat(unittest.TestCase):
+    def test_decimal_format_exact_rounding(self):
+        """
+        Test that decimal values are rounded half up without float errors
+        """
+        decimal_format = target.DecimalFormat()
+        for (value, expected) in (
+            ("1.36", "136"),
+            ("1.005", "101"),
+            ("0.125", "13"),
+            ("-0.125", "-13"),
+            ("-0.001", "0"),
+            ("12", "1200"),
+            (".5", "50"),
+            ("+3.141", "314"),
+            ("", "0"),
+            ("123456789012345678901.995", "12345678901234567890200"),
+        ):
+            self.assertEqual(decimal_format.convert(value, 1, 1), expected)
+
+    def test_decimal_format_separators(self):
+        """
+        Test converting decimal values with explicit separators
+        """
+        decimal_format = target.DecimalFormat(",", ".")
+        self.assertEqual(decimal_format.convert("1.234,567", 1, 1), "123457")
+        self.assertEqual(decimal_format.convert("-1,005", 1, 1), "-101")
+
+    def test_decimal_format_decimal_places(self):
+        """
+        Test converting decimal values with a custom number of decimal places
+        """
+        self.assertEqual(target.DecimalFormat(".", "", 0).convert("2.5", 1, 1), "3")
+        self.assertEqual(target.DecimalFormat(".", "", 3).convert("2.5", 1, 1), "2500")
+
+    def test_decimal_format_other_notation(self):
+        """
+        Test converting decimal values written with an exponent
+        """
+        decimal_format = target.DecimalFormat()
+        self.assertEqual(decimal_format.convert("1.5e2", 1, 1), "15000")
+        self.assertEqual(decimal_format.convert("-1.005E0", 1, 1), "-101")
+        self.assertEqual(decimal_format.convert("1e-3", 1, 1), "0")
+
+    def test_get_locale_separators(self):
+        """
+        Test reading the separators of a locale without changing the locale of
+        the process
+        """
+        current_locale = setlocale(LC_NUMERIC)
+        self.assertEqual(target.get_locale_separators("C"), (".", ""))
+        self.assertEqual(setlocale(LC_NUMERIC), current_locale)
+        with self.assertRaises(localeError):
+            target.get_locale_separators("nonexistent_locale")
+        self.assertEqual(setlocale(LC_NUMERIC), current_locale)
+
+    def test_decimal_format_invalid(self):
+        """
+        Test converting invalid decimal values
+        """
+        decimal_format = target.DecimalFormat()
+        for value in ("abc", "1.2.3", "inf", "1e999", "-"):
+            with self.assertRaises(target.ConversionError) as cm:
+                decimal_format.convert(value, 4, 2)
+            self.assertEqual(cm.exception.code, 19)
+            self.assertEqual(
+                str(cm.exception),
+                "Invalid decimal format '%s' in field 4 on row 2 (ignoring the "
+                "header)." % value,
+            )
+
+
 class TestPadOutputValue(unittest.TestCase):
     def test_pad_output_value_integer_int(self):
         """
@@ -1114,23 +2258,44 @@ class TestParseArgs(unittest.TestCase):
             cm.output,
             [
                 "DEBUG:root:These are the parsed arguments:\n'Namespace("
+                "checkpoint_interval=None, "
                 "config='tests/sample_files/configuration1.xlsx', "
+                "config_cache_dir=None, "
                 "delimiter=',', "
                 "divert={2: ['abc', 'def'], 3: ['ghi,k lm']}, "
+                "engine='python', "
+                "fsync=None, "
                 "input='tests/sample_files/input1.txt', "
                 "input_directory=None, "
                 "input_encoding='utf-8', "
+                "jobs=1, "
                 "locale='', "
                 "logging_level='DEBUG', "
                 "loglevel=10, "
+                "max_errors=None, "
+                "memory_report=None, "
+                "merge_shards=None, "
                 "move_input_files=False, "
                 "output='tests/sample_files/nonexistent_test_output.txt', "
                 "output_directory=None, "
                 "overwrite_file=False, "
+                "positional_writes=False, "
+                "profile_mode=None, "
+                "profile_output=None, "
+                "progress_file=None, "
+                "progress_interval=None, "
                 "quotechar='\"', "
+                "reject_file=None, "
+                "resume=False, "
+                "shard=None, "
                 "skip_footer=0, "
                 "skip_header=0, "
-                "truncate=[])'"
+                "stats=None, "
+                "trace_rows=None, "
+                "truncate=[], "
+                "worker_type='process', "
+                "workers=1, "
+                "write_buffer_size=1048576)'"
             ],
         )
 
@@ -1513,59 +2678,470 @@ class TestParseArgs(unittest.TestCase):
             ],
         )
 
-    def test_parse_args_version(self):
+    def test_parse_args_jobs_invalid(self):
+        """
+        Test running the script with an invalid --jobs parameter
+        """
+        for jobs in ("abc", "0"):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(
+                    [
+                        "-i",
+                        "tests/sample_files/input1.txt",
+                        "-o",
+                        "tests/sample_files/nonexistent_test_output.txt",
+                        "-c",
+                        "tests/sample_files/configuration1.xlsx",
+                        "--jobs",
+                        jobs,
+                    ]
+                )
+            self.assertEqual(cm1.exception.code, 36)
+            self.assertEqual(
+                cm2.output,
+                [
+                    "CRITICAL:root:The `--jobs` argument must be a positive number. "
+                    "Exiting..."
+                ],
+            )
+
+    def test_parse_args_workers_invalid(self):
+        """
+        Test running the script with invalid --workers parameters
+        """
+        base_args = ["-c", "tests/sample_files/configuration1.xlsx"]
+        input_args = ["-i", "tests/sample_files/input1.txt", "-o", "nonexistent.txt"]
+        directory_args = ["-id", "tests/sample_files", "-od", "tests/sample_files"]
+        for (args, exit_code, message) in (
+            (
+                directory_args + ["--workers", "abc"],
+                37,
+                "The `--workers` argument must be a positive number. Exiting...",
+            ),
+            (
+                input_args + ["--workers", "2"],
+                38,
+                "The `--workers` argument can only be used in combination with the "
+                "`--input-directory` argument. Exiting...",
+            ),
+            (
+                directory_args + ["--workers", "2", "--jobs", "2"],
+                39,
+                "The `--workers` and `--jobs` arguments can not be used together. "
+                "Exiting...",
+            ),
+            (
+                directory_args + ["--worker-type", "thread"],
+                62,
+                "The `--worker-type thread` argument can only be used in "
+                "combination with the `--workers` argument. Exiting...",
+            ),
+            (
+                directory_args
+                + ["-w", "2", "-wt", "thread", "--memory-report", "memory.json"],
+                63,
+                "The `--worker-type thread` and `--memory-report` arguments can "
+                "not be used together, the memory of the process being shared by "
+                "the threads. Exiting...",
+            ),
+        ):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(base_args + args)
+            self.assertEqual(cm1.exception.code, exit_code)
+            self.assertEqual(cm2.output, ["CRITICAL:root:%s" % message])
+
+    def test_parse_args_positional_writes_invalid(self):
         """
-        Test the --version argument
+        Test running the script with --positional-writes but without --jobs
         """
-        f = io.StringIO()
-        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stdout(f):
-            target.parse_args(["--version"])
-        self.assertEqual(cm.exception.code, 0)
-        self.assertTrue("scriptname.py %s" % CURRENT_VERSION in f.getvalue())
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.parse_args(
+                [
+                    "-c",
+                    "tests/sample_files/configuration1.xlsx",
+                    "-i",
+                    "tests/sample_files/input1.txt",
+                    "-o",
+                    "nonexistent.txt",
+                    "--positional-writes",
+                ]
+            )
+        self.assertEqual(cm1.exception.code, 44)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:The `--positional-writes` argument can only be used in "
+                "combination with the `--jobs` argument. Exiting..."
+            ],
+        )
 
+    def test_parse_args_shard_invalid(self):
+        """
+        Test running the script with invalid --shard or --merge-shards arguments
+        """
+        base_args = ["-c", "tests/sample_files/configuration1.xlsx"]
+        input_args = ["-i", "tests/sample_files/input1.txt", "-o", "nonexistent.txt"]
+        directory_args = ["-id", "tests/sample_files", "-od", "tests/sample_files"]
+        for (args, exit_code, message) in (
+            (
+                input_args + ["--shard", "3/2"],
+                45,
+                "The `--shard` argument must be in the form I/N, to convert the "
+                "I-th of N shards of the input file. Exiting...",
+            ),
+            (
+                input_args + ["--shard", "abc"],
+                45,
+                "The `--shard` argument must be in the form I/N, to convert the "
+                "I-th of N shards of the input file. Exiting...",
+            ),
+            (
+                input_args + ["--merge-shards", "0"],
+                46,
+                "The `--merge-shards` argument must be a positive number. Exiting...",
+            ),
+            (
+                directory_args + ["--shard", "1/2"],
+                47,
+                "The `--shard` and `--merge-shards` arguments can only be used in "
+                "combination with the `--input` argument. Exiting...",
+            ),
+            (
+                input_args + ["--shard", "1/2", "--input-encoding", "utf-16"],
+                49,
+                "The `--shard` argument requires an input encoding in which the "
+                "ASCII characters are single bytes (such as UTF-8), and an ASCII "
+                "delimiter and quote character. Exiting...",
+            ),
+        ):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(base_args + args)
+            self.assertEqual(cm1.exception.code, exit_code)
+            self.assertEqual(cm2.output, ["CRITICAL:root:%s" % message])
+        args = target.parse_args(base_args + input_args + ["--shard", "2/4"])
+        self.assertEqual(args.shard, (2, 4))
+        args = target.parse_args(base_args + input_args + ["--merge-shards", "4"])
+        self.assertEqual(args.merge_shards, 4)
 
-class TestProcess(unittest.TestCase):
-    def test_process_valid(self):
+    def test_parse_args_checkpoint_invalid(self):
         """
-        Test the full process with valid arguments parameters
+        Test running the script with invalid --checkpoint-interval or --resume
+        arguments
         """
-        output_file = "tests/sample_files/nonexistent_test_output.txt"
-        # Confirm the output file doesn't exist
-        if os.path.isfile(output_file):
-            os.remove(output_file)
-            self.assertFalse(os.path.isfile(output_file))
-        input = "tests/sample_files/input1.txt"
-        output = output_file
-        config = "tests/sample_files/configuration1.xlsx"
-        delimiter = "^"
-        quotechar = '"'
-        skip_header = 1
-        skip_footer = 1
-        date_field_to_report_on = 5
-        (num_input_rows, oldest_date, most_recent_date) = target.process(
-            input,
-            output,
-            config,
-            delimiter,
-            quotechar,
-            skip_header,
-            skip_footer,
-            date_field_to_report_on,
-            "C",  # Default C locale
-        )
-        # Confirm the output file has been written and its content
-        self.assertTrue(os.path.isfile(output_file))
-        with open(output_file) as f:
-            s = f.read()
-            expected_output = (
-                "0004000133034205413540000100202007312006"
-                "                                        "
-                "Leendert MOLENDIJK [90038979]           \n"
-                "0004000133034005407940000157202003051022"
-                "                                        "
-                "Leendert MOLENDIJK [90038979]           \n"
-                "0004000133034105409340022139202012252006"
-                "                                        "
+        base_args = [
+            "-c",
+            "tests/sample_files/configuration1.xlsx",
+            "-i",
+            "tests/sample_files/input1.txt",
+            "-o",
+            "nonexistent.txt",
+        ]
+        for (args, exit_code, message) in (
+            (
+                ["--checkpoint-interval", "0"],
+                54,
+                "The `--checkpoint-interval` argument must be a positive number. "
+                "Exiting...",
+            ),
+            (
+                ["--resume", "--input-encoding", "utf-16"],
+                55,
+                "The `--checkpoint-interval` and `--resume` arguments require an "
+                "input encoding in which the ASCII characters are single bytes "
+                "(such as UTF-8), and an ASCII delimiter and quote character. "
+                "Exiting...",
+            ),
+        ):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(base_args + args)
+            self.assertEqual(cm1.exception.code, exit_code)
+            self.assertEqual(cm2.output, ["CRITICAL:root:%s" % message])
+        args = target.parse_args(base_args + ["--checkpoint-interval", "16"])
+        self.assertEqual(args.checkpoint_interval, 16 * 1024 * 1024)
+
+    def test_parse_args_progress_invalid(self):
+        """
+        Test running the script with invalid --progress-interval or
+        --progress-file arguments
+        """
+        base_args = [
+            "-c",
+            "tests/sample_files/configuration1.xlsx",
+            "-i",
+            "tests/sample_files/input1.txt",
+            "-o",
+            "nonexistent.txt",
+        ]
+        for (args, exit_code, message) in (
+            (
+                ["--progress-interval", "0"],
+                57,
+                "The `--progress-interval` argument must be a positive number. "
+                "Exiting...",
+            ),
+            (
+                ["--progress-interval", "abc"],
+                57,
+                "The `--progress-interval` argument must be a positive number. "
+                "Exiting...",
+            ),
+            (
+                ["--progress-file", "status.txt"],
+                58,
+                "The `--progress-file` argument can only be used in combination "
+                "with the `--progress-interval` argument. Exiting...",
+            ),
+        ):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(base_args + args)
+            self.assertEqual(cm1.exception.code, exit_code)
+            self.assertEqual(cm2.output, ["CRITICAL:root:%s" % message])
+        args = target.parse_args(base_args + ["--progress-interval", "0.5"])
+        self.assertEqual(args.progress_interval, 0.5)
+
+    def test_parse_args_trace_rows_invalid(self):
+        """
+        Test running the script with invalid --trace-rows arguments
+        """
+        base_args = [
+            "-c",
+            "tests/sample_files/configuration1.xlsx",
+            "-i",
+            "tests/sample_files/input1.txt",
+            "-o",
+            "nonexistent.txt",
+        ]
+        for (args, exit_code, message) in (
+            (
+                ["--trace-rows", "first:0"],
+                60,
+                "The `--trace-rows` argument must be a comma-delimited list of "
+                "'first:N', 'last:N' and 'every:N', N being a positive number. "
+                "Exiting...",
+            ),
+            (
+                ["--trace-rows", "first:5,middle:2"],
+                60,
+                "The `--trace-rows` argument must be a comma-delimited list of "
+                "'first:N', 'last:N' and 'every:N', N being a positive number. "
+                "Exiting...",
+            ),
+            (
+                ["--trace-rows", "first:5,last:5"],
+                61,
+                "The `--trace-rows` argument can only be used in combination with "
+                "the `--debug` argument. Exiting...",
+            ),
+        ):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(base_args + args)
+            self.assertEqual(cm1.exception.code, exit_code)
+            self.assertEqual(cm2.output, ["CRITICAL:root:%s" % message])
+        self.assertEqual(target.parse_trace_rows("every:1000, first:5"), (5, 0, 1000))
+
+    def test_parse_args_profile_invalid(self):
+        """
+        Test running the script with --profile-mode but no --profile-output
+        """
+        base_args = [
+            "-c",
+            "tests/sample_files/configuration1.xlsx",
+            "-i",
+            "tests/sample_files/input1.txt",
+            "-o",
+            "nonexistent.txt",
+        ]
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.parse_args(base_args + ["--profile-mode", "sampling"])
+        self.assertEqual(cm1.exception.code, 59)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:The `--profile-mode` argument can only be used in "
+                "combination with the `--profile-output` argument. Exiting..."
+            ],
+        )
+        args = target.parse_args(
+            base_args + ["--profile-output", "profile.json", "-pm", "sampling"]
+        )
+        self.assertEqual(args.profile_mode, "sampling")
+
+    def test_parse_args_max_errors_invalid(self):
+        """
+        Test running the script with invalid --max-errors or --reject-file
+        arguments
+        """
+        base_args = ["-c", "tests/sample_files/configuration1.xlsx"]
+        input_args = ["-i", "tests/sample_files/input1.txt", "-o", "nonexistent.txt"]
+        directory_args = ["-id", "tests/sample_files", "-od", "tests/sample_files"]
+        for (args, exit_code, message) in (
+            (
+                input_args + ["--max-errors", "-1"],
+                50,
+                "The `--max-errors` argument must be a positive number or 0. "
+                "Exiting...",
+            ),
+            (
+                input_args + ["--reject-file", "rejected.txt"],
+                51,
+                "The `--reject-file` argument can only be used in combination with "
+                "the `--max-errors` argument. Exiting...",
+            ),
+            (
+                directory_args
+                + ["--max-errors", "10", "--reject-file", "rejected.txt"],
+                52,
+                "The `--reject-file` argument can only be used in combination with "
+                "the `--input` argument. Exiting...",
+            ),
+        ):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(base_args + args)
+            self.assertEqual(cm1.exception.code, exit_code)
+            self.assertEqual(cm2.output, ["CRITICAL:root:%s" % message])
+        args = target.parse_args(base_args + input_args + ["--max-errors", "0"])
+        self.assertEqual(args.max_errors, 0)
+
+    def test_parse_args_write_buffer_size_fsync(self):
+        """
+        Test the --write-buffer-size and --fsync arguments
+        """
+        base_args = [
+            "-i",
+            "tests/sample_files/input1.txt",
+            "-o",
+            "tests/sample_files/nonexistent_test_output.txt",
+            "-c",
+            "tests/sample_files/configuration1.xlsx",
+        ]
+        for (args, write_buffer_size, fsync) in (
+            ([], 1048576, None),
+            (["--write-buffer-size", "64", "--fsync", "end"], 65536, 0),
+            (["-wb", "8", "-fs", "16"], 8192, 16777216),
+        ):
+            parser = target.parse_args(base_args + args)
+            self.assertEqual(parser.write_buffer_size, write_buffer_size)
+            self.assertEqual(parser.fsync, fsync)
+        for (args, exit_code, message) in (
+            (
+                ["--write-buffer-size", "0"],
+                42,
+                "The `--write-buffer-size` argument must be a positive number. "
+                "Exiting...",
+            ),
+            (
+                ["--fsync", "always"],
+                43,
+                "The `--fsync` argument must be 'none', 'end' or a positive number. "
+                "Exiting...",
+            ),
+        ):
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.parse_args(base_args + args)
+            self.assertEqual(cm1.exception.code, exit_code)
+            self.assertEqual(cm2.output, ["CRITICAL:root:%s" % message])
+
+    def test_parse_args_engine_without_numpy(self):
+        """
+        Test running the script with `--engine numpy` without NumPy installed
+        """
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2, unittest.mock.patch.dict(sys.modules, {"numpy": None}):
+            target.parse_args(
+                [
+                    "-i",
+                    "tests/sample_files/input1.txt",
+                    "-o",
+                    "tests/sample_files/nonexistent_test_output.txt",
+                    "-c",
+                    "tests/sample_files/configuration1.xlsx",
+                    "--engine",
+                    "numpy",
+                ]
+            )
+        self.assertEqual(cm1.exception.code, 41)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:The `--engine numpy` argument requires NumPy to be "
+                "installed. Exiting..."
+            ],
+        )
+
+    def test_parse_args_version(self):
+        """
+        Test the --version argument
+        """
+        f = io.StringIO()
+        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stdout(f):
+            target.parse_args(["--version"])
+        self.assertEqual(cm.exception.code, 0)
+        self.assertTrue("scriptname.py %s" % CURRENT_VERSION in f.getvalue())
+
+
+class TestProcess(unittest.TestCase):
+    def test_process_valid(self):
+        """
+        Test the full process with valid arguments parameters
+        """
+        output_file = "tests/sample_files/nonexistent_test_output.txt"
+        # Confirm the output file doesn't exist
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+            self.assertFalse(os.path.isfile(output_file))
+        input = "tests/sample_files/input1.txt"
+        output = output_file
+        config = "tests/sample_files/configuration1.xlsx"
+        delimiter = "^"
+        quotechar = '"'
+        skip_header = 1
+        skip_footer = 1
+        date_field_to_report_on = 5
+        (num_input_rows, oldest_date, most_recent_date) = target.process(
+            input,
+            output,
+            config,
+            delimiter,
+            quotechar,
+            skip_header,
+            skip_footer,
+            date_field_to_report_on,
+            "C",  # Default C locale
+        )
+        # Confirm the output file has been written and its content
+        self.assertTrue(os.path.isfile(output_file))
+        with open(output_file) as f:
+            s = f.read()
+            expected_output = (
+                "0004000133034205413540000100202007312006"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           \n"
+                "0004000133034005407940000157202003051022"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           \n"
+                "0004000133034105409340022139202012252006"
+                "                                        "
                 "Leendert MOLENDIJK [90038979]           "
             )
             self.assertEqual(expected_output, s)
@@ -1698,129 +3274,118 @@ class TestProcess(unittest.TestCase):
         self.assertEqual(oldest_date, "20200305")
         self.assertEqual(most_recent_date, "20201225")
 
-    def test_process_invalid_truncate(self):
+    def test_process_valid_jobs(self):
         """
-        Test the full process with an invalid --truncate argument, value too high
+        Test the full process with valid arguments, converting in parallel
         """
-        output_file = "tests/sample_files/nonexistent_test_output.txt"
-        input = "tests/sample_files/input1.txt"
-        output = output_file
-        config = "tests/sample_files/configuration1.xlsx"
-        delimiter = "^"
-        quotechar = '"'
-        skip_header = 1
-        skip_footer = 1
-        date_field_to_report_on = 5
-        truncate = [2, 4, 255]
-        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
-            level="CRITICAL"
-        ) as cm2:
-            target.process(
-                input,
-                output,
-                config,
-                delimiter,
-                quotechar,
-                skip_header,
-                skip_footer,
-                date_field_to_report_on,
-                "C",  # Default C locale
-                truncate,
-            )
-        self.assertEqual(cm1.exception.code, 26)
-        self.assertEqual(
-            cm2.output,
-            [
-                "CRITICAL:root:The value 255 passed in the `--truncate` argument is "
-                "invalid, it is higher than the 9 fields defined in the "
-                "configuration file. Exiting..."
-            ],
+        (temp_fd, output_file) = tempfile.mkstemp()
+        (num_input_rows, oldest_date, most_recent_date) = target.process(
+            "tests/sample_files/input1.txt",
+            output_file,
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
+            jobs=2,
         )
-
-    def test_process_invalid_divert(self):
-        """
-        Test the full process with an invalid --divert argument, value too high
-        """
-        output_file = "tests/sample_files/nonexistent_test_output.txt"
-        input = "tests/sample_files/input1.txt"
-        output = output_file
-        config = "tests/sample_files/configuration1.xlsx"
-        delimiter = "^"
-        quotechar = '"'
-        skip_header = 1
-        skip_footer = 1
-        date_field_to_report_on = 5
-        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
-            level="CRITICAL"
-        ) as cm2:
-            target.process(
-                input,
-                output,
-                config,
-                delimiter,
-                quotechar,
-                skip_header,
-                skip_footer,
-                date_field_to_report_on,
-                "C",  # Default C locale
-                None,
-                {255: ["aaa"]},
+        with open(output_file) as f:
+            s = f.read()
+            expected_output = (
+                "0004000133034205413540000100202007312006"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           \n"
+                "0004000133034005407940000157202003051022"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           \n"
+                "0004000133034105409340022139202012252006"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           "
             )
-        self.assertEqual(cm1.exception.code, 30)
-        self.assertEqual(
-            cm2.output,
-            [
-                "CRITICAL:root:The value 255 passed as field ID in the `--divert` "
-                "argument is invalid, it is higher than the 9 fields defined in the "
-                "configuration file. Exiting..."
-            ],
-        )
-
+            self.assertEqual(expected_output, s)
+        os.close(temp_fd)
+        os.remove(output_file)
+        self.assertEqual(num_input_rows, 3)
+        self.assertEqual(oldest_date, "20200305")
+        self.assertEqual(most_recent_date, "20201225")
 
-class TestInit(unittest.TestCase):
-    def test_init_no_param(self):
+    def test_process_valid_jobs_without_pool_initializer(self):
         """
-        Test the init code without any parameters
+        Test converting in parallel, and processing files concurrently, without
+        the `initializer` argument of the pools of processes (before Python
+        3.7)
         """
-        target.__name__ = "__main__"
-        target.sys.argv = ["scriptname.py"]
-        f = io.StringIO()
-        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stderr(f):
-            target.init()
-        self.assertEqual(cm.exception.code, 2)
-        self.assertTrue(
-            "error: the following arguments are required: "
-            "-c/--config" in f.getvalue()
+        temp_dir = tempfile.mkdtemp()
+        process_args = (
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
         )
+        expected_file = os.path.join(temp_dir, "expected.txt")
+        target.process("tests/sample_files/input1.txt", expected_file, *process_args)
+        with open(expected_file) as f:
+            expected_output = f.read()
+        input_output_files = [
+            (
+                "tests/sample_files/multiple/input1.txt",
+                os.path.join(temp_dir, "output1.txt"),
+            ),
+            (
+                "tests/sample_files/multiple/input1_copy1.txt",
+                os.path.join(temp_dir, "output2.txt"),
+            ),
+        ]
+        with unittest.mock.patch.object(target, "PROCESS_POOL_INITIALIZER", False):
+            for (output_name, kwargs) in (
+                ("jobs.txt", {"jobs": 2}),
+                ("positional.txt", {"jobs": 2, "positional_writes": True}),
+            ):
+                output_file = os.path.join(temp_dir, output_name)
+                target.process(
+                    "tests/sample_files/input1.txt",
+                    output_file,
+                    *process_args,
+                    **kwargs,
+                )
+                with open(output_file) as f:
+                    self.assertEqual(f.read(), expected_output)
+            target.process_files(
+                input_output_files,
+                "tests/sample_files/configuration1.xlsx",
+                ("^", '"', 1, 1, 5, "C"),
+                workers=2,
+            )
+        for (_, output_file) in input_output_files:
+            with open(output_file) as f:
+                self.assertEqual(f.read(), expected_output)
+        shutil.rmtree(temp_dir)
 
-    def test_init_valid_input_output(self):
+    def test_process_valid_jobs_positional_writes(self):
         """
-        Test the init code with valid --input/--output parameters
+        Test the full process with valid arguments, converting in parallel and
+        writing the records at their position in the output file
         """
         (temp_fd, output_file) = tempfile.mkstemp()
-        self.assertTrue(os.path.isfile(output_file))
-        target.__name__ = "__main__"
-        target.sys.argv = [
-            "scriptname.py",
-            "--input",
+        os.close(temp_fd)
+        (num_input_rows, oldest_date, most_recent_date) = target.process(
             "tests/sample_files/input1.txt",
-            "--output",
             output_file,
-            "--overwrite-file",
-            "--config",
             "tests/sample_files/configuration1.xlsx",
-            "--delimiter",
             "^",
-            "--skip-header",
-            "1",
-            "--skip-footer",
-            "1",
-            "--locale",
+            '"',
+            1,
+            1,
+            5,
             "C",  # Default C locale
-        ]
-        target.init()
-        # Confirm the output file has been written and check its content
-        self.assertTrue(os.path.isfile(output_file))
+            jobs=2,
+            positional_writes=True,
+        )
         with open(output_file) as f:
             s = f.read()
             expected_output = (
@@ -1835,10 +3400,875 @@ class TestInit(unittest.TestCase):
                 "Leendert MOLENDIJK [90038979]           "
             )
             self.assertEqual(expected_output, s)
-        # Remove the output file
-        os.close(temp_fd)
         os.remove(output_file)
-        self.assertFalse(os.path.isfile(output_file))
+        self.assertEqual(num_input_rows, 3)
+        self.assertEqual(oldest_date, "20200305")
+        self.assertEqual(most_recent_date, "20201225")
+
+    def test_process_valid_stats(self):
+        """
+        Test the full process collecting the statistics about the conversion
+        """
+        (temp_fd, output_file) = tempfile.mkstemp()
+        os.close(temp_fd)
+        for kwargs in ({}, {"jobs": 2}, {"jobs": 2, "positional_writes": True}):
+            stats = {}
+            target.process(
+                "tests/sample_files/input1.txt",
+                output_file,
+                "tests/sample_files/configuration1.xlsx",
+                "^",
+                '"',
+                1,
+                1,
+                5,
+                "C",  # Default C locale
+                divert={4: ["1.567"]},
+                stats=stats,
+                **kwargs,
+            )
+            self.assertEqual(stats["input_file"], "tests/sample_files/input1.txt")
+            self.assertEqual(stats["output_file"], output_file)
+            self.assertEqual(stats["num_rows"], 3)
+            self.assertEqual(stats["num_diverted"], 1)
+            self.assertEqual(stats["num_truncated"], 0)
+            self.assertEqual(stats["num_rejected"], 0)
+            self.assertEqual(stats["input_bytes"], 315)
+            self.assertEqual(stats["output_bytes"], 361)
+            self.assertEqual(list(stats["stages"]), list(target.STATS_STAGES))
+            self.assertGreater(stats["wall_seconds"], 0)
+            self.assertGreater(stats["rows_per_second"], 0)
+            self.assertEqual(stats["formats"]["Integer"]["num_values"], 9)
+            self.assertEqual(stats["formats"]["Decimal"]["num_values"], 3)
+        os.remove(output_file)
+        os.remove("%s_diverted" % output_file)
+
+    def test_process_truncated_summary(self):
+        """
+        Test that the truncated values get logged once per field, and each one
+        of them only when debugging
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_file = os.path.join(temp_dir, "input.txt")
+        output_file = os.path.join(temp_dir, "output.txt")
+        with open("tests/sample_files/input1.txt") as f:
+            content = f.read().replace("[90038979]", "[90038979] " + "X" * 20, 2)
+        with open(input_file, "w") as f:
+            f.write(content)
+        process_args = (
+            input_file,
+            output_file,
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
+            [8],
+        )
+        with self.assertLogs(level="INFO") as cm:
+            target.process(*process_args)
+        self.assertEqual(
+            [line for line in cm.output if "truncated" in line],
+            [
+                "INFO:root:2 values of field 8 of the input file %s were too long "
+                "and got truncated to their max length" % input_file
+            ],
+        )
+        with self.assertLogs(level="DEBUG") as cm:
+            target.process(*process_args)
+        self.assertEqual(
+            len([line for line in cm.output if "Truncating field" in line]), 2
+        )
+        shutil.rmtree(temp_dir)
+
+    def test_row_tracer(self):
+        """
+        Test logging a sample of the rows, passed in two parts
+        """
+        rows = [[str(idx), "value"] for idx in range(1, 11)]
+        with self.assertLogs(level="DEBUG") as cm:
+            tracer = target.RowTracer(first=2, last=2, every=4)
+            traced_rows = list(tracer.iter_traced(rows[:5]))
+            traced_rows += list(tracer.iter_traced(rows[5:], 6))
+            tracer.finish()
+        self.assertEqual(traced_rows, rows)
+        self.assertEqual(
+            cm.output,
+            [
+                "DEBUG:root:Row %d (ignoring the header): %d ||| value" % (idx, idx)
+                for idx in (1, 2, 4, 8, 9, 10)
+            ],
+        )
+        # Without debugging, the rows are passed on as they are
+        tracer = target.RowTracer(first=2, last=2, every=4)
+        self.assertIs(tracer.iter_traced(rows), rows)
+
+    def test_process_valid_profile(self):
+        """
+        Test profiling the full process with cProfile
+        """
+        import pstats
+
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        profile_file = os.path.join(temp_dir, "profile.pstats")
+        profiler = target.start_profiler("cprofile")
+        target.process(
+            "tests/sample_files/input1.txt",
+            output_file,
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
+        )
+        target.save_profile(profiler, profile_file)
+        functions = [name for (_, _, name) in pstats.Stats(profile_file).stats]
+        self.assertIn("process", functions)
+        self.assertIn("iter_convert_rows", functions)
+        shutil.rmtree(temp_dir)
+
+    def test_sampling_profiler(self):
+        """
+        Test sampling the functions being run
+        """
+
+        def busy_function():
+            deadline = time.monotonic() + 0.2
+            while time.monotonic() < deadline:
+                pass
+
+        temp_dir = tempfile.mkdtemp()
+        profile_file = os.path.join(temp_dir, "profile.json")
+        profiler = target.SamplingProfiler(0.001)
+        profiler.enable()
+        busy_function()
+        target.save_profile(profiler, profile_file)
+        with open(profile_file) as f:
+            profile = json.load(f)
+        shutil.rmtree(temp_dir)
+        self.assertEqual(profile["mode"], "sampling")
+        self.assertGreater(profile["num_samples"], 0)
+        # The busy function is the one running most often
+        self.assertEqual(profile["functions"][0]["function"], "busy_function")
+        self.assertGreater(profile["functions"][0]["self_samples"], 0)
+        self.assertGreaterEqual(
+            profile["functions"][0]["total_samples"],
+            profile["functions"][0]["self_samples"],
+        )
+
+    def test_process_valid_memory_report(self):
+        """
+        Test the full process collecting the peak memory usage of each stage
+        of the conversion
+        """
+        (temp_fd, output_file) = tempfile.mkstemp()
+        os.close(temp_fd)
+        for kwargs in ({}, {"stats": {}}, {"jobs": 2, "positional_writes": True}):
+            memory_report = {}
+            target.process(
+                "tests/sample_files/input1.txt",
+                output_file,
+                "tests/sample_files/configuration1.xlsx",
+                "^",
+                '"',
+                1,
+                1,
+                5,
+                "C",  # Default C locale
+                memory_report=memory_report,
+                **kwargs,
+            )
+            self.assertEqual(
+                memory_report["input_file"], "tests/sample_files/input1.txt"
+            )
+            self.assertEqual(list(memory_report["stages"]), list(target.STATS_STAGES))
+            self.assertGreater(memory_report["peak_traced_bytes"], 0)
+            self.assertEqual(
+                memory_report["peak_traced_bytes"],
+                max(
+                    stage["peak_traced_bytes"]
+                    for stage in memory_report["stages"].values()
+                ),
+            )
+            if sys.platform.startswith("linux"):
+                self.assertGreater(memory_report["peak_rss_bytes"], 0)
+            if "stats" in kwargs:
+                # The memory report doesn't prevent the statistics
+                self.assertEqual(kwargs["stats"]["num_rows"], 3)
+                self.assertNotIn("memory", kwargs["stats"])
+        os.remove(output_file)
+
+    def test_is_ascii(self):
+        """
+        Test checking whether strings are plain ASCII, also before Python 3.7
+        """
+        for (value, expected) in (("", True), ("a^b\r\n", True), ("é", False)):
+            self.assertEqual(target.is_ascii(value), expected)
+
+    def test_mapping_contains(self):
+        """
+        Test searching the memory-mapped input file in chunks, with a line
+        separator split over two chunks
+        """
+        import mmap
+
+        for (content, contains_non_crlf, line_sep) in (
+            (b"ab\r\ncd\r\nef\r\n", False, b"\r\n"),
+            (b"abc\r\nd\ref\r\n", True, None),
+            (b"abc\r\ndefg\nh", True, None),
+            (b"abc\ndefg\nhij", True, b"\n"),
+        ):
+            with tempfile.TemporaryFile() as f:
+                f.write(content)
+                f.flush()
+                with mmap.mmap(
+                    f.fileno(), 0, access=mmap.ACCESS_READ
+                ) as mapping, unittest.mock.patch.object(target, "MMAP_SCAN_SIZE", 4):
+                    self.assertEqual(
+                        target.mapping_contains(mapping, target.NON_CRLF_PATTERN),
+                        contains_non_crlf,
+                    )
+                    self.assertTrue(target.mapping_contains(mapping, b"d"))
+                    self.assertFalse(target.mapping_contains(mapping, b'"'))
+                    self.assertEqual(
+                        target.get_mapped_line_separator(mapping, "^", '"', "utf-8"),
+                        line_sep,
+                    )
+
+    def test_process_valid_jobs_positional_writes_fallback(self):
+        """
+        Test that the records get written in order when they don't all have the
+        same length in bytes
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_file = os.path.join(temp_dir, "input.txt")
+        with open("tests/sample_files/input1.txt", encoding="utf-8") as f:
+            content = f.read().replace("Leendert", "Léendert", 1)
+        with open(input_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        process_args = (
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
+        )
+        output_files = [
+            os.path.join(temp_dir, "output1.txt"),
+            os.path.join(temp_dir, "output2.txt"),
+        ]
+        target.process(input_file, output_files[0], *process_args)
+        # The stages of the memory report still open when it is collected
+        active_stages = []
+        get_summary = target.MemoryTracker.get_summary
+
+        def get_summary_checking_stages(memory_tracker):
+            active_stages.append(list(memory_tracker.active_stages))
+            return get_summary(memory_tracker)
+
+        with self.assertLogs(level="WARNING") as cm, unittest.mock.patch.object(
+            target.MemoryTracker, "get_summary", get_summary_checking_stages
+        ):
+            target.process(
+                input_file,
+                output_files[1],
+                *process_args,
+                jobs=2,
+                positional_writes=True,
+                memory_report={},
+            )
+        # The "convert" stage of the positional writes has been ended
+        self.assertEqual(active_stages, [["write"]])
+        self.assertEqual(
+            cm.output,
+            [
+                "WARNING:root:The records of the output file %s don't all have the "
+                "same length in bytes, they are converted again to be written in "
+                "order instead." % output_files[1]
+            ],
+        )
+        with open(output_files[0]) as f1, open(output_files[1]) as f2:
+            self.assertEqual(f1.read(), f2.read())
+        self.assertEqual(
+            sorted(os.listdir(temp_dir)), ["input.txt", "output1.txt", "output2.txt"]
+        )
+        shutil.rmtree(temp_dir)
+
+    def test_process_max_errors(self):
+        """
+        Test the full process rejecting the rows that can't be converted
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_file = os.path.join(temp_dir, "input.txt")
+        with open("tests/sample_files/input1.txt", encoding="utf-8") as f:
+            content = f.read().replace("31/7/2020", "31/13/2020", 1)
+        with open(input_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        output_file = os.path.join(temp_dir, "output.txt")
+        reject_file = os.path.join(temp_dir, "rejected.txt")
+        for max_errors in (0, 1):
+            with self.assertLogs(level="ERROR") as cm:
+                args = (
+                    input_file,
+                    output_file,
+                    "tests/sample_files/configuration1.xlsx",
+                    "^",
+                    '"',
+                    1,
+                    1,
+                    5,
+                    "C",  # Default C locale
+                )
+                if max_errors == 0:
+                    with self.assertRaises(SystemExit) as cm2:
+                        target.process(
+                            *args, max_errors=max_errors, reject_file=reject_file
+                        )
+                    self.assertEqual(cm2.exception.code, 53)
+                    self.assertFalse(os.path.isfile(output_file))
+                else:
+                    result = target.process(
+                        *args, max_errors=max_errors, reject_file=reject_file
+                    )
+                    self.assertEqual(result, (3, "20200305", "20201225"))
+            self.assertTrue(cm.output[0].startswith("ERROR:root:Invalid date value"))
+            with open(reject_file) as f:
+                self.assertTrue(f.read().startswith("1^5^18^"))
+        with open(output_file) as f:
+            self.assertEqual(len(f.read().split("\n")), 2)
+        shutil.rmtree(temp_dir)
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy is not installed")
+    def test_process_valid_numpy_engine(self):
+        """
+        Test the full process with valid arguments, using the "numpy" engine
+        """
+        output_files = []
+        results = []
+        for engine in ("python", "numpy"):
+            (temp_fd, output_file) = tempfile.mkstemp()
+            os.close(temp_fd)
+            output_files.append(output_file)
+            results.append(
+                target.process(
+                    "tests/sample_files/input1.txt",
+                    output_file,
+                    "tests/sample_files/configuration1.xlsx",
+                    "^",
+                    '"',
+                    1,
+                    1,
+                    5,
+                    "C",  # Default C locale
+                    truncate=[8],
+                    divert={4: ["1.567"]},
+                    engine=engine,
+                )
+            )
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1], (3, "20200305", "20201225"))
+        for suffix in ("", "_diverted"):
+            contents = []
+            for output_file in output_files:
+                with open(output_file + suffix, "rb") as f:
+                    contents.append(f.read())
+                os.remove(output_file + suffix)
+            self.assertEqual(contents[0], contents[1])
+        self.assertEqual(len(contents[1]), 120)
+
+    def test_process_invalid_truncate(self):
+        """
+        Test the full process with an invalid --truncate argument, value too high
+        """
+        output_file = "tests/sample_files/nonexistent_test_output.txt"
+        input = "tests/sample_files/input1.txt"
+        output = output_file
+        config = "tests/sample_files/configuration1.xlsx"
+        delimiter = "^"
+        quotechar = '"'
+        skip_header = 1
+        skip_footer = 1
+        date_field_to_report_on = 5
+        truncate = [2, 4, 255]
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.process(
+                input,
+                output,
+                config,
+                delimiter,
+                quotechar,
+                skip_header,
+                skip_footer,
+                date_field_to_report_on,
+                "C",  # Default C locale
+                truncate,
+            )
+        self.assertEqual(cm1.exception.code, 26)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:The value 255 passed in the `--truncate` argument is "
+                "invalid, it is higher than the 9 fields defined in the "
+                "configuration file. Exiting..."
+            ],
+        )
+
+    def test_process_invalid_divert(self):
+        """
+        Test the full process with an invalid --divert argument, value too high
+        """
+        output_file = "tests/sample_files/nonexistent_test_output.txt"
+        input = "tests/sample_files/input1.txt"
+        output = output_file
+        config = "tests/sample_files/configuration1.xlsx"
+        delimiter = "^"
+        quotechar = '"'
+        skip_header = 1
+        skip_footer = 1
+        date_field_to_report_on = 5
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.process(
+                input,
+                output,
+                config,
+                delimiter,
+                quotechar,
+                skip_header,
+                skip_footer,
+                date_field_to_report_on,
+                "C",  # Default C locale
+                None,
+                {255: ["aaa"]},
+            )
+        self.assertEqual(cm1.exception.code, 30)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:The value 255 passed as field ID in the `--divert` "
+                "argument is invalid, it is higher than the 9 fields defined in the "
+                "configuration file. Exiting..."
+            ],
+        )
+
+
+class TestShards(unittest.TestCase):
+    def write_input_file(self, content):
+        (temp_fd, input_file) = tempfile.mkstemp()
+        with os.fdopen(temp_fd, "wb") as f:
+            f.write(content)
+        return input_file
+
+    def test_get_shard_range(self):
+        """
+        Test that the shards start at the beginning of a row, even within a
+        quoted value spanning several lines
+        """
+        input_file = self.write_input_file(b'h\r\na,"b\r\n""c""\r\nd"\r\ne,f\r\ng\rt')
+        self.assertEqual(
+            [target.get_shard_range(input_file, '"', 0, 0, i, 2) for i in (1, 2)],
+            [(0, 20), (20, 28)],
+        )
+        self.assertEqual(
+            [target.get_shard_range(input_file, '"', 1, 1, i, 3) for i in (1, 2, 3)],
+            [(3, 20), (20, 20), (20, 27)],
+        )
+        self.assertEqual(target.get_shard_range(input_file, '"', 9, 0, 1, 1), (28, 28))
+        self.assertEqual(target.get_shard_range(input_file, '"', 0, 9, 1, 1), (0, 0))
+        os.remove(input_file)
+
+    def test_iter_input_file_byte_range(self):
+        """
+        Test that the rows of the shards of an input file are those of the
+        whole file, with and without quote characters
+        """
+        for content in (
+            b'h\r\na,"b\r\n""c""\r\nd"\r\ne,f\r\ng\rt',
+            b"h\r\na,b\r\nc\r\n\r\nd,e\r\nt\r\n",
+        ):
+            input_file = self.write_input_file(content)
+            rows = list(target.iter_input_file(input_file, ",", '"', 1, 1, "utf-8"))
+            for num_shards in range(1, 6):
+                shard_rows = []
+                for shard in range(1, num_shards + 1):
+                    byte_range = target.get_shard_range(
+                        input_file, '"', 1, 1, shard, num_shards
+                    )
+                    shard_rows.extend(
+                        target.iter_input_file(
+                            input_file, ",", '"', 0, 0, "utf-8", byte_range
+                        )
+                    )
+                self.assertEqual(shard_rows, rows)
+            os.remove(input_file)
+
+    def test_process_shards_merge(self):
+        """
+        Test converting an input file shard by shard, and merging the parts
+        """
+        temp_dir = tempfile.mkdtemp()
+        process_args = (
+            "tests/sample_files/input1.txt",
+            None,
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
+            None,
+            {4: ["1.567"]},
+        )
+        expected_output_file = os.path.join(temp_dir, "expected.txt")
+        expected_result = target.process(
+            process_args[0], expected_output_file, *process_args[2:]
+        )
+        output_file = os.path.join(temp_dir, "output.txt")
+        for shard in (1, 2, 3, 4):
+            target.process(
+                process_args[0], output_file, *process_args[2:], shard=(shard, 4)
+            )
+        # 4 part files, their 4 reports and 1 diverted part file
+        self.assertEqual(len(os.listdir(temp_dir)), 11)
+        self.assertTrue(os.path.isfile(os.path.join(temp_dir, "output.part2of4.txt")))
+        result = target.merge_shards(process_args[0], output_file, 4)
+        self.assertEqual(result, expected_result)
+        self.assertEqual(result, (3, "20200305", "20201225"))
+        for (expected_file, merged_file) in (
+            ("expected.txt", "output.txt"),
+            ("expected_diverted.txt", "output_diverted.txt"),
+        ):
+            with open(os.path.join(temp_dir, expected_file)) as f1, open(
+                os.path.join(temp_dir, merged_file)
+            ) as f2:
+                self.assertEqual(f1.read(), f2.read())
+        self.assertEqual(
+            sorted(os.listdir(temp_dir)),
+            [
+                "expected.txt",
+                "expected_diverted.txt",
+                "output.txt",
+                "output_diverted.txt",
+            ],
+        )
+        shutil.rmtree(temp_dir)
+
+    def test_merge_shards_missing(self):
+        """
+        Test merging the shards when one of them hasn't been converted
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        for shard in (1, 3):
+            target.process(
+                "tests/sample_files/input1.txt",
+                output_file,
+                "tests/sample_files/configuration1.xlsx",
+                "^",
+                '"',
+                1,
+                1,
+                locale="C",
+                shard=(shard, 3),
+            )
+        with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+            level="CRITICAL"
+        ) as cm2:
+            target.merge_shards("tests/sample_files/input1.txt", output_file, 3)
+        self.assertEqual(cm1.exception.code, 48)
+        self.assertEqual(
+            cm2.output,
+            [
+                "CRITICAL:root:The shard 2 of 3 has not been converted from the "
+                "input file tests/sample_files/input1.txt to the part file %s. "
+                "Exiting..." % os.path.join(temp_dir, "output.part2of3.txt")
+            ],
+        )
+        self.assertFalse(os.path.isfile(output_file))
+        shutil.rmtree(temp_dir)
+
+    def test_copy_file_content(self):
+        """
+        Test appending the content of a file, with each way of copying it
+        """
+        source_file = self.write_input_file(b"abc" * 1000)
+        for unsupported in ([], ["copy_file_range"], ["copy_file_range", "sendfile"]):
+            (temp_fd, output_file) = tempfile.mkstemp()
+            os.write(temp_fd, b"start")
+            with contextlib.ExitStack() as stack:
+                for name in unsupported:
+                    stack.enter_context(
+                        unittest.mock.patch.object(
+                            target.os, name, side_effect=OSError, create=True
+                        )
+                    )
+                target.copy_file_content(source_file, temp_fd)
+            os.close(temp_fd)
+            with open(output_file, "rb") as f:
+                self.assertEqual(f.read(), b"start" + b"abc" * 1000)
+            os.remove(output_file)
+        os.remove(source_file)
+
+
+class TestCheckpoints(unittest.TestCase):
+    def get_process_args(self, input_file, output_file):
+        return (
+            input_file,
+            output_file,
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
+            None,
+            {4: ["1.567"]},
+        )
+
+    def interrupt_after_first_checkpoint(self, process_args):
+        # Run the conversion with a checkpoint after each row, until the first
+        # checkpoint has been saved
+        save_checkpoint = target.save_checkpoint
+        checkpoints = []
+
+        def interrupt_after_checkpoint(checkpoint_file, checkpoint):
+            save_checkpoint(checkpoint_file, checkpoint)
+            checkpoints.append(dict(checkpoint))
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt), unittest.mock.patch.object(
+            target, "save_checkpoint", side_effect=interrupt_after_checkpoint
+        ):
+            target.process(*process_args, checkpoint_interval=1)
+        return checkpoints[0]
+
+    def test_iter_checkpoint_segments(self):
+        """
+        Test that the segments end at the start of a row, even within a quoted
+        value spanning several lines
+        """
+        (temp_fd, input_file) = tempfile.mkstemp()
+        with os.fdopen(temp_fd, "wb") as f:
+            f.write(b'h\r\na,"b\r\n""c""\r\nd"\r\ne,f\r\ng\rt')
+        self.assertEqual(
+            list(target.iter_checkpoint_segments(input_file, '"', 3, 27, 1)),
+            [(3, 20), (20, 25), (25, 27)],
+        )
+        self.assertEqual(
+            list(target.iter_checkpoint_segments(input_file, '"', 3, 27, 20)),
+            [(3, 25), (25, 27)],
+        )
+        self.assertEqual(
+            list(target.iter_checkpoint_segments(input_file, "", 0, 28, 5)),
+            [(0, 9), (9, 16), (16, 25), (25, 28)],
+        )
+        self.assertEqual(
+            list(target.iter_checkpoint_segments(input_file, '"', 27, 27, 5)), []
+        )
+        os.remove(input_file)
+
+    def test_process_checkpoints_scan_segments(self):
+        """
+        Test that each segment only gets searched for the quote character and
+        the line separators between its own offsets, not in the whole file
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        process_args = self.get_process_args(
+            "tests/sample_files/input1.txt", output_file
+        )
+        with unittest.mock.patch.object(
+            target, "iter_input_file", wraps=target.iter_input_file
+        ) as iter_input_file, unittest.mock.patch.object(
+            target, "mapping_contains", wraps=target.mapping_contains
+        ) as mapping_contains:
+            target.process(*process_args, checkpoint_interval=1)
+        shutil.rmtree(temp_dir)
+        segments = [args[6] for (args, _) in iter_input_file.call_args_list if args[6]]
+        self.assertEqual(len(segments), 3)
+        self.assertTrue(mapping_contains.called)
+        for (args, _) in mapping_contains.call_args_list:
+            self.assertIn(tuple(args[2:4]), segments)
+
+    def test_process_resume(self):
+        """
+        Test resuming a conversion interrupted after a checkpoint
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_file = "tests/sample_files/input1.txt"
+        expected_output_file = os.path.join(temp_dir, "expected.txt")
+        expected_result = target.process(
+            *self.get_process_args(input_file, expected_output_file)
+        )
+        output_file = os.path.join(temp_dir, "output.txt")
+        process_args = self.get_process_args(input_file, output_file)
+        checkpoint = self.interrupt_after_first_checkpoint(process_args)
+        self.assertFalse(os.path.isfile(output_file))
+        self.assertEqual(checkpoint["num_rows"], 1)
+        self.assertEqual(checkpoint["diverted_output"], None)
+        self.assertTrue(os.path.isfile(output_file + ".checkpoint.json"))
+        # The content written after the checkpoint gets discarded
+        with open(os.path.join(temp_dir, ".output.txt.checkpoint.tmp"), "a") as f:
+            f.write("\nnot converted")
+        with self.assertLogs(level="INFO") as cm:
+            result = target.process(*process_args, checkpoint_interval=1, resume=True)
+        self.assertEqual(
+            cm.output[-1],
+            "INFO:root:Resuming after row 1 from the checkpoint %s"
+            % os.path.join(temp_dir, "output.txt.checkpoint.json"),
+        )
+        self.assertEqual(result, expected_result)
+        for (expected_file, resumed_file) in (
+            ("expected.txt", "output.txt"),
+            ("expected_diverted.txt", "output_diverted.txt"),
+        ):
+            with open(os.path.join(temp_dir, expected_file)) as f1, open(
+                os.path.join(temp_dir, resumed_file)
+            ) as f2:
+                self.assertEqual(f1.read(), f2.read())
+        self.assertEqual(
+            sorted(os.listdir(temp_dir)),
+            [
+                "expected.txt",
+                "expected_diverted.txt",
+                "output.txt",
+                "output_diverted.txt",
+            ],
+        )
+        shutil.rmtree(temp_dir)
+
+    def test_process_resume_without_checkpoint(self):
+        """
+        Test that resuming without a checkpoint converts the whole input file
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        with self.assertLogs(level="INFO") as cm:
+            result = target.process(
+                *self.get_process_args("tests/sample_files/input1.txt", output_file),
+                resume=True,
+            )
+        self.assertEqual(
+            cm.output[-1],
+            "INFO:root:No checkpoint %s.checkpoint.json, starting from the "
+            "beginning" % output_file,
+        )
+        self.assertEqual(result, (3, "20200305", "20201225"))
+        self.assertEqual(
+            sorted(os.listdir(temp_dir)), ["output.txt", "output_diverted.txt"]
+        )
+        shutil.rmtree(temp_dir)
+
+    def test_process_resume_invalid(self):
+        """
+        Test resuming from a checkpoint after the partially written output file
+        or the input file changed
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_file = os.path.join(temp_dir, "input.txt")
+        output_file = os.path.join(temp_dir, "output.txt")
+        process_args = self.get_process_args(input_file, output_file)
+        partial_output_file = os.path.join(temp_dir, ".output.txt.checkpoint.tmp")
+        for change in ("output", "input"):
+            shutil.copy("tests/sample_files/input1.txt", input_file)
+            self.interrupt_after_first_checkpoint(process_args)
+            if change == "output":
+                with open(partial_output_file, "r+") as f:
+                    f.write("X")
+            else:
+                with open(input_file, "a") as f:
+                    f.write("\n")
+            with self.assertRaises(SystemExit) as cm1, self.assertLogs(
+                level="CRITICAL"
+            ) as cm2:
+                target.process(*process_args, resume=True)
+            self.assertEqual(cm1.exception.code, 56)
+            self.assertEqual(
+                cm2.output,
+                [
+                    "CRITICAL:root:The checkpoint %s.checkpoint.json doesn't match "
+                    "the input file %s, the arguments or the partially written "
+                    "output files. Delete it to convert the input file from the "
+                    "beginning. Exiting..." % (output_file, input_file)
+                ],
+            )
+        shutil.rmtree(temp_dir)
+
+
+class TestInit(unittest.TestCase):
+    def test_init_no_param(self):
+        """
+        Test the init code without any parameters
+        """
+        target.__name__ = "__main__"
+        target.sys.argv = ["scriptname.py"]
+        f = io.StringIO()
+        with self.assertRaises(SystemExit) as cm, contextlib.redirect_stderr(f):
+            target.init()
+        self.assertEqual(cm.exception.code, 2)
+        self.assertTrue(
+            "error: the following arguments are required: "
+            "-c/--config" in f.getvalue()
+        )
+
+    def test_init_valid_input_output(self):
+        """
+        Test the init code with valid --input/--output parameters
+        """
+        (temp_fd, output_file) = tempfile.mkstemp()
+        self.assertTrue(os.path.isfile(output_file))
+        target.__name__ = "__main__"
+        target.sys.argv = [
+            "scriptname.py",
+            "--input",
+            "tests/sample_files/input1.txt",
+            "--output",
+            output_file,
+            "--overwrite-file",
+            "--config",
+            "tests/sample_files/configuration1.xlsx",
+            "--delimiter",
+            "^",
+            "--skip-header",
+            "1",
+            "--skip-footer",
+            "1",
+            "--locale",
+            "C",  # Default C locale
+        ]
+        target.init()
+        # Confirm the output file has been written and check its content
+        self.assertTrue(os.path.isfile(output_file))
+        with open(output_file) as f:
+            s = f.read()
+            expected_output = (
+                "0004000133034205413540000100202007312006"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           \n"
+                "0004000133034005407940000157202003051022"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           \n"
+                "0004000133034105409340022139202012252006"
+                "                                        "
+                "Leendert MOLENDIJK [90038979]           "
+            )
+            self.assertEqual(expected_output, s)
+        # Remove the output file
+        os.close(temp_fd)
+        os.remove(output_file)
+        self.assertFalse(os.path.isfile(output_file))
 
     def test_init_valid_input_directory_output_directory(self):
         """
@@ -1898,6 +4328,874 @@ class TestInit(unittest.TestCase):
         self.assertFalse(os.path.isdir(output_directory))
 
 
+class TestProcessFiles(unittest.TestCase):
+    def test_process_files_workers(self):
+        """
+        Test processing several files concurrently, moving the input files
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_output_files = []
+        for i in range(4):
+            input_file = os.path.join(temp_dir, "input%d.txt" % i)
+            shutil.copy("tests/sample_files/input1.txt", input_file)
+            input_output_files.append(
+                (input_file, os.path.join(temp_dir, "output%d.txt" % i))
+            )
+        moved_directory = os.path.join(temp_dir, "moved")
+        os.mkdir(moved_directory)
+        process_args = ("^", '"', 1, 1, None, "C")
+        target.process_files(
+            input_output_files,
+            "tests/sample_files/configuration1.xlsx",
+            process_args,
+            2,
+            moved_directory,
+        )
+        self.assertEqual(num_files_in_directory(moved_directory), 4)
+        for i in range(4):
+            self.assertFalse(os.path.isfile(os.path.join(temp_dir, "input%d.txt" % i)))
+            with open(os.path.join(temp_dir, "output%d.txt" % i)) as f:
+                self.assertEqual(len(f.read().split("\n")), 3)
+        shutil.rmtree(temp_dir)
+
+    def test_process_files_stats(self):
+        """
+        Test saving the statistics about the conversion of several input files
+        """
+        temp_dir = tempfile.mkdtemp()
+        stats_file = os.path.join(temp_dir, "stats.json")
+        input_output_files = [
+            (
+                "tests/sample_files/multiple/input1.txt",
+                os.path.join(temp_dir, "output1.txt"),
+            ),
+            (
+                "tests/sample_files/multiple/input1_copy1.txt",
+                os.path.join(temp_dir, "output2.txt"),
+            ),
+        ]
+        process_args = ("^", '"', 1, 1, 5, "C")
+        start_times = target.get_times()
+        files_stats = []
+        target.process_files(
+            input_output_files,
+            "tests/sample_files/configuration1.xlsx",
+            process_args,
+            workers=2,
+            stats=files_stats,
+        )
+        target.save_stats(stats_file, files_stats, start_times)
+        with open(stats_file) as f:
+            saved_stats = json.load(f)
+        shutil.rmtree(temp_dir)
+        self.assertEqual(saved_stats["version"], target.__version__)
+        self.assertEqual(
+            [file_stats["input_file"] for file_stats in saved_stats["files"]],
+            [
+                "tests/sample_files/multiple/input1.txt",
+                "tests/sample_files/multiple/input1_copy1.txt",
+            ],
+        )
+        total = saved_stats["total"]
+        self.assertEqual(total["num_files"], 2)
+        self.assertEqual(
+            total["num_rows"],
+            sum(file_stats["num_rows"] for file_stats in saved_stats["files"]),
+        )
+        self.assertEqual(
+            total["output_bytes"],
+            sum(file_stats["output_bytes"] for file_stats in saved_stats["files"]),
+        )
+        self.assertEqual(
+            total["formats"]["Integer"]["num_values"],
+            sum(
+                file_stats["formats"]["Integer"]["num_values"]
+                for file_stats in saved_stats["files"]
+            ),
+        )
+
+    def test_process_files_progress(self):
+        """
+        Test reporting the progress of the conversion of several input files,
+        one at a time or concurrently
+        """
+        temp_dir = tempfile.mkdtemp()
+        status_file = os.path.join(temp_dir, "status.txt")
+        # The second input file contains quotes, so it gets read by the CSV reader
+        input_files = [
+            os.path.join(temp_dir, "input1.txt"),
+            os.path.join(temp_dir, "input2.txt"),
+        ]
+        shutil.copy("tests/sample_files/input1.txt", input_files[0])
+        with open("tests/sample_files/input1.txt") as f:
+            content = f.read().replace("Leendert MOLENDIJK", '"Leendert MOLENDIJK"')
+        with open(input_files[1], "w") as f:
+            f.write(content)
+        total_bytes = sum(os.path.getsize(f) for f in input_files)
+        input_output_files = [(f, "%s.out" % f) for f in input_files]
+        process_args = ("^", '"', 1, 1, 5, "C")
+        for workers in (1, 2):
+            progress = target.ProgressReporter(1e-9, input_files, status_file)
+            target.process_files(
+                input_output_files,
+                "tests/sample_files/configuration1.xlsx",
+                process_args,
+                workers,
+                progress=progress,
+            )
+            with open(status_file) as f:
+                lines = f.read().splitlines()
+            os.remove(status_file)
+            self.assertGreater(len(lines), 1)
+            for line in lines[:-1]:
+                self.assertRegex(
+                    line,
+                    r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d Progress: [0-2] of 2 files "
+                    r"done, [0-6] rows, 0\.0 of 0\.0 MiB \(\d+\.\d%\), \d+ rows/s, "
+                    r"ETA (\d:\d\d:\d\d|unknown)$",
+                )
+            self.assertRegex(
+                lines[-1],
+                r" Done: 2 of 2 files done, 6 rows, 0\.0 of 0\.0 MiB \(100\.0%\), "
+                r"\d+ rows/s on average, in \d:\d\d:\d\d$",
+            )
+            self.assertEqual(progress.get_consumed_bytes(), total_bytes)
+        shutil.rmtree(temp_dir)
+
+    def test_process_progress_stderr(self):
+        """
+        Test reporting the progress of the conversion of an input file to stderr
+        """
+        (temp_fd, output_file) = tempfile.mkstemp()
+        os.close(temp_fd)
+        progress = target.ProgressReporter(3600, ["tests/sample_files/input1.txt"])
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            target.process(
+                "tests/sample_files/input1.txt",
+                output_file,
+                "tests/sample_files/configuration1.xlsx",
+                "^",
+                '"',
+                1,
+                1,
+                5,
+                "C",  # Default C locale
+                progress=progress,
+            )
+            # Nothing is reported before the end of the first interval
+            self.assertEqual(stderr.getvalue(), "")
+            progress.finish()
+        os.remove(output_file)
+        self.assertRegex(
+            stderr.getvalue(),
+            r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d Done: 1 of 1 files done, 3 rows, "
+            r"0\.0 of 0\.0 MiB \(100\.0%\), \d+ rows/s on average, in 0:00:00\n$",
+        )
+
+    def test_process_files_workers_invalid(self):
+        """
+        Test that an error in one of the files stops the processing, without
+        moving the input file in error
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_file = os.path.join(temp_dir, "input.txt")
+        with open(input_file, "w") as f:
+            f.write("H\n1^2^3^4^5^6^7^8^9^10\nT")
+        output_file = os.path.join(temp_dir, "output.txt")
+        process_args = ("^", '"', 1, 1, None, "C")
+        with self.assertRaises(SystemExit) as cm:
+            target.process_files(
+                [(input_file, output_file)],
+                "tests/sample_files/configuration1.xlsx",
+                process_args,
+                2,
+                temp_dir,
+            )
+        self.assertEqual(cm.exception.code, 23)
+        self.assertTrue(os.path.isfile(input_file))
+        self.assertFalse(os.path.isfile(output_file))
+        shutil.rmtree(temp_dir)
+
+    def test_process_files_memory_report(self):
+        """
+        Test saving the peak memory usage of the conversion of several input
+        files
+        """
+        temp_dir = tempfile.mkdtemp()
+        memory_report_file = os.path.join(temp_dir, "memory.json")
+        input_output_files = [
+            (
+                "tests/sample_files/multiple/input1_copy1.txt",
+                os.path.join(temp_dir, "output2.txt"),
+            ),
+            (
+                "tests/sample_files/multiple/input1.txt",
+                os.path.join(temp_dir, "output1.txt"),
+            ),
+        ]
+        process_args = ("^", '"', 1, 1, 5, "C")
+        for workers in (1, 2):
+            memory_reports = []
+            target.process_files(
+                input_output_files,
+                "tests/sample_files/configuration1.xlsx",
+                process_args,
+                workers=workers,
+                memory_reports=memory_reports,
+            )
+            target.save_memory_report(memory_report_file, memory_reports)
+            with open(memory_report_file) as f:
+                saved_memory_report = json.load(f)
+            self.assertEqual(saved_memory_report["version"], target.__version__)
+            files = saved_memory_report["files"]
+            self.assertEqual(
+                [memory_report["input_file"] for memory_report in files],
+                [
+                    "tests/sample_files/multiple/input1.txt",
+                    "tests/sample_files/multiple/input1_copy1.txt",
+                ],
+            )
+            self.assertEqual(
+                saved_memory_report["total"]["peak_traced_bytes"],
+                max(memory_report["peak_traced_bytes"] for memory_report in files),
+            )
+        shutil.rmtree(temp_dir)
+
+    def test_process_files_threads(self):
+        """
+        Test processing several files concurrently in threads
+        """
+        temp_dir = tempfile.mkdtemp()
+        input_output_files = []
+        for i in range(4):
+            input_file = os.path.join(temp_dir, "input%d.txt" % i)
+            shutil.copy("tests/sample_files/input1.txt", input_file)
+            input_output_files.append(
+                (input_file, os.path.join(temp_dir, "output%d.txt" % i))
+            )
+        expected_file = os.path.join(temp_dir, "expected.txt")
+        process_args = ("^", '"', 1, 1, None, "C")
+        target.process(
+            "tests/sample_files/input1.txt",
+            expected_file,
+            "tests/sample_files/configuration1.xlsx",
+            *process_args,
+        )
+        with open(expected_file) as f:
+            expected_content = f.read()
+        files_stats = []
+        with unittest.mock.patch.object(
+            target, "load_config", wraps=target.load_config
+        ) as load_config:
+            target.process_files(
+                input_output_files,
+                "tests/sample_files/configuration1.xlsx",
+                process_args,
+                workers=2,
+                stats=files_stats,
+                worker_type="thread",
+            )
+        # The configuration is only loaded once, for all the threads
+        self.assertEqual(load_config.call_count, 1)
+        self.assertEqual(
+            sorted(file_stats["input_file"] for file_stats in files_stats),
+            [input_file for (input_file, _) in input_output_files],
+        )
+        for (_, output_file) in input_output_files:
+            with open(output_file) as f:
+                self.assertEqual(f.read(), expected_content)
+        shutil.rmtree(temp_dir)
+
+    def convert_mixed_feeds(self, convert_feed, de_setting, en_setting):
+        # Convert 16 feeds, alternately written with the German and American
+        # decimal separators, concurrently in 8 threads with
+        # `convert_feed(input_file, output_file, setting)`, the setting being
+        # `de_setting` or `en_setting` depending on the feed, and check that all
+        # their rows are converted with the right separators
+        import concurrent.futures
+
+        num_rows = 2000
+        values = [(i * 1234567 % 10**9, i % 100) for i in range(num_rows)]
+        expected_content = "\n".join(
+            "%012d%06d" % (units * 100 + cents, i)
+            for (i, (units, cents)) in enumerate(values)
+        )
+        temp_dir = tempfile.mkdtemp()
+        feeds = []
+        for i in range(16):
+            (setting, decimal_point, thousands_sep) = (
+                (de_setting, ",", ".") if i % 2 else (en_setting, ".", ",")
+            )
+            input_file = os.path.join(temp_dir, "input%d.txt" % i)
+            with open(input_file, "w") as f:
+                for (idx_row, (units, cents)) in enumerate(values):
+                    f.write(
+                        "%s%s%02d;%d\n"
+                        % (
+                            format(units, ",").replace(",", thousands_sep),
+                            decimal_point,
+                            cents,
+                            idx_row,
+                        )
+                    )
+            feeds.append((input_file, "%s.out" % input_file, setting))
+        current_locale = setlocale(LC_NUMERIC)
+        with concurrent.futures.ThreadPoolExecutor(8) as executor:
+            futures = [
+                executor.submit(convert_feed, input_file, output_file, setting)
+                for (input_file, output_file, setting) in feeds
+            ]
+            for future in futures:
+                self.assertEqual(future.result(), num_rows)
+        self.assertEqual(setlocale(LC_NUMERIC), current_locale)
+        for (_, output_file, _) in feeds:
+            with open(output_file) as f:
+                self.assertEqual(f.read(), expected_content)
+        shutil.rmtree(temp_dir)
+
+    def get_mixed_feeds_config(self):
+        return [
+            {"length": 12, "output_format": "Decimal", "skip_field": False},
+            {"length": 6, "output_format": "Integer", "skip_field": False},
+        ]
+
+    def test_process_threads_mixed_locales(self):
+        """
+        Test converting German and American feeds concurrently in threads, each
+        with its own locale, without changing the locale of the process
+        """
+        de_locale = get_available_locale("de_DE.UTF-8", "de_DE.utf8", "de_DE")
+        en_locale = get_available_locale("en_US.UTF-8", "en_US.utf8", "en_US")
+        if de_locale is None or en_locale is None:
+            self.skipTest("The de_DE and en_US locales are not available")
+        config = self.get_mixed_feeds_config()
+
+        def convert_feed(input_file, output_file, locale):
+            return target.process(
+                input_file, output_file, config, ";", '"', 0, 0, locale=locale
+            )[0]
+
+        self.convert_mixed_feeds(convert_feed, de_locale, en_locale)
+
+    def test_converters_threads_mixed_separators(self):
+        """
+        Test converting German and American feeds concurrently in threads with
+        two converters, each with its own decimal separators
+        """
+        converters = {
+            separators: target.Converter(
+                self.get_mixed_feeds_config(), separators=separators
+            )
+            for separators in ((",", "."), (".", ","))
+        }
+
+        def convert_feed(input_file, output_file, separators):
+            return converters[separators].convert_file(input_file, output_file, ";")[
+                "num_rows"
+            ]
+
+        self.convert_mixed_feeds(convert_feed, (",", "."), (".", ","))
+
+
+class TestConverter(unittest.TestCase):
+    def get_converter(self, **kwargs):
+        kwargs.setdefault("divert", {4: ["1.567"]})
+        return target.Converter(
+            "tests/sample_files/configuration1.xlsx",
+            date_field_to_report_on=5,
+            separators=(".", ""),
+            **kwargs,
+        )
+
+    def test_converter_convert_rows(self):
+        """
+        Test converting rows in memory, with the diverted records apart
+        """
+        converter = self.get_converter()
+        rows = target.read_input_file(
+            "tests/sample_files/input1.txt", "^", '"', 1, 1, "utf-8"
+        )
+        report = {}
+        diverted_records = []
+        records = list(converter.convert_rows(rows, report, diverted_records))
+        self.assertEqual(len(records), 2)
+        self.assertEqual(len(diverted_records), 1)
+        self.assertEqual(report["num_rows"], 3)
+        self.assertEqual(report["num_diverted"], 1)
+        self.assertEqual(
+            (report["oldest_date"], report["most_recent_date"]),
+            ("20200305", "20201225"),
+        )
+        # The diverted records are never mixed with the other ones, which
+        # `iter_convert` yields all in order
+        with self.assertRaises(ValueError):
+            converter.convert_rows(rows)
+        self.assertEqual(
+            list(converter.iter_convert(rows)),
+            [(False, records[0]), (True, diverted_records[0]), (False, records[1])],
+        )
+        # Without `divert`, no list is needed for the diverted records
+        self.assertEqual(
+            list(self.get_converter(divert=None).convert_rows(rows)),
+            [records[0], diverted_records[0], records[1]],
+        )
+
+    def test_converter_convert_file(self):
+        """
+        Test converting several input files with the same converter, like
+        `process` does
+        """
+        temp_dir = tempfile.mkdtemp()
+        with unittest.mock.patch.object(
+            target, "read_config", wraps=target.read_config
+        ) as read_config:
+            converter = self.get_converter()
+            for idx in range(2):
+                output_file = os.path.join(temp_dir, "output%d.txt" % idx)
+                report = converter.convert_file(
+                    "tests/sample_files/input1.txt", output_file, "^", '"', 1, 1
+                )
+                self.assertEqual(report["num_rows"], 3)
+        self.assertEqual(read_config.call_count, 1)
+        target.process(
+            "tests/sample_files/input1.txt",
+            os.path.join(temp_dir, "expected.txt"),
+            "tests/sample_files/configuration1.xlsx",
+            "^",
+            '"',
+            1,
+            1,
+            5,
+            "C",  # Default C locale
+            divert={4: ["1.567"]},
+        )
+        for name in ("output0", "output0_diverted", "output1", "output1_diverted"):
+            with open(os.path.join(temp_dir, "%s.txt" % name)) as f1, open(
+                os.path.join(temp_dir, "expected%s.txt" % name[7:])
+            ) as f2:
+                self.assertEqual(f1.read(), f2.read())
+        shutil.rmtree(temp_dir)
+
+    def test_converter_convert_stream(self):
+        """
+        Test converting rows read from a file object to records written to
+        other file objects
+        """
+        converter = self.get_converter()
+        with open("tests/sample_files/input1.txt", newline="") as f:
+            content = f.read()
+        rows = target.read_input_file(
+            "tests/sample_files/input1.txt", "^", '"', 1, 1, "utf-8"
+        )
+        diverted_records = []
+        records = list(converter.convert_rows(rows, None, diverted_records))
+        (output, diverted_output) = (io.StringIO(), io.StringIO())
+        report = converter.convert_stream(
+            io.StringIO(content, newline=""), output, diverted_output, "^", '"', 1, 1
+        )
+        self.assertEqual(report["num_rows"], 3)
+        self.assertEqual(output.getvalue(), "\n".join(records))
+        self.assertEqual(diverted_output.getvalue(), "\n".join(diverted_records))
+        # The diverted records are never mixed with the other ones
+        with self.assertRaises(ValueError):
+            converter.convert_stream(
+                io.StringIO(content, newline=""), io.StringIO(), delimiter="^"
+            )
+        # Without `divert`, all the records are written to the output
+        output = io.StringIO()
+        self.get_converter(divert=None).convert_stream(
+            io.StringIO(content, newline=""),
+            output,
+            delimiter="^",
+            skip_header=1,
+            skip_footer=1,
+        )
+        self.assertEqual(len(output.getvalue().split("\n")), 3)
+
+    def test_converter_locale(self):
+        """
+        Test that the decimal separators of the locale of a converter are
+        captured when creating it
+        """
+        converter = target.Converter(
+            [{"length": 6, "output_format": "Decimal", "skip_field": False}],
+            locale="C",
+        )
+        self.assertEqual(list(converter.convert_rows([["1234.5"]])), ["123450"])
+        with self.assertRaises(localeError):
+            target.Converter([], locale="nonexistent_locale")
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, "NumPy is not installed")
+    def test_converter_numpy_engine(self):
+        """
+        Test converting rows with the "numpy" engine
+        """
+        rows = target.read_input_file(
+            "tests/sample_files/input1.txt", "^", '"', 1, 1, "utf-8"
+        )
+        self.assertEqual(
+            list(self.get_converter(engine="numpy").iter_convert(rows)),
+            list(self.get_converter().iter_convert(rows)),
+        )
+
+    def test_converter_invalid_value(self):
+        """
+        Test that a value that can't be converted raises its ConversionError
+        instead of stopping the program
+        """
+        config = [
+            {"length": 4, "output_format": "Integer", "skip_field": False},
+            {"length": 4, "output_format": "Time", "skip_field": False},
+        ]
+        for engine in ("python", "numpy") if NUMPY_AVAILABLE else ("python",):
+            converter = target.Converter(config, engine=engine)
+            with self.assertLogs(level="CRITICAL") as logger:
+                logging.critical("No other critical message")
+                with self.assertRaises(target.ConversionError) as cm:
+                    list(converter.convert_rows([["1", "12:34"], ["2", "12h34"]]))
+            self.assertEqual(len(logger.records), 1)
+            self.assertEqual(
+                (cm.exception.code, cm.exception.idx_col, cm.exception.idx_row),
+                (17, 2, 2),
+            )
+            # The rows with such values can still be rejected instead
+            rejected_rows = []
+            self.assertEqual(
+                list(
+                    converter.convert_rows(
+                        [["1", "12:34"], ["2", "12h34"]], None, None, rejected_rows
+                    )
+                ),
+                ["00011234"],
+            )
+            self.assertEqual(rejected_rows[0][1], ["2", "12h34"])
+
+    def test_converter_invalid_config(self):
+        """
+        Test that an invalid configuration raises ConfigError, a ValueError,
+        instead of stopping the program
+        """
+        config = [{"length": 4, "output_format": "Integer", "skip_field": False}]
+        with self.assertLogs(level="CRITICAL") as logger:
+            logging.critical("No other critical message")
+            with self.assertRaises(ValueError) as cm:
+                target.Converter(
+                    [{"length": 4, "output_format": "Invalid", "skip_field": False}]
+                )
+            self.assertIsInstance(cm.exception, target.ConfigError)
+            self.assertEqual(cm.exception.code, 27)
+            with self.assertRaises(target.ConfigError) as cm:
+                target.Converter(config, truncate=[2])
+            self.assertEqual(cm.exception.code, 26)
+            with self.assertRaises(target.ConfigError) as cm:
+                target.Converter(config, divert={2: ["1"]})
+            self.assertEqual(cm.exception.code, 30)
+            with self.assertRaises(target.ConfigError) as cm:
+                target.Converter(
+                    "tests/sample_files/configuration1_invalid_output_format.xlsx"
+                )
+            self.assertEqual(cm.exception.code, 15)
+            self.assertIn("on row 9, must be one of", str(cm.exception))
+        self.assertEqual(len(logger.records), 1)
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generate_workload(self):
+        """
+        Test generating a synthetic input file and its configuration file
+        """
+        from benchmarks import generate
+
+        temp_dir = tempfile.mkdtemp()
+        mix = generate.parse_mix("Integer=2,Decimal,Date=1,Text")
+        self.assertEqual(mix, {"Integer": 2, "Decimal": 1, "Date": 1, "Text": 1})
+        (input_file, config_file) = generate.generate_workload(
+            temp_dir, "workload", 50, 10, mix, field_width=6
+        )
+        config = target.load_config(config_file)
+        self.assertEqual(
+            [column["output_format"] for column in config[:5]],
+            ["Integer", "Integer", "Decimal", "Date (DD/MM/YYYY to YYYYMMDD)", "Text"],
+        )
+        # The dates always are 8 characters long
+        self.assertEqual([column["length"] for column in config[:5]], [6, 6, 6, 8, 6])
+        output_file = os.path.join(temp_dir, "output.txt")
+        (num_rows, _, _) = target.process(
+            input_file, output_file, config_file, "^", '"', 0, 0, 4, "C"
+        )
+        self.assertEqual(num_rows, 50)
+        with open(output_file) as f:
+            records = f.read().split("\n")
+        self.assertEqual(len(records), 50)
+        for record in records:
+            self.assertEqual(len(record), 64)
+        shutil.rmtree(temp_dir)
+
+    def test_parse_mix_invalid(self):
+        """
+        Test parsing a mix of columns with an unknown kind of column
+        """
+        from benchmarks import generate
+
+        with self.assertRaises(ValueError):
+            generate.parse_mix("Integer=2,Float=1")
+
+    def test_run_benchmarks(self):
+        """
+        Test running the benchmarks on a small workload
+        """
+        from benchmarks import run
+
+        results = run.run_benchmarks(
+            20,
+            6,
+            {"Integer": 1, "Time": 1},
+            engines=["python"],
+            repeat=1,
+            isolate=False,
+        )
+        self.assertEqual(results["version"], target.__version__)
+        self.assertEqual(
+            [(result["scenario"], result["engine"]) for result in results["results"]],
+            [
+                ("process", "python"),
+                ("format:Integer", "python"),
+                ("format:Time", "python"),
+            ],
+        )
+        for result in results["results"]:
+            self.assertEqual(result["num_rows"], 20)
+            self.assertGreater(result["rows_per_second"], 0)
+            self.assertGreater(result["mb_per_second"], 0)
+        lines = run.format_results(results).split("\n")
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[2].startswith("format:Integer       python "))
+
+    def test_run_gate(self):
+        """
+        Test running the scenarios of the performance regression gate, one of
+        them converting a directory of input files
+        """
+        from benchmarks import gate
+
+        scenarios = (
+            ("mixed", 40, 6, {"Integer": 1, "Date": 1}, 1),
+            ("directory", 40, 6, {"Decimal": 1, "Text": 1}, 4),
+        )
+        with unittest.mock.patch.object(gate, "GATE_SCENARIOS", scenarios):
+            results = gate.run_gate(0.5, repeat=1, isolate=False)
+        self.assertEqual(results["scale"], 0.5)
+        self.assertEqual(results["engine"], "python")
+        self.assertEqual(list(results["results"]), ["mixed", "directory"])
+        for result in results["results"].values():
+            self.assertEqual(result["num_rows"], 20)
+            self.assertGreater(result["rows_per_second"], 0)
+
+    def test_compare_results(self):
+        """
+        Test comparing the results of the performance regression gate to the
+        baseline ones
+        """
+        from benchmarks import gate
+
+        def get_results(rows_per_second, peak_rss_bytes):
+            return {
+                "scale": 1.0,
+                "engine": "python",
+                "results": {
+                    name: {
+                        "rows_per_second": rows_per_second[idx],
+                        "peak_rss_bytes": peak_rss_bytes[idx],
+                    }
+                    for (idx, name) in enumerate(("first", "second", "third"))
+                },
+            }
+
+        baseline = get_results([1000, 1000, 1000], [100 * 2**20] * 3)
+        current = get_results([850, 700, 1200], [110 * 2**20, 90 * 2**20, None])
+        (lines, regressions) = gate.compare_results(baseline, current, 0.2, 0.05)
+        self.assertEqual(
+            lines,
+            [
+                "Scenario                    Rows/s base   Rows/s now   Change  "
+                "RSS MB base   RSS MB now   Change",
+                "first                              1000          850   -15.0%  "
+                "      100.0        110.0   +10.0%",
+                "second                             1000          700   -30.0%  "
+                "      100.0         90.0   -10.0%",
+                "third                              1000         1200   +20.0%  "
+                "      100.0          n/a      n/a",
+            ],
+        )
+        self.assertEqual(
+            regressions,
+            [
+                "first: 10.0% more peak memory (tolerance 5.0%)",
+                "second: 30.0% fewer rows per second (tolerance 20.0%)",
+            ],
+        )
+        (_, regressions) = gate.compare_results(baseline, current, 0.5, 0.5)
+        self.assertEqual(regressions, [])
+
+    def test_gate_main(self):
+        """
+        Test the exit code of the performance regression gate
+        """
+        from benchmarks import gate
+
+        temp_dir = tempfile.mkdtemp()
+        baseline_file = os.path.join(temp_dir, "baseline.json")
+        baseline = {
+            "scale": 1.0,
+            "engine": "python",
+            "results": {"first": {"rows_per_second": 1000, "peak_rss_bytes": None}},
+        }
+        slower = {
+            "scale": 1.0,
+            "engine": "python",
+            "results": {"first": {"rows_per_second": 500, "peak_rss_bytes": None}},
+        }
+        with unittest.mock.patch.object(gate, "run_gate", return_value=baseline):
+            gate.main(["--baseline", baseline_file, "--update-baseline"])
+            with contextlib.redirect_stdout(io.StringIO()) as stdout:
+                gate.main(["--baseline", baseline_file])
+            self.assertTrue(stdout.getvalue().endswith("No performance regression.\n"))
+        with unittest.mock.patch.object(gate, "run_gate", return_value=slower):
+            with self.assertRaises(SystemExit) as cm, contextlib.redirect_stdout(
+                io.StringIO()
+            ) as stdout:
+                gate.main(["--baseline", baseline_file])
+        self.assertEqual(cm.exception.code, 1)
+        self.assertTrue(
+            stdout.getvalue().endswith(
+                "Performance regressions:\n"
+                "first: 50.0% fewer rows per second (tolerance 20.0%)\n"
+            )
+        )
+        with self.assertRaises(SystemExit) as cm, self.assertLogs(level="CRITICAL"):
+            gate.main(["--baseline", baseline_file, "--scale", "0.5"])
+        self.assertEqual(cm.exception.code, 2)
+        shutil.rmtree(temp_dir)
+
+    def test_run_scaling(self):
+        """
+        Test running the memory scaling benchmark on small input files
+        """
+        from benchmarks import memory
+
+        results = memory.run_scaling([20, 200], 6, {"Integer": 1}, isolate=False)
+        self.assertEqual([result["num_rows"] for result in results], [20, 200])
+        for result in results:
+            self.assertGreater(result["input_bytes"], 0)
+            self.assertGreater(result["peak_traced_bytes"], 0)
+            self.assertEqual(list(result["stages"]), list(target.STATS_STAGES))
+        lines = memory.format_results(results).split("\n")
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith("        20 "))
+
+    def test_check_scaling(self):
+        """
+        Test checking that the peak memory usage stays bounded as the input
+        files grow
+        """
+        from benchmarks import memory
+
+        results = [
+            {
+                "num_rows": 1000,
+                "peak_traced_bytes": 10 * 2**20,
+                "peak_rss_bytes": None,
+            },
+            {
+                "num_rows": 10000,
+                "peak_traced_bytes": 12 * 2**20,
+                "peak_rss_bytes": None,
+            },
+            {
+                "num_rows": 100000,
+                "peak_traced_bytes": 40 * 2**20,
+                "peak_rss_bytes": None,
+            },
+        ]
+        self.assertEqual(
+            memory.check_scaling(results, 1.5),
+            [
+                "peak_traced_bytes for 100000 rows: 40.0 MB, 4.00 times that for "
+                "1000 rows (maximum 1.50)"
+            ],
+        )
+        self.assertEqual(memory.check_scaling(results, 5), [])
+
+
+class TestStartup(unittest.TestCase):
+    def run_script(self, arguments, runs=3):
+        # Returns the imported modules (from `python -X importtime`) and the
+        # shortest duration of several runs of the script
+        durations = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "delimited2fixedwidth.py"]
+                + arguments,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+            )
+            durations.append(time.perf_counter() - start)
+            self.assertEqual(result.returncode, 0)
+        imported_modules = set(
+            line.split("|")[-1].strip()
+            for line in result.stderr.splitlines()
+            if line.startswith("import time:")
+        )
+        return (imported_modules, min(durations))
+
+    def test_startup_version(self):
+        """
+        Test the startup time budget of `--version`
+        """
+        (imported_modules, duration) = self.run_script(["--version"])
+        self.assertEqual(imported_modules.intersection(DEFERRED_MODULES), set())
+        self.assertLess(duration, STARTUP_BUDGET_VERSION)
+
+    def test_startup_trivial_conversion(self):
+        """
+        Test the startup time budget of a trivial conversion, using the
+        configuration cache
+        """
+        temp_dir = tempfile.mkdtemp()
+        output_file = os.path.join(temp_dir, "output.txt")
+        arguments = [
+            "--input",
+            "tests/sample_files/input1.txt",
+            "--output",
+            output_file,
+            "--overwrite-file",
+            "--config",
+            "tests/sample_files/configuration1.xlsx",
+            "--config-cache-dir",
+            os.path.join(temp_dir, "cache"),
+            "--delimiter",
+            "^",
+            "--skip-header",
+            "1",
+            "--skip-footer",
+            "1",
+            "--locale",
+            "C",
+        ]
+        # Populate the configuration cache
+        self.run_script(arguments, runs=1)
+        (imported_modules, duration) = self.run_script(arguments)
+        self.assertNotIn("openpyxl", imported_modules)
+        self.assertNotIn("concurrent.futures", imported_modules)
+        self.assertLess(duration, STARTUP_BUDGET_TRIVIAL_CONVERSION)
+        with open(output_file) as f:
+            self.assertEqual(len(f.read().split("\n")), 3)
+        shutil.rmtree(temp_dir)
+
+
 class TestLicense(unittest.TestCase):
     def test_license_file(self):
         """